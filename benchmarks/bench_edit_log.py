@@ -0,0 +1,79 @@
+"""Compare edit latency of the write-log store against full CSV rewrites.
+
+Usage: python benchmarks/bench_edit_log.py [--sizes 10000 100000 1000000] [--edits 5]
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.transaction_store import HEADERS, Transaction, CSVTransactionStore
+
+
+def write_ledger(path, rows):
+    """Write a synthetic ledger with the given number of rows."""
+    rng = random.Random(rows)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        for i in range(rows):
+            writer.writerow(
+                [
+                    i + 1,
+                    f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    rng.choice(["Income", "Expense"]),
+                    rng.choice(["Food", "Rent", "Salary", "Transport"]),
+                    f"{rng.randint(1, 100000) / 100:.2f}",
+                    rng.choice(["Cash", "Card", "Bank Transfer"]),
+                    f"row {i}",
+                ]
+            )
+
+
+def time_edits(path, mode, edits):
+    """Return (mean, max) seconds per edit for the given store mode."""
+    store = CSVTransactionStore(path, mode=mode, compact_threshold=edits + 1)
+    count = store.count()
+    rng = random.Random(0)
+    timings = []
+    for _ in range(edits):
+        txn_id = rng.randint(1, count)
+        txn = Transaction.from_row(dict(zip(HEADERS, store.get(txn_id).to_row())))
+        txn.description = "edited"
+        start = time.perf_counter()
+        store.update(txn_id, txn)
+        timings.append(time.perf_counter() - start)
+
+    compact_start = time.perf_counter()
+    store.compact()
+    compact_time = time.perf_counter() - compact_start
+    return sum(timings) / len(timings), max(timings), compact_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--edits", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>8} {'mean edit':>12} {'max edit':>12} {'compact':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for mode in ("rewrite", "log"):
+                path = os.path.join(tmp, f"{mode}_{size}.csv")
+                write_ledger(path, size)
+                mean, worst, compact = time_edits(path, mode, args.edits)
+                print(
+                    f"{size:>10} {mode:>8} {mean * 1000:>10.2f}ms "
+                    f"{worst * 1000:>10.2f}ms {compact * 1000:>8.0f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
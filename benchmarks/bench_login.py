@@ -0,0 +1,97 @@
+"""Measure logins per second at several password hashing costs.
+
+Usage: python benchmarks/bench_login.py [--users 20] [--logins 100] [--threads N]
+       [--cost ln=12,r=8,p=1 ...]
+
+For each cost, registers --users users in a scratch users.db and times
+--logins UserManager.authenticate() calls, first one at a time and then
+submitted concurrently to the password worker pool. Prints the time per
+verification and logins/sec for both, next to the old unsalted SHA-256.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import utils
+from modules.user_manager import UserManager
+from modules.utils import PasswordHelper
+
+PASSWORD = "secret123"
+COSTS = {
+    "scrypt": ["ln=12,r=8,p=1", "ln=13,r=8,p=1", "ln=14,r=8,p=1", "ln=15,r=8,p=1", "ln=14,r=8,p=4"],
+    "pbkdf2-sha256": ["i=100000", "i=300000", "i=600000", "i=1200000"],
+}
+
+
+def run_cost(params, users, logins):
+    """Return (sequential seconds, concurrent seconds) for logins at one cost."""
+    PasswordHelper.set_cost(params)
+    manager = UserManager()
+    prefix = "".join(c for c in params if c.isalnum())
+    names = [f"{prefix}user{i}" for i in range(users)]
+    for i, name in enumerate(names):
+        manager.data_handler.add_user(
+            {"user_id": f"{name}-id", "name": name, "password": PasswordHelper.hash_password(PASSWORD)}
+        )
+    # Warm up the pool so thread start-up isn't timed.
+    manager.submit_authenticate(names[0], PASSWORD).result()
+
+    start = time.perf_counter()
+    for i in range(logins):
+        if manager.authenticate(names[i % users], PASSWORD) is None:
+            raise RuntimeError("login failed")
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    futures = [manager.submit_authenticate(names[i % users], PASSWORD) for i in range(logins)]
+    wait(futures)
+    concurrent = time.perf_counter() - start
+    if any(f.result() is None for f in futures):
+        raise RuntimeError("login failed")
+    return sequential, concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--threads", type=int, help="password pool size (default: CPU count)")
+    parser.add_argument("--cost", action="append", help="cost to measure (repeatable; default: a range)")
+    args = parser.parse_args()
+    if args.threads:
+        utils.POOL_THREADS = args.threads
+    costs = args.cost or COSTS[utils.SCHEME]
+
+    start = time.perf_counter()
+    legacy = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    for _ in range(10_000):
+        PasswordHelper.verify_password(PASSWORD, legacy)
+    legacy_seconds = (time.perf_counter() - start) / 10_000
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            results = [(params, *run_cost(params, args.users, args.logins)) for params in costs]
+        finally:
+            os.chdir(cwd)
+
+    print(f"{utils.SCHEME} logins, {utils.POOL_THREADS} pool threads")
+    print(f"{'cost':>16} {'per login':>10} {'sequential':>12} {'concurrent':>12}")
+    print(f"{'sha256 (legacy)':>16} {legacy_seconds * 1e6:>8.1f}µs {1 / legacy_seconds:>8,.0f}/sec {'':>12}")
+    for params, sequential, concurrent in results:
+        print(
+            f"{params:>16} {sequential / args.logins * 1000:>8.1f}ms "
+            f"{args.logins / sequential:>8,.1f}/sec {args.logins / concurrent:>8,.1f}/sec"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Compare how many bytes each in-memory representation of a ledger takes per transaction.
+
+Usage: python benchmarks/bench_memory.py [--rows 1000000]
+
+Layouts, from the original one to the current one:
+  dict rows     csv.DictReader rows, as the managers used to keep them
+  objects       Transaction objects with a __dict__ and per-row strings
+  slotted       Transaction objects with __slots__ and interned strings
+  table         TransactionTable columns (what the stores keep now)
+"""
+
+import argparse
+import csv
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_edit_log import write_ledger
+from modules.transaction_store import Transaction, TransactionTable
+
+
+class UnslottedTransaction:
+    """Transaction as it was before __slots__: one __dict__ per row, strings not shared."""
+
+    def __init__(self, txn):
+        self.id = txn.id
+        self.date = txn.date
+        # Copies, like the per-row strings csv.DictReader hands out.
+        self.type = "".join(list(txn.type))
+        self.category = "".join(list(txn.category))
+        self.amount = txn.amount
+        self.payment_method = "".join(list(txn.payment_method))
+        self.description = txn.description
+        self.raw = txn.raw
+
+
+def read_dicts(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def read_objects(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [UnslottedTransaction(Transaction.from_row(row)) for row in csv.DictReader(f)]
+
+
+def read_slotted(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [Transaction.from_row(row) for row in csv.DictReader(f)]
+
+
+def read_table(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return TransactionTable(Transaction.from_row(row) for row in csv.DictReader(f))
+
+
+def resident_bytes():
+    """Resident set size of this process (Linux), or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def measure(load, path):
+    """Return (bytes still held by the result, seconds to build it).
+
+    Runs in a fresh worker process so layouts don't reuse each other's
+    freed memory. Uses the growth of the resident set where it can be read,
+    else tracemalloc (exact but many times slower).
+    """
+    gc.collect()
+    before = resident_bytes()
+    if before is None:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = load(path)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    if before is None:
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        held = resident_bytes() - before
+    del result
+    return held, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    layouts = [
+        ("dict rows", read_dicts),
+        ("objects", read_objects),
+        ("slotted", read_slotted),
+        ("table", read_table),
+    ]
+    print(f"{'layout':>10} {'rows':>10} {'total':>10} {'bytes/txn':>10} {'vs first':>9} {'build':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        write_ledger(path, args.rows)
+        baseline = None
+        for name, load in layouts:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                held, elapsed = pool.submit(measure, load, path).result()
+            per_row = held / args.rows
+            baseline = baseline or per_row
+            print(
+                f"{name:>10} {args.rows:>10} {held / 2**20:>8.1f}MB {per_row:>10.0f} "
+                f"{per_row / baseline:>8.0%} {elapsed:>7.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare keyword search through the inverted index against the old linear scan.
+
+Usage: python benchmarks/bench_search.py [--sizes 10000 100000 1000000] [--queries food "row 12" card]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_edit_log import write_ledger
+from modules.transaction_store import CSVTransactionStore
+
+
+def linear_scan(store, query):
+    """The pre-index search: every term must be a substring of some field."""
+    terms = query.lower().split()
+    return [
+        row.id
+        for row in store.all()
+        if all(
+            term in row.category.lower()
+            or term in row.payment_method.lower()
+            or term in row.description.lower()
+            for term in terms
+        )
+    ]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", nargs="+", default=["food", "row 12", "card", "transfer rent"])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'query':>16} {'hits':>8} {'scan':>10} {'index':>10} {'build':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, str(size), "transactions.csv")
+            os.makedirs(os.path.dirname(path))
+            write_ledger(path, size)
+            store = CSVTransactionStore(path)
+            _, build = timed(store.search_index.rebuild)
+            store.all()  # the scan is timed on an already loaded ledger
+            for query in args.queries:
+                expected, scan = timed(linear_scan, store, query)
+                found, lookup = timed(store.search_index.search, query)
+                assert sorted(found) == expected, f"index disagrees with scan for {query!r}"
+                print(
+                    f"{size:>10} {query:>16} {len(found):>8} {scan * 1000:>8.1f}ms "
+                    f"{lookup * 1000:>8.1f}ms {build * 1000:>8.0f}ms"
+                )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
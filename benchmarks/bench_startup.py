@@ -0,0 +1,106 @@
+"""Measure how long main.py takes to reach the main menu, and fail over budget.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--budget-ms 250] [--top 15]
+
+Launches `python main.py` in a scratch folder, answers "Exit" at the main
+menu, and reports the fastest and median wall-clock time next to a bare
+`python -c pass`. A `python -X importtime` run lists the slowest imports.
+Exits with status 1 if the median launch exceeds --budget-ms or if a heavy
+module (pandas, NumPy) is loaded before login.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+# Modules that must not be imported before the user logs in.
+HEAVY = ["pandas", "numpy"]
+BUDGET_MS = 250
+
+
+def launch_times(command, runs, cwd, stdin=""):
+    """Return the wall-clock seconds of each of runs launches of command."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, input=stdin, text=True, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_breakdown(cwd):
+    """Return [(cumulative µs, self µs, module)] from python -X importtime, slowest first."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=cwd,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        text=True,
+        capture_output=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        rows.append((int(cumulative), int(own), name.rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def heavy_modules_loaded(cwd):
+    """Return the HEAVY modules imported by `import main`."""
+    check = f"import sys, main; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=cwd,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        text=True,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="fail if the median launch is slower")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # First launch creates users.db; don't time it.
+        launch_times([sys.executable, MAIN], 1, folder, "3\n")
+        bare = launch_times([sys.executable, "-c", "pass"], args.runs, folder)
+        app = launch_times([sys.executable, MAIN], args.runs, folder, "3\n")
+        breakdown = import_breakdown(folder)
+        heavy = heavy_modules_loaded(folder)
+
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for cumulative, own, name in breakdown[: args.top]:
+        print(f"{cumulative / 1000:>9.1f}ms {own / 1000:>7.1f}ms  {name}")
+    print()
+    median = statistics.median(app) * 1000
+    print(f"python -c pass:  min {min(bare) * 1000:6.1f}ms  median {statistics.median(bare) * 1000:6.1f}ms")
+    print(f"main.py to menu: min {min(app) * 1000:6.1f}ms  median {median:6.1f}ms  (budget {args.budget_ms:.0f}ms)")
+
+    failed = False
+    if heavy:
+        print(f"❌ Imported before login: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"❌ Startup is over budget by {median - args.budget_ms:.0f}ms")
+        failed = True
+    if failed:
+        raise SystemExit(1)
+    print("✅ Startup is within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Time every menu operation on synthetic ledgers and save comparable JSON results.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000 100000 1000000] [--backend csv sqlite]
+       [--repeat 5] [--seed 1] [--only list search ...] [--output FILE]
+       [--compare BASELINE.json] [--threshold 1.25]
+
+For each backend and size, a scratch folder gets one synthetic user
+(benchmarks/synthetic.py) whose ledger is then driven through the same
+TransactionManager, ReportsManager and Dashboard calls the menus make,
+with prompts answered from a script and output discarded. Each operation
+runs once cold (derived indexes and caches still to be built in this
+process) and --repeat more times warm; reads come first, then writes,
+export and finally an import of as many rows as the ledger holds.
+
+The JSON result records the median, minimum and first-run milliseconds
+and the rows scanned and bytes read/written (from modules.metrics) per
+operation, with the commit, Python version and machine. --compare prints
+the change in median time against an earlier result and exits with
+status 1 if any operation got slower than --threshold times its baseline
+(and by more than 1ms).
+"""
+
+import argparse
+import builtins
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import START, LedgerGenerator, create_users
+from modules import metrics
+from modules.dashboard_manager import Dashboard
+from modules.reports_manager import ReportsManager
+from modules.transaction_manager import TransactionManager
+from modules.transaction_store import HEADERS, open_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [1_000, 100_000, 1_000_000]
+REPEAT = 5
+THRESHOLD = 1.25
+# Differences below this are noise, whatever the ratio.
+NOISE_MS = 1.0
+
+
+@contextlib.contextmanager
+def scripted(answers=()):
+    """Answer input() prompts from answers and discard everything printed."""
+    answers = iter(answers)
+    real_input = builtins.input
+    builtins.input = lambda prompt="": next(answers, "")
+    try:
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            yield
+    finally:
+        builtins.input = real_input
+
+
+class Session:
+    """The managers of one logged-in synthetic user, as main.py sets them up."""
+
+    def __init__(self, user_dir, rows, seed):
+        self.user_dir = user_dir
+        self.rows = rows
+        self.store = open_store(user_dir)
+        csv_path = os.path.join(user_dir, "transactions.csv")
+        self.transactions = TransactionManager(csv_path, self.store)
+        self.reports = ReportsManager(user_dir, self.store)
+        self.dashboard = Dashboard("synthetic", csv_path, self.store)
+        self.rng = random.Random(seed)
+        self.import_path = None
+        # A month in the middle of the ledger, for date jumps and monthly reports.
+        middle = self.store.get(max(1, rows // 2)).date
+        self.month, self.year = middle.month, middle.year
+        self.day = middle.isoformat()
+        self.added = 0
+
+    def write_import_file(self, seed):
+        """Write a CSV of as many new rows as the ledger holds, for the import benchmark."""
+        self.import_path = os.path.join(self.user_dir, "bench_import.csv")
+        with open(self.import_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS[1:])
+            for txn in LedgerGenerator(seed, "import").transactions(self.rows):
+                writer.writerow(txn.to_row()[1:])
+
+    def random_id(self):
+        return self.rng.randint(1, self.rows)
+
+    def add(self):
+        self.added += 1
+        answers = ["2025-06-15", "Expense", "Benchmark", f"{self.added}.01", "Card", f"bench add {self.added}", "y"]
+        with scripted(answers):
+            self.transactions.add_transaction()
+
+    def edit(self):
+        with scripted(["", "", "", "", "", f"bench edit {self.rng.random()}"]):
+            self.transactions.edit_transaction(self.random_id())
+
+    def delete(self):
+        with scripted():
+            self.transactions.delete_transaction(self.random_id())
+
+
+# name -> call, run in this order.
+OPERATIONS = {
+    "list": lambda s: s.transactions.list_transactions(),
+    "list_date_jump": lambda s: s.transactions.list_transactions(),
+    "search": lambda s: s.transactions.search_transactions("farmers market"),
+    "filter": lambda s: s.transactions.filter_transactions(
+        "Expense", "Food", f"{s.year}-{s.month:02d}-01", f"{s.year}-{s.month:02d}-28", "10", "50"
+    ),
+    "balance": lambda s: s.transactions.view_balance(),
+    "dashboard": lambda s: s.dashboard.show_dashboard(),
+    "report_summary": lambda s: s.reports.dashboard_summary(),
+    "report_monthly": lambda s: s.reports.monthly_report(s.month, s.year),
+    "report_categories": lambda s: s.reports.category_breakdown(),
+    "report_trends": lambda s: s.reports.spending_trends(),
+    "report_health": lambda s: s.reports.financial_health_score(),
+    "verify_totals": lambda s: s.reports.verify_totals(),
+    "add": Session.add,
+    "edit": Session.edit,
+    "delete": Session.delete,
+    "export": lambda s: s.reports.export_to_csv(),
+    "import": lambda s: s.reports.import_from_csv(),
+}
+# Prompt answers per operation (the write operations script their own).
+ANSWERS = {
+    "list": lambda s: [""],
+    "list_date_jump": lambda s: ["d", s.day, ""],
+    "import": lambda s: [s.import_path],
+}
+# Run once: repeating would import nothing but duplicates.
+ONCE = {"import"}
+
+
+def run_operation(session, name, repeat):
+    """Return the result entry of one operation."""
+    call = OPERATIONS[name]
+    answers = ANSWERS.get(name, lambda s: [])
+    timings = []
+    counts = None
+    for _ in range(1 if name in ONCE else 1 + repeat):
+        with scripted(answers(session)), metrics.operation(f"bench.{name}") as span:
+            start = time.perf_counter()
+            call(session)
+            timings.append(time.perf_counter() - start)
+        counts = counts or dict(span)
+    warm = timings[1:] or timings
+    return {
+        "operation": name,
+        "runs": len(timings),
+        "first_ms": timings[0] * 1000,
+        "median_ms": statistics.median(warm) * 1000,
+        "min_ms": min(warm) * 1000,
+        "rows_scanned": counts["rows"],
+        "bytes_read": counts["bytes_read"],
+        "bytes_written": counts["bytes_written"],
+    }
+
+
+def run_size(backend, rows, seed, repeat, only):
+    """Generate a ledger of rows transactions and time every operation on it."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            start = time.perf_counter()
+            with scripted():
+                (_, user_dir), = create_users(1, rows, seed, backend=backend)
+            generate_seconds = time.perf_counter() - start
+            session = Session(user_dir, rows, seed)
+            if "import" in only:
+                session.write_import_file(seed)
+            results = []
+            for name in OPERATIONS:
+                if name in only:
+                    result = run_operation(session, name, repeat)
+                    results.append({"backend": backend, "rows": rows, **result})
+                    print(
+                        f"{backend:>7} {rows:>10,} {name:<18} {result['median_ms']:>10.2f}ms "
+                        f"{result['first_ms']:>10.2f}ms {result['rows_scanned']:>12,}",
+                        flush=True,
+                    )
+            session.store.close()
+        finally:
+            os.chdir(cwd)
+    return {"backend": backend, "rows": rows, "generate_seconds": generate_seconds}, results
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print median changes against a baseline file; return the regressed entries."""
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    before = {(r["backend"], r["rows"], r["operation"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'backend':>7} {'rows':>10} {'operation':<18} {'before':>10} {'after':>10} {'change':>8}")
+    regressed = []
+    for r in results:
+        old = before.get((r["backend"], r["rows"], r["operation"]))
+        if old is None:
+            continue
+        ratio = r["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        slower = ratio > threshold and r["median_ms"] - old["median_ms"] > NOISE_MS
+        if slower:
+            regressed.append(r)
+        print(
+            f"{r['backend']:>7} {r['rows']:>10,} {r['operation']:<18} {old['median_ms']:>8.2f}ms "
+            f"{r['median_ms']:>8.2f}ms {ratio:>7.2f}x" + (" ❌" if slower else "")
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--backend", nargs="+", choices=["csv", "sqlite"], default=["csv", "sqlite"])
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="warm runs per operation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=list(OPERATIONS), help="operations to run (default: all)")
+    parser.add_argument("--output", help="result file (default: bench_suite_<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+    only = set(args.only or OPERATIONS)
+
+    metrics.enable()
+    setup, results = [], []
+    print(f"{'backend':>7} {'rows':>10} {'operation':<18} {'median':>12} {'first':>12} {'rows scanned':>12}")
+    for backend in args.backend:
+        for rows in args.sizes:
+            size_setup, size_results = run_size(backend, rows, args.seed, args.repeat, only)
+            setup.append(size_setup)
+            results.extend(size_results)
+
+    output = args.output or f"bench_suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": commit(),
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "seed": args.seed,
+                "start": START.isoformat(),
+                "repeat": args.repeat,
+                "setup": setup,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.threshold)
+        if regressed:
+            print(f"❌ {len(regressed)} operation(s) slower than {args.threshold}x their baseline.")
+            raise SystemExit(1)
+        print("✅ No regressions.")
+
+
+if __name__ == "__main__":
+    main()
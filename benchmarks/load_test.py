@@ -0,0 +1,182 @@
+"""Load-test the HTTP service with many concurrent clients.
+
+Usage: python benchmarks/load_test.py [--users 20] [--rows 10000] [--clients 50]
+       [--seconds 10] [--threads 8]
+
+Starts `python -m modules.server` in a scratch folder with --users
+registered users, each with a ledger of --rows transactions, then runs
+--clients concurrent keep-alive clients for --seconds. Each client logs in
+as one user and sends a mix of queries, reports, adds and edits. Prints
+p50/p99 latency per request kind and overall requests/sec.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_edit_log import write_ledger
+
+PASSWORD = "secret123"
+# Request kind -> relative weight in the mix.
+MIX = {"query": 40, "search": 10, "report": 20, "add": 20, "edit": 10}
+
+
+def create_users(folder, users, rows):
+    """Register users in folder (the server's working directory), each with a ledger."""
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        from modules.data_handler import DataHandler
+        from modules.utils import PasswordHelper
+
+        handler = DataHandler()
+        for i in range(users):
+            user_id = f"{i:08d}-load"
+            name = f"load{i}"
+            handler.add_user({"user_id": user_id, "name": name, "password": PasswordHelper.hash_password(PASSWORD)})
+            user_dir = handler.user_dir(user_id, name)
+            os.makedirs(user_dir, exist_ok=True)
+            write_ledger(os.path.join(user_dir, "transactions.csv"), rows)
+    finally:
+        os.chdir(cwd)
+
+
+class Client:
+    """Minimal HTTP/1.1 keep-alive JSON client."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+        self.token = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        auth = f"Authorization: Bearer {self.token}\r\n" if self.token else ""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n{auth}"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length"))
+        payload = json.loads(await self.reader.readexactly(length))
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def client_loop(port, user, rows, deadline, latencies, errors, rng):
+    client = Client(port)
+    status, payload = await client.request("POST", "/login", {"name": user, "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"login failed for {user}: {payload}")
+    client.token = payload["token"]
+    kinds, weights = zip(*MIX.items())
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            if kind == "query":
+                args = ("GET", f"/transactions?category={rng.choice(['food', 'rent'])}&min=500&limit=20")
+            elif kind == "search":
+                args = ("GET", f"/transactions?search=row+{rng.randint(1, 999)}&limit=20")
+            elif kind == "report":
+                args = ("GET", f"/reports/{rng.choice(['summary', 'categories', 'health'])}?period=2024-{rng.randint(1, 12):02d}")
+            elif kind == "add":
+                body = {
+                    "Date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    "Type": "Expense",
+                    "Category": "Food",
+                    "Amount": f"{rng.randint(1, 100000) / 100:.2f}",
+                    "Payment Method": "Card",
+                    "Description": f"load {rng.random()}",
+                }
+                args = ("POST", "/transactions", body)
+            else:
+                args = ("PUT", f"/transactions/{rng.randint(1, rows)}", {"Amount": f"{rng.randint(1, 100000) / 100:.2f}"})
+            start = time.perf_counter()
+            status, payload = await client.request(*args)
+            latencies[kind].append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append((kind, status, payload))
+    finally:
+        client.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+async def run_clients(port, args):
+    latencies = {kind: [] for kind in MIX}
+    errors = []
+    rng = random.Random(0)
+    start = time.perf_counter()
+    deadline = start + args.seconds
+    await asyncio.gather(
+        *(
+            client_loop(port, f"load{i % args.users}", args.rows, deadline, latencies, errors, random.Random(rng.random()))
+            for i in range(args.clients)
+        )
+    )
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=8, help="server I/O threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        create_users(tmp, args.users, args.rows)
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "modules.server", "--port", "0", "--threads", str(args.threads)],
+            cwd=tmp,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            line = server.stdout.readline()
+            if not line.startswith("Serving on"):
+                raise RuntimeError(f"server did not start: {line!r}")
+            port = int(line.rsplit(":", 1)[1])
+            latencies, errors, elapsed = asyncio.run(run_clients(port, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{'request':>8} {'count':>8} {'p50':>10} {'p99':>10}")
+    for kind, values in [*latencies.items(), ("all", [x for v in latencies.values() for x in v])]:
+        print(
+            f"{kind:>8} {len(values):>8} {percentile(values, 0.5) * 1000:>8.1f}ms "
+            f"{percentile(values, 0.99) * 1000:>8.1f}ms"
+        )
+    print(f"{total:,} requests in {elapsed:.1f}s: {total / elapsed:,.0f} requests/sec, {len(errors)} errors")
+    for kind, status, payload in errors[:5]:
+        print(f"  {kind}: {status} {payload}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Hammer one ledger from many processes at once and check nothing was lost.
+
+Usage: python benchmarks/stress_locking.py [--processes 8] [--ops 200] [--seed-rows 1000]
+       [--backend csv|sqlite]
+
+Each process opens its own store on the same folder and mixes single-row
+adds, edits of seeded rows and small CSV imports. Afterwards every added
+and imported row must be present exactly once, every edited row must hold
+one of the values written to it, IDs must be unique and the running totals
+must match the ledger. Prints each process's time spent waiting for locks.
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_edit_log import write_ledger
+from modules.file_lock import LOCK_STATS
+from modules.importer import CSVImporter
+from modules.transaction_store import HEADERS, Transaction, open_store
+
+IMPORT_ROWS = 20
+
+
+def _row(tag):
+    return {
+        "Date": "2025-01-15",
+        "Type": "Expense",
+        "Category": "Stress",
+        "Amount": "1.00",
+        "Payment Method": "Card",
+        "Description": tag,
+    }
+
+
+def worker(folder, backend, number, ops, seed_rows):
+    """Run a random mix of operations; return what was written and the lock metrics."""
+    rng = random.Random(number)
+    store = open_store(folder, backend)
+    added, edits = [], {}
+    start = time.perf_counter()
+    for i in range(ops):
+        kind = rng.choices(["add", "edit", "import"], [5, 4, 1])[0]
+        if kind == "add":
+            tag = f"add p{number} n{i}"
+            store.append([Transaction.from_row(_row(tag))])
+            added.append(tag)
+        elif kind == "edit":
+            txn_id = rng.randint(1, seed_rows)
+            tag = f"edit p{number} n{i}"
+            store.update(txn_id, Transaction.from_row({**_row(tag), "Category": "Edited"}))
+            edits.setdefault(txn_id, []).append(tag)
+        else:
+            tags = [f"import p{number} n{i} r{r}" for r in range(IMPORT_ROWS)]
+            path = os.path.join(folder, f"import_p{number}_{i}.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(HEADERS[1:])
+                writer.writerows([list(_row(tag).values()) for tag in tags])
+            result = CSVImporter(store, skip_duplicates=False).run(path, path + ".rejected")
+            if result.imported != len(tags):
+                raise RuntimeError(f"import lost rows: {result.imported} of {len(tags)}")
+            os.remove(path)
+            added.extend(tags)
+    store.close()
+    return {
+        "number": number,
+        "added": added,
+        "edits": edits,
+        "seconds": time.perf_counter() - start,
+        **LOCK_STATS,
+    }
+
+
+def verify(folder, backend, seed_rows, results):
+    """Return a list of problems found in the final ledger."""
+    store = open_store(folder, backend)
+    rows = list(store.all())
+    problems = []
+    ids = [t.id for t in rows]
+    if len(ids) != len(set(ids)):
+        problems.append(f"{len(ids) - len(set(ids))} duplicate IDs")
+
+    by_description = {}
+    for txn in rows:
+        by_description.setdefault(txn.description, []).append(txn)
+    expected = [tag for r in results for tag in r["added"]]
+    missing = [tag for tag in expected if tag not in by_description]
+    doubled = [tag for tag in expected if len(by_description.get(tag, ())) > 1]
+    if missing:
+        problems.append(f"{len(missing)} added rows missing, e.g. {missing[:3]}")
+    if doubled:
+        problems.append(f"{len(doubled)} added rows stored twice, e.g. {doubled[:3]}")
+
+    written = {}
+    for r in results:
+        for txn_id, tags in r["edits"].items():
+            written.setdefault(txn_id, set()).update(tags)
+    by_id = {t.id: t for t in rows}
+    for txn_id, tags in written.items():
+        txn = by_id.get(txn_id)
+        if txn is None:
+            problems.append(f"edited row {txn_id} missing")
+        elif txn.description not in tags:
+            problems.append(f"edited row {txn_id} holds {txn.description!r}, not one of its edits")
+
+    if len(rows) != seed_rows + len(expected):
+        problems.append(f"{len(rows)} rows, expected {seed_rows + len(expected)}")
+    if hasattr(store.aggregates, "verify"):
+        drift = store.aggregates.verify()
+        if drift:
+            problems.append(f"running totals drifted: {drift[:3]}")
+    store.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="operations per process")
+    parser.add_argument("--seed-rows", type=int, default=1000)
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        write_ledger(os.path.join(folder, "transactions.csv"), args.seed_rows)
+        if args.backend == "sqlite":
+            from modules.migrate_storage import migrate_folder
+
+            migrate_folder(folder)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [
+                pool.submit(worker, folder, args.backend, n, args.ops, args.seed_rows)
+                for n in range(args.processes)
+            ]
+            results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+        problems = verify(folder, args.backend, args.seed_rows, results)
+
+    print(f"{'process':>8} {'ops':>6} {'seconds':>8} {'locks':>8} {'lock wait':>10} {'max wait':>9}")
+    for r in results:
+        print(
+            f"{r['number']:>8} {args.ops:>6} {r['seconds']:>8.2f} {r['acquired']:>8} "
+            f"{r['wait_seconds']:>9.2f}s {r['max_wait'] * 1000:>7.0f}ms"
+        )
+    total_wait = sum(r["wait_seconds"] for r in results)
+    total_ops = args.processes * args.ops
+    print(f"{total_ops:,} operations in {elapsed:.1f}s ({total_ops / elapsed:,.0f} ops/sec), {total_wait:.1f}s waiting for locks")
+    if problems:
+        print("❌ " + "\n❌ ".join(problems))
+        raise SystemExit(1)
+    print("✅ No rows lost or duplicated; edits and running totals are consistent.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Generate deterministic synthetic users and ledgers.
+
+Usage: python benchmarks/synthetic.py [--users 3] [--rows 100000] [--seed 1]
+       [--start 2021-01-01] [--months N] [--backend csv|sqlite]
+
+Registers --users users (password "secret123") in the users.db of the
+current folder, creates each one's ledger through
+DataHandler.create_user_csv and fills it with --rows transactions. The same
+seed, user and row count always give the same ledger, so benchmark runs
+on different versions see identical data.
+
+Each user gets a salary paid on a fixed day with a yearly raise and a
+December bonus, monthly rent, utilities that peak in winter, a few
+subscriptions and occasional freelance income. The remaining rows are
+everyday spending whose categories follow a skewed distribution (food
+and groceries dominate, travel is rare), whose amounts are log-normal per
+category and which peak in November/December and over the summer.
+Descriptions are long merchant/memo strings, some with commas and quotes.
+About 1 in 200 rows is entered a few rows late, so dates are not quite
+in ledger order.
+"""
+
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import transaction_store
+from modules.data_handler import DataHandler
+from modules.money import precision
+from modules.transaction_store import Transaction, open_store
+from modules.utils import PasswordHelper
+
+PASSWORD = "secret123"
+START = date(2021, 1, 1)
+# Typical number of everyday transactions per month, used to pick the span.
+ROWS_PER_MONTH = 150
+MAX_MONTHS = 120
+BATCH_ROWS = 50_000
+LATE_RATE = 0.005
+
+# category -> (weight, median amount, spread (sigma of log amount), payment method weights)
+SPENDING = {
+    "Food": (30, 14, 0.6, {"Card": 6, "Cash": 3, "Wallet": 2}),
+    "Groceries": (22, 45, 0.5, {"Card": 7, "Cash": 2, "Wallet": 1}),
+    "Transport": (14, 9, 0.7, {"Card": 4, "Wallet": 4, "Cash": 2}),
+    "Shopping": (10, 40, 0.9, {"Card": 8, "Wallet": 2}),
+    "Entertainment": (7, 25, 0.7, {"Card": 6, "Cash": 2, "Wallet": 1}),
+    "Health": (5, 35, 0.8, {"Card": 7, "Cash": 1}),
+    "Gifts": (4, 50, 0.8, {"Card": 5, "Cash": 3}),
+    "Education": (3, 80, 0.9, {"Card": 3, "Bank Transfer": 2}),
+    "Travel": (2, 220, 0.9, {"Card": 8, "Bank Transfer": 1}),
+    "Other": (3, 20, 1.0, {"Cash": 3, "Card": 3, "Other": 2}),
+}
+# Relative amount of everyday spending per month (January first).
+SEASON = [0.85, 0.8, 0.9, 0.95, 1.0, 1.05, 1.2, 1.2, 0.95, 1.0, 1.3, 1.5]
+MERCHANTS = {
+    "Food": ["Corner Bistro", "Noodle House", "Green Bowl", "Café Aurora", "Pizza Forno", "Taco Stand"],
+    "Groceries": ["FreshMart", "Green Grocer", "SuperSave", "Farmers Market", "Daily Basket"],
+    "Transport": ["City Metro", "RideNow", "Fuel Express", "Parking Central", "Rail Link"],
+    "Shopping": ["ShopRight", "Urban Outfit", "Home & Garden", "TechZone", "Bookworm"],
+    "Entertainment": ["Cineplex", "Streamly", "Concert Hall", "Bowling Alley", "Game Store"],
+    "Health": ["Pharmacy Plus", "Dental Care", "City Clinic", "Fitness Club", "Optician"],
+    "Gifts": ["Gift Corner", "Flower Shop", "Toy Planet", "Jewel Box"],
+    "Education": ["Online Academy", "Language School", "Book Depot", "Workshop Hub"],
+    "Travel": ["SkyAir", "Grand Hotel", "Seaside Inn", "Travel Agency", "Car Rental"],
+    "Other": ["Post Office", "Hardware Store", "Laundry", "Pet Shop", "Charity"],
+}
+CITIES = ["Springfield", "Riverside", "Lakeside", "Hillview", "Old Town", "Harbor District"]
+MEMO_WORDS = (
+    "weekly monthly quick late-night family shared split refund partial deposit order "
+    "delivery pickup online in-store receipt invoice loyalty points discount voucher "
+    "reimbursable business personal urgent planned extra replacement annual trial"
+).split()
+SUBSCRIPTIONS = [("Streaming service", 12.99), ("Music plan", 9.99), ("Cloud storage", 2.99), ("Gym membership", 39.0)]
+STREETS = ["Maple Street", "Oak Avenue", "Elm Road", "Cedar Lane", "Birch Way"]
+
+
+def _month_start(start, offset):
+    month = start.month - 1 + offset
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def _days_in_month(first):
+    return ((first + timedelta(days=31)).replace(day=1) - first).days
+
+
+class LedgerGenerator:
+    """Deterministic transactions of one synthetic user."""
+
+    def __init__(self, seed, user, start=START):
+        self.rng = random.Random(f"{seed}:{user}")
+        self.start = start
+        self.digits = precision()
+        rng = self.rng
+        self.salary = rng.lognormvariate(math.log(4200), 0.3)
+        self.payday = rng.randint(25, 28)
+        self.rent = self.salary * rng.uniform(0.25, 0.35)
+        self.address = f"{rng.randint(1, 299)} {rng.choice(STREETS)}, apt {rng.randint(1, 40)}"
+        self.utilities = rng.uniform(60, 140)
+        self.subscriptions = rng.sample(SUBSCRIPTIONS, rng.randint(1, len(SUBSCRIPTIONS)))
+        self.freelance_rate = rng.uniform(0.1, 0.5)  # chance of freelance income in a month
+
+    def _amount(self, value):
+        return Decimal(f"{max(value, 0.01):.{self.digits}f}")
+
+    def _description(self, merchant):
+        rng = self.rng
+        memo = " ".join(rng.choices(MEMO_WORDS, k=rng.randint(3, 12)))
+        text = f"{merchant} #{rng.randint(100, 9999)} {rng.choice(CITIES)} - {memo}"
+        extra = rng.random()
+        if extra < 0.05:
+            text += ', split with "the usual" group'
+        elif extra < 0.15:
+            text += f", ref {rng.getrandbits(40):010x}"
+        return text
+
+    def _txn(self, day, t_type, category, amount, method, description):
+        return Transaction(
+            date=day,
+            t_type=sys.intern(t_type),
+            category=sys.intern(category),
+            amount=self._amount(amount),
+            payment_method=sys.intern(method),
+            description=description,
+        )
+
+    def _recurring(self, first, month_number):
+        """Yield the fixed monthly transactions of the month starting on first."""
+        rng = self.rng
+        days = _days_in_month(first)
+        salary = self.salary * 1.03 ** (month_number // 12)
+        yield self._txn(
+            first.replace(day=min(self.payday, days)), "Income", "Salary", salary, "Bank Transfer",
+            f"Monthly salary {first:%B %Y}, Acme Corp payroll ref {rng.getrandbits(32):08x}",
+        )
+        if first.month == 12:
+            yield self._txn(
+                first.replace(day=min(self.payday, days)), "Income", "Bonus", salary * rng.uniform(0.4, 1.0),
+                "Bank Transfer", f"Year-end bonus {first.year}, Acme Corp",
+            )
+        yield self._txn(
+            first, "Expense", "Rent", self.rent, "Bank Transfer",
+            f"Rent for {first:%B %Y} - {self.address}, standing order",
+        )
+        winter = 1 + 0.6 * math.cos(2 * math.pi * (first.month - 1) / 12)
+        yield self._txn(
+            first.replace(day=10), "Expense", "Utilities", self.utilities * winter * rng.uniform(0.9, 1.1),
+            "Bank Transfer", f"Electricity, heating and water {first:%m/%Y}, account {self.address}",
+        )
+        for day, (name, price) in enumerate(self.subscriptions, start=3):
+            yield self._txn(first.replace(day=day), "Expense", "Subscriptions", price, "Card", f"{name} - monthly plan")
+        if rng.random() < self.freelance_rate:
+            yield self._txn(
+                first.replace(day=rng.randint(1, days)), "Income", "Freelance",
+                rng.lognormvariate(math.log(600), 0.5), rng.choice(["Bank Transfer", "Wallet"]),
+                self._description("Freelance client"),
+            )
+
+    def transactions(self, rows, months=None):
+        """Return rows transactions, roughly in date order."""
+        rng = self.rng
+        months = months or max(1, min(MAX_MONTHS, rows // ROWS_PER_MONTH))
+        firsts = [_month_start(self.start, m) for m in range(months)]
+
+        recurring = [txn for m, first in enumerate(firsts) for txn in self._recurring(first, m)][:rows]
+        everyday = rows - len(recurring)
+        month_of = rng.choices(range(months), weights=[SEASON[f.month - 1] for f in firsts], k=everyday)
+        names = list(SPENDING)
+        category_of = rng.choices(names, weights=[SPENDING[c][0] for c in names], k=everyday)
+        method_weights = {c: (list(m), list(itertools.accumulate(m.values()))) for c, (*_, m) in SPENDING.items()}
+        result = recurring
+        for m, category in zip(month_of, category_of):
+            first = firsts[m]
+            _, median, sigma, _ = SPENDING[category]
+            methods, cumulative = method_weights[category]
+            method = methods[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+            result.append(
+                self._txn(
+                    first + timedelta(days=rng.randrange(_days_in_month(first))),
+                    "Expense", category, rng.lognormvariate(math.log(median), sigma), method,
+                    self._description(rng.choice(MERCHANTS[category])),
+                )
+            )
+        result.sort(key=lambda txn: txn.date)
+        # A few rows are entered late, after later-dated ones.
+        for i in sorted(rng.sample(range(len(result)), round(len(result) * LATE_RATE))):
+            j = min(len(result) - 1, i + rng.randint(1, 50))
+            result[i], result[j] = result[j], result[i]
+        return result
+
+
+def user_name(user):
+    return f"synthetic{user}"
+
+
+def create_users(users, rows, seed=1, start=START, months=None, backend=None):
+    """Register users and fill their ledgers; return [(name, user_dir)].
+
+    Works in the users.db and database/ folder of the current directory.
+    Users that already exist are skipped.
+    """
+    if backend:
+        transaction_store.STORAGE_BACKEND = backend
+    handler = DataHandler()
+    # One hash for everyone: hashing is deliberately slow.
+    password = PasswordHelper.hash_password(PASSWORD)
+    created = []
+    for user in range(users):
+        name = user_name(user)
+        user_id = str(uuid.UUID(int=random.Random(f"{seed}:{user}:id").getrandbits(128), version=4))
+        if not handler.add_user({"user_id": user_id, "name": name, "password": password}):
+            continue
+        handler.create_user_csv(user_id, name)
+        user_dir = handler.user_dir(user_id, name)
+        store = open_store(user_dir)
+        txns = LedgerGenerator(seed, user, start).transactions(rows, months)
+        for i in range(0, len(txns), BATCH_ROWS):
+            store.append(txns[i : i + BATCH_ROWS], keep_in_memory=False)
+        store.close()
+        created.append((name, user_dir))
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=100_000, help="transactions per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=date.fromisoformat, default=START, help="first month (YYYY-MM-DD)")
+    parser.add_argument("--months", type=int, help=f"months covered (default: rows / {ROWS_PER_MONTH}, at most {MAX_MONTHS})")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], help="ledger backend (default: PFM_STORAGE)")
+    args = parser.parse_args()
+
+    created = create_users(args.users, args.rows, args.seed, args.start, args.months, args.backend)
+    for name, user_dir in created:
+        print(f"✅ {name}: {args.rows:,} transactions in {user_dir}")
+    print(f"Log in as any of them with password {PASSWORD!r}.")
+
+
+if __name__ == "__main__":
+    main()
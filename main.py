@@ -1,9 +1,11 @@
+from modules import metrics
 from modules.user_manager import UserManager
-from modules.transaction_manager import TransactionManager
-from modules.reports_manager import ReportsManager
-from modules.dashboard_manager import Dashboard
 import os
 
+# The ledger modules (NumPy) are imported after login and the report
+# modules (pandas) when the reports menu is first opened, so the main menu
+# comes up without them. `python benchmarks/bench_startup.py` checks it.
+
 
 class FinanceApp:
     """Main application class for Personal Finance Manager."""
@@ -12,8 +14,9 @@ class FinanceApp:
         self.user_manager = UserManager()
         self.current_user = None
         self.transaction_manager = None
-        self.reports_manager = None
+        self._reports_manager = None
         self.dashboard = None
+        self.user_dir = None
 
     # -------------------- MAIN MENU --------------------
     def show_main_menu(self):
@@ -56,13 +59,14 @@ class FinanceApp:
         print("2. Monthly Report")
         print("3. Category Breakdown")
         print("4. Spending Trends")
-        print("5. Export Transactions to CSV")
+        print("5. Export Transactions")
         print("6. Import Transactions from CSV")
-        print("7. Back")
+        print("7. Verify/Rebuild Totals")
+        print("8. Back")
 
         choice = input("Choose a report: ").strip()
-        while choice not in ["1", "2", "3", "4", "5", "6", "7"]:
-            print("❌ Invalid choice. Please enter 1–7.")
+        while choice not in ["1", "2", "3", "4", "5", "6", "7", "8"]:
+            print("❌ Invalid choice. Please enter 1–8.")
             choice = input("Choose a report: ").strip()
         return choice
 
@@ -97,23 +101,43 @@ class FinanceApp:
                 print(f"✅ Logged in as {user.name}.")
                 # self.load_user_managers()
                 self.load_user_data()
-                self.dashboard.show_dashboard()  # Show dashboard immediately
-                self.transaction_loop()
+                try:
+                    self.dashboard.show_dashboard()  # Show dashboard immediately
+                    self.transaction_loop()
+                finally:
+                    # Also on errors and Ctrl+C: waits for compaction and saves the indexes.
+                    self.transaction_manager.store.close()
+                    self.current_user = None
         except Exception as e:
             print(f"Error during login: {e}")
 
     # -------------------- LOAD USER DATA --------------------
     def load_user_data(self):
+        from modules.dashboard_manager import Dashboard
+        from modules.transaction_manager import TransactionManager
+        from modules.transaction_store import open_store
+
         username = self.current_user.name
         user_id = self.current_user.user_id
-        base_dir = "database"
-        user_folder = f"{username}_{user_id[:8]}".replace(" ", "_")
-        user_dir = os.path.join(base_dir, user_folder)
+        user_dir = self.user_manager.data_handler.user_dir(user_id, username)
         csv_path = os.path.join(user_dir, "transactions.csv")
 
-        self.transaction_manager = TransactionManager(csv_path)
-        self.reports_manager = ReportsManager(user_dir)
-        self.dashboard = Dashboard(username, csv_path)
+        os.makedirs(user_dir, exist_ok=True)
+        store = open_store(user_dir)
+
+        self.user_dir = user_dir
+        self.transaction_manager = TransactionManager(csv_path, store)
+        self._reports_manager = None
+        self.dashboard = Dashboard(username, csv_path, store)
+
+    @property
+    def reports_manager(self):
+        """ReportsManager of the logged-in user, created (and pandas loaded) on first use."""
+        if self._reports_manager is None:
+            from modules.reports_manager import ReportsManager
+
+            self._reports_manager = ReportsManager(self.user_dir, self.transaction_manager.store)
+        return self._reports_manager
 
     # -------------------- TRANSACTION LOOP --------------------
     def transaction_loop(self):
@@ -130,28 +154,32 @@ class FinanceApp:
                 self.transaction_manager.list_transactions()
 
             elif choice == "4":
-                self.transaction_manager.list_transactions()
+                rows = self.transaction_manager.list_transactions()
                 try:
-                    index = int(input("\nEnter transaction number to edit: ").strip())
-                    self.transaction_manager.edit_transaction(index)
+                    txn_id = int(input("\nEnter transaction ID to edit: ").strip())
+                    self.transaction_manager.edit_transaction(txn_id, rows)
                 except ValueError:
                     print("❌ Invalid input. Please enter a number.")
                 except Exception as e:
                     print(f"Error editing transaction: {e}")
 
             elif choice == "5":
-                self.transaction_manager.list_transactions()
+                rows = self.transaction_manager.list_transactions()
                 try:
-                    index = int(input("\nEnter transaction number to delete: ").strip())
+                    txn_id = int(input("\nEnter transaction ID to delete: ").strip())
+                    row = self.transaction_manager.find_row(txn_id, rows)
+                    if row is None:
+                        print("❌ Invalid transaction ID.")
+                        continue
                     confirm = (
                         input(
-                            "⚠️ Are you sure you want to delete this transaction? (y/n): "
+                            f"⚠️ Delete {row['Date']} | {row['Category']} | {row['Amount']}? (y/n): "
                         )
                         .strip()
                         .lower()
                     )
                     if confirm == "y":
-                        self.transaction_manager.delete_transaction(index)
+                        self.transaction_manager.delete_transaction(txn_id)
                     else:
                         print("❎ Deletion canceled.")
                 except ValueError:
@@ -190,7 +218,6 @@ class FinanceApp:
 
             elif choice == "9":
                 print(f"👋 Logging out {self.current_user.name}...")
-                self.current_user = None
                 break
 
     # -------------------- REPORTS HANDLER --------------------
@@ -217,10 +244,26 @@ class FinanceApp:
             elif choice == "6":
                 self.reports_manager.import_from_csv()
             elif choice == "7":
+                self.reports_manager.verify_totals()
+            elif choice == "8":
                 break
 
 
-def main():
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Personal Finance Manager.")
+    parser.add_argument(
+        "--profile", action="store_true", help="time every operation and print the metrics at exit (or PFM_PROFILE=1)"
+    )
+    parser.add_argument(
+        "--profile-output", metavar="FILE", help="save the metrics at exit (.prom: Prometheus text, else JSON)"
+    )
+    parser.add_argument("--cprofile", metavar="DIR", help="also save a cProfile trace of each operation in DIR")
+    args = parser.parse_args(argv)
+    if args.profile or args.profile_output or args.cprofile:
+        metrics.enable(args.profile_output, args.cprofile)
+
     app = FinanceApp()
     try:
         app.run()
@@ -228,6 +271,10 @@ def main():
         print("\n👋 Exiting program.")
     except Exception as e:
         print(f"Unexpected error: {e}")
+    finally:
+        if metrics.enabled():
+            print("\n===== Profile =====")
+            print(metrics.format_summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+import json
+import os
+import numpy as np
+from . import metrics
+from .file_lock import atomic_write
+from .money import NA, Money, precision, to_minor
+
+AGGREGATES_FILE = "aggregates.json"
+
+
+def _empty():
+    return {
+        "count": 0,  # all rows, including ones with an unreadable amount
+        "totals": {},  # type -> minor units
+        "counts": {},  # type -> rows with a valid amount
+        "categories": {},  # type -> category -> minor units
+        "months": {},  # "YYYY-MM" -> type -> minor units
+        "rent": 0,  # number of Rent expenses
+    }
+
+
+def _without_zeros(data):
+    """Drop empty buckets so incrementally kept totals compare equal to rebuilt ones."""
+    clean = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            value = _without_zeros(value)
+            if value:
+                clean[key] = value
+        elif value or key in ("count", "rent"):
+            clean[key] = value
+    return clean
+
+
+class Aggregates:
+    """Running totals for one ledger, persisted in aggregates.json.
+
+    Writes through the TransactionStore update the totals in O(1) per
+    changed row; a full rebuild from the columnar cache only happens when
+    the ledger was changed without going through this object.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.path = os.path.join(os.path.dirname(store.csv_path), AGGREGATES_FILE)
+        self._data = None
+        self._stamp = None
+        store.add_listener(self)
+
+    # -------------------- PERSISTENCE --------------------
+    def _load(self):
+        """Load the saved totals, or None if missing, corrupt or kept at another precision."""
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            if saved.get("precision", 2) != precision():
+                return None, None
+            return tuple(saved["stamp"]), saved["data"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            return None, None
+
+    def _save(self, stamp=None):
+        """Save the totals as describing the ledger at stamp (default: now)."""
+        self._stamp = stamp or self.store.state_stamp()
+        with atomic_write(self.path, "w") as f:
+            json.dump({"stamp": self._stamp, "precision": precision(), "data": self._data}, f)
+
+    def _current(self, stamp):
+        """Make sure the in-memory totals describe the ledger at the given stamp."""
+        if self._data is not None and self._stamp == stamp:
+            return True
+        saved_stamp, data = self._load()
+        if saved_stamp == stamp:
+            self._data, self._stamp = data, saved_stamp
+            return True
+        self._data = None
+        return False
+
+    def data(self):
+        """Return the up-to-date totals, rebuilding them if they drifted."""
+        with self.store._lock:
+            current = self._current(self.store.state_stamp())
+            metrics.cache("aggregates", hit=current)
+            if not current:
+                self.rebuild()
+            return self._data
+
+    # -------------------- INCREMENTAL UPDATES --------------------
+    def _apply(self, txn, sign):
+        data = self._data
+        data["count"] += sign
+        units = to_minor(txn.amount)
+        if units == NA:
+            return
+        cents = sign * units
+        data["totals"][txn.type] = data["totals"].get(txn.type, 0) + cents
+        data["counts"][txn.type] = data["counts"].get(txn.type, 0) + sign
+        categories = data["categories"].setdefault(txn.type, {})
+        categories[txn.category] = categories.get(txn.category, 0) + cents
+        if txn.date is not None:
+            month = data["months"].setdefault(txn.date.strftime("%Y-%m"), {})
+            month[txn.type] = month.get(txn.type, 0) + cents
+        if txn.type == "Expense" and txn.category == "Rent":
+            data["rent"] += sign
+
+    def on_append(self, before, transactions):
+        if self._current(before):
+            for txn in transactions:
+                self._apply(txn, 1)
+            self._save()
+
+    def on_update(self, before, old, new):
+        if self._current(before):
+            self._apply(old, -1)
+            self._apply(new, 1)
+            self._save()
+
+    def on_delete(self, before, old):
+        if self._current(before):
+            self._apply(old, -1)
+            self._save()
+
+    def on_compact(self, before):
+        if self._current(before):
+            self._save()
+
+    # -------------------- REBUILD / VERIFY --------------------
+    def _compute(self):
+        """Compute the totals from scratch using the columnar cache."""
+        import pandas as pd
+
+        columns, meta = self.store.cache.columns()
+        data = _empty()
+        data["count"] = len(columns["id"])
+
+        valid = columns["cents"] != NA
+        frame = pd.DataFrame(
+            {
+                "type": np.asarray(meta["types"], dtype=object)[columns["type"][valid]],
+                "category": np.asarray(meta["categories"], dtype=object)[
+                    columns["category"][valid]
+                ],
+                "cents": columns["cents"][valid],
+                "month": np.datetime_as_string(
+                    np.asarray(columns["days"][valid]).astype("datetime64[D]"), unit="M"
+                ),
+            }
+        )
+        for t_type, group in frame.groupby("type")["cents"]:
+            data["totals"][t_type] = int(group.sum())
+            data["counts"][t_type] = int(group.count())
+        for (t_type, category), cents in frame.groupby(["type", "category"])["cents"].sum().items():
+            data["categories"].setdefault(t_type, {})[category] = int(cents)
+        dated = frame[frame["month"] != "NaT"]
+        for (month, t_type), cents in dated.groupby(["month", "type"])["cents"].sum().items():
+            data["months"].setdefault(month, {})[t_type] = int(cents)
+        data["rent"] = int(((frame["type"] == "Expense") & (frame["category"] == "Rent")).sum())
+        return data
+
+    def rebuild(self):
+        """Recompute the totals from the ledger and save them."""
+        # If the ledger changes while we compute, the old stamp makes the
+        # next data() call notice and rebuild again.
+        with self.store._lock:
+            stamp = self.store.state_stamp()
+            self._data = self._compute()
+            self._save(stamp)
+
+    def verify(self):
+        """Return a list of (section, key) pairs where saved totals drifted from the ledger."""
+        with self.store._lock:
+            saved = _without_zeros(self.data())
+            actual = _without_zeros(self._compute())
+        drift = []
+        for section in sorted(set(saved) | set(actual)):
+            if saved.get(section) == actual.get(section):
+                continue
+            if isinstance(actual.get(section), dict) or isinstance(saved.get(section), dict):
+                a, b = saved.get(section, {}), actual.get(section, {})
+                drift.extend((section, key) for key in sorted(set(a) | set(b)) if a.get(key) != b.get(key))
+            else:
+                drift.append((section, None))
+        return drift
+
+    # -------------------- QUERIES --------------------
+    def total(self, t_type):
+        """Return the total of a transaction type as Money."""
+        return Money(self.data()["totals"].get(t_type, 0))
+
+    def count(self):
+        """Return the number of transactions, including unreadable rows."""
+        return self.data()["count"]
+
+    def has_rent(self):
+        """Return True if any Rent expense is recorded."""
+        return self.data()["rent"] > 0
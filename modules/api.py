@@ -0,0 +1,258 @@
+"""Headless access to a user's ledger for scripts and the pfm command.
+
+Nothing here prompts or prints: every call takes plain values and returns
+structured data (dicts, lists, ImportResult, ExportResult), raising ValueError for
+invalid input. Bulk adds go through the chunked CSVImporter, so they get
+the same validation and duplicate detection as a CSV import.
+"""
+
+import os
+from datetime import date, timedelta
+import pandas as pd
+from .exporter import Exporter
+from .importer import CSVImporter, validate
+from .money import Money
+from .reports_manager import ReportsManager
+from .transaction_store import HEADERS, Transaction, open_store
+
+# Report kinds accepted by FinanceAPI.report.
+REPORT_KINDS = ["summary", "categories", "trends", "health", "monthly"]
+# Filter names accepted by FinanceAPI.query (see TransactionStore.filter_ids).
+FILTERS = ["t_type", "category", "start_date", "end_date", "min_amount", "max_amount", "payment_method"]
+
+
+def parse_period(period):
+    """Turn "YYYY" or "YYYY-MM" into a (first day, last day) pair (ValueError if invalid)."""
+    try:
+        parts = [int(p) for p in period.split("-")]
+        if len(parts) == 1:
+            return date(parts[0], 1, 1), date(parts[0], 12, 31)
+        if len(parts) == 2:
+            year, month = parts
+            first = date(year, month, 1)
+            return first, date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid period {period!r}. Use YYYY or YYYY-MM.")
+
+
+def to_dict(txn):
+    """Return a transaction as a dict keyed by the CSV headers."""
+    return dict(zip(HEADERS, txn.to_row()))
+
+
+class FinanceAPI:
+    """Scriptable operations on one user's ledger."""
+
+    def __init__(self, user_dir, store=None):
+        """
+        :param user_dir: the user's data folder
+        :param store: TransactionStore to use (opened from user_dir if omitted)
+        """
+        self.user_dir = user_dir
+        self.store = store or open_store(user_dir)
+        self.reports = ReportsManager(user_dir, self.store)
+
+    @classmethod
+    def login(cls, name, password, user_manager=None):
+        """Open the ledger of a registered user, raising ValueError on a bad name or password."""
+        from .user_manager import UserManager
+
+        user_manager = user_manager or UserManager()
+        user = user_manager.authenticate(name, password)
+        if user is None:
+            raise ValueError("Invalid name or password.")
+        user_dir = user_manager.data_handler.user_dir(user.user_id, user.name)
+        os.makedirs(user_dir, exist_ok=True)
+        return cls(user_dir)
+
+    def close(self):
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------- WRITE --------------------
+    def add_transactions(self, transactions, skip_duplicates=True, progress=None):
+        """Validate and append transactions in bulk, returning an ImportResult.
+
+        :param transactions: iterable of Transaction objects or dicts keyed by
+            the CSV headers (ID is ignored; the ledger assigns IDs)
+        :param skip_duplicates: skip rows identical to existing transactions
+        :param progress: optional callable given the ImportResult after each chunk
+
+        Invalid and skipped rows are returned in ImportResult.rejected_rows
+        with the reason appended; the assigned IDs run from
+        ImportResult.first_id to ImportResult.last_id.
+        """
+        columns = HEADERS[1:]
+
+        def rows():
+            for txn in transactions:
+                if isinstance(txn, Transaction):
+                    yield txn.to_row()[1:]
+                else:
+                    yield [str(txn.get(name) or "") for name in columns]
+
+        importer = CSVImporter(self.store, skip_duplicates=skip_duplicates)
+        return importer.run_rows(columns, rows(), progress=progress)
+
+    def import_csv(self, path, reject_path=None, progress=None):
+        """Import a CSV file, returning an ImportResult.
+
+        :param reject_path: CSV file for rejected rows (kept in the result if omitted)
+        """
+        return CSVImporter(self.store).run(path, reject_path, progress)
+
+    def update(self, txn_id, changes):
+        """Change fields of a transaction, returning it as a dict (None if there is no such ID).
+
+        :param changes: dict keyed by CSV header; missing or blank fields keep their value
+
+        Raises ValueError if the result fails the rules manual entry uses.
+        """
+        current = self.store.get(txn_id)
+        if current is None:
+            return None
+        row = to_dict(current)
+        row.update({k: str(v).strip() for k, v in changes.items() if k in HEADERS[1:] and v not in (None, "")})
+        frame = pd.DataFrame([row], columns=HEADERS, dtype=object)
+        reason = validate(frame)[0][0]
+        if reason:
+            raise ValueError(f"Invalid transaction: {reason}")
+        updated = Transaction.from_row({**row, "ID": str(txn_id)})
+        if not self.store.update(txn_id, updated):
+            return None
+        return to_dict(updated)
+
+    def delete(self, txn_id):
+        """Delete a transaction, returning it as a dict (None if there is no such ID)."""
+        deleted = self.store.delete(txn_id)
+        return None if deleted is None else to_dict(deleted)
+
+    # -------------------- READ --------------------
+    def query(self, filters=None, search=None, limit=None):
+        """Return matching transactions as dicts.
+
+        :param filters: dict with any of FILTERS; blank values are ignored
+        :param search: keywords that must all appear (results best match first)
+        :param limit: return at most this many (the most recent for filters)
+
+        Without filters or search every transaction matches. Raises
+        ValueError for an unknown filter or an invalid date or amount.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+
+        if search:
+            ids = self.store.search_ids(search)
+            if filters:
+                allowed = set(map(int, self.store.filter_ids(**filters)))
+                ids = [txn_id for txn_id in ids if txn_id in allowed]
+            if limit is not None:
+                ids = ids[:limit]
+            return [to_dict(t) for t in self.store.get_many(ids)]
+
+        if filters:
+            ids = self.store.filter_ids(**filters)
+            if limit is not None:
+                ids = ids[len(ids) - min(limit, len(ids)) :]
+            return [to_dict(t) for t in self.store.get_many(ids)]
+
+        total = self.store.count()
+        start = 0 if limit is None else max(total - limit, 0)
+        return [to_dict(t) for t in self.store.page(start, total - start)]
+
+    def report(self, kind, period=None):
+        """Return one report as a dict.
+
+        :param kind: one of REPORT_KINDS
+        :param period: "YYYY" or "YYYY-MM" to only cover that period
+            (required for "monthly"); the whole ledger otherwise
+
+        Amounts are Money; str() gives the exact decimal amount.
+        """
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unknown report {kind!r}. Choose from: {', '.join(REPORT_KINDS)}")
+        start, end = parse_period(period) if period else (None, None)
+        if kind == "monthly":
+            if period is None:
+                raise ValueError("The monthly report needs a period (YYYY-MM).")
+            ids = self.store.filter_ids(start_date=start.isoformat(), end_date=end.isoformat())
+            return {"period": period, "transactions": [to_dict(t) for t in self.store.get_many(ids)]}
+        if kind == "summary":
+            return {"period": period, **self.reports.summary(start, end)}
+        if kind == "categories":
+            totals = self.reports.category_totals(start, end)
+            return {"period": period, "categories": {str(k): Money(v) for k, v in totals.items()}}
+        if kind == "trends":
+            totals = self.reports.monthly_totals(start, end)
+            return {"period": period, "months": {str(k): Money(v) for k, v in totals.items()}}
+        return {"period": period, **self.reports.health(start, end)}
+
+    def rollup(self, by=(), period=None, **where):
+        """Return cube totals for any combination of dimensions, as a list of dicts.
+
+        :param by: dimensions to group by, from "month", "type", "category"
+            and "method"; none gives one row of grand totals
+        :param period: "YYYY" or "YYYY-MM" to only cover that period
+        :param where: dimension=value (or a list of values) to keep
+
+        Each dict holds the `by` values plus "sum", "min" and "max" as Money
+        and "count". Raises ValueError for an unknown dimension.
+        """
+        start, end = parse_period(period) if period else (None, None)
+        totals = self.reports.rollup(tuple(by), start, end, **where).reset_index()
+        return [
+            {
+                **{name: row[name] for name in by},
+                "sum": Money(row["sum"]),
+                "count": int(row["count"]),
+                "min": Money(row["min"]),
+                "max": Money(row["max"]),
+            }
+            for row in totals.to_dict("records")
+        ]
+
+    # -------------------- EXPORT --------------------
+    def export(self, path=None, fmt="csv", compression=None, filters=None, period=None, incremental=False,
+               name="default", progress=None):
+        """Export transactions to a file, returning an ExportResult.
+
+        :param path: file to write (default: exports/transactions_export.<ext>
+            in the user folder, transactions_<first>-<last>.<ext> for incremental exports)
+        :param fmt: "csv", "jsonl" or "parquet" (needs pyarrow)
+        :param compression: None, "gzip" or "lzma"
+        :param filters: dict with any of FILTERS; blank values are ignored
+        :param period: "YYYY" or "YYYY-MM" to only export that period
+        :param incremental: only export rows added since the last
+            incremental export under name
+
+        Raises ValueError for an unknown format, compression or filter, or
+        an invalid date or amount.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        if period:
+            start, end = parse_period(period)
+            filters.setdefault("start_date", start.isoformat())
+            filters.setdefault("end_date", end.isoformat())
+        return Exporter(self.store, self.reports.export_dir).run(
+            path, fmt, compression, incremental=incremental, name=name, progress=progress, **filters
+        )
+
+
+def open_user(name=None, password=None, user_dir=None):
+    """Return a FinanceAPI for a folder, or for a registered user after checking the password."""
+    if user_dir is not None:
+        if not os.path.isdir(user_dir):
+            raise ValueError(f"No such user folder: {user_dir}")
+        return FinanceAPI(user_dir)
+    return FinanceAPI.login(name, password)
@@ -0,0 +1,168 @@
+"""Compute reports for every user folder in parallel.
+
+Usage: python -m modules.batch_reports [--database-dir DIR] [--workers N]
+       [--max-tasks-per-child N] [--memory-limit MB] [--output FILE] [FOLDER ...]
+
+Runs the ReportsManager computations (summary, category breakdown,
+monthly trends, financial health) for every folder holding a ledger, one
+folder per task in a process pool, and writes one consolidated JSON file
+with the per-user results and the totals across users. Workers are
+replaced after --max-tasks-per-child folders and can be capped with
+--memory-limit, so one huge ledger can't keep memory pinned for the rest
+of the run; a folder that fails (or runs out of memory) is reported and
+the others carry on.
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from .data_handler import DATABASE_DIR
+from .file_lock import atomic_write
+from .money import Money
+from .reports_manager import ReportsManager
+from .transaction_store import CSV_FILE, SQLITE_FILE, open_store
+
+MAX_TASKS_PER_CHILD = 20
+
+
+def ledger_folders(database_dir, names=None):
+    """Return (folder, ledger size in bytes) for every user folder holding a ledger."""
+    folders = []
+    for name in sorted(names or os.listdir(database_dir)):
+        user_dir = os.path.join(database_dir, name)
+        for ledger in (SQLITE_FILE, CSV_FILE):
+            path = os.path.join(user_dir, ledger)
+            if os.path.exists(path):
+                folders.append((user_dir, os.path.getsize(path)))
+                break
+    return folders
+
+
+def _limit_memory(limit_mb):
+    """Pool initializer capping the address space of a worker."""
+    if limit_mb:
+        import resource
+
+        limit = limit_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def user_report(user_dir):
+    """Compute the reports of one folder. Runs in a worker process."""
+    start = time.perf_counter()
+    store = open_store(user_dir)
+    try:
+        reports = ReportsManager(user_dir, store)
+        summary = reports.summary()
+        categories = reports.category_totals()
+        months = reports.monthly_totals()
+        result = {
+            "user": os.path.basename(user_dir),
+            **summary,
+            "categories": {str(k): Money(v) for k, v in categories.items()},
+            "months": {str(k): Money(v) for k, v in months.items()},
+            "health": reports.health(),
+        }
+    finally:
+        store.close()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def consolidate(results):
+    """Return the totals across all successful per-user results."""
+    ok = [r for r in results if "error" not in r]
+    categories, months = Counter(), Counter()
+    for r in ok:
+        categories.update({k: v.units for k, v in r["categories"].items()})
+        months.update({k: v.units for k, v in r["months"].items()})
+    return {
+        "users": len(ok),
+        "failed": len(results) - len(ok),
+        "transactions": sum(r["transactions"] for r in ok),
+        "total": sum((r["total"] for r in ok), Money()),
+        "income": sum((r["health"]["income"] for r in ok), Money()),
+        "expense": sum((r["health"]["expense"] for r in ok), Money()),
+        "categories": {k: Money(v) for k, v in sorted(categories.items())},
+        "months": {k: Money(v) for k, v in sorted(months.items())},
+    }
+
+
+def run(folders, workers=None, max_tasks_per_child=MAX_TASKS_PER_CHILD, memory_limit=None, progress=None):
+    """Compute the reports of the given folders, returning (results, seconds).
+
+    Results come back in folder order; a failed folder gets {"user", "error"}.
+    """
+    start = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        max_tasks_per_child=max_tasks_per_child,
+        initializer=_limit_memory,
+        initargs=(memory_limit,),
+    ) as pool:
+        # Largest ledgers first, so no worker is left with a big one at the end.
+        futures = {
+            pool.submit(user_report, user_dir): user_dir
+            for user_dir, _ in sorted(folders, key=lambda f: -f[1])
+        }
+        for future in as_completed(futures):
+            user_dir = futures[future]
+            try:
+                results[user_dir] = future.result()
+            except Exception as e:
+                results[user_dir] = {"user": os.path.basename(user_dir), "error": repr(e)}
+            if progress:
+                progress(results[user_dir])
+    ordered = [results[user_dir] for user_dir, _ in folders]
+    return ordered, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute reports for every user folder.")
+    parser.add_argument("folders", nargs="*", help="user folder names (default: all)")
+    parser.add_argument("--database-dir", default=DATABASE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-tasks-per-child", type=int, default=MAX_TASKS_PER_CHILD)
+    parser.add_argument("--memory-limit", type=int, default=None, help="address space cap per worker in MB")
+    parser.add_argument("--output", help="JSON file to write (default: DATABASE_DIR/reports/batch_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    folders = ledger_folders(args.database_dir, args.folders)
+    if not folders:
+        print("No user folders found.")
+        return 0
+
+    def progress(result):
+        if "error" in result:
+            print(f"❌ {result['user']}: {result['error']}")
+        else:
+            print(f"✅ {result['user']}: {result['transactions']} transactions in {result['seconds']:.2f}s")
+
+    results, elapsed = run(folders, args.workers, args.max_tasks_per_child, args.memory_limit, progress)
+    totals = consolidate(results)
+    busy = sum(r.get("seconds", 0) for r in results)
+
+    output = args.output or os.path.join(
+        args.database_dir, "reports", f"batch_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with atomic_write(output, "w", encoding="utf-8") as f:
+        # Money (and anything else not JSON-native) is written as its string form.
+        json.dump({"totals": totals, "users": results, "seconds": elapsed}, f, indent=2, default=str, ensure_ascii=False)
+
+    print(
+        f"📊 {totals['users']} users, {totals['transactions']:,} transactions in {elapsed:.2f}s "
+        f"({busy / elapsed:.1f}x parallel speedup)"
+    )
+    print(f"💰 Income: {totals['income']}  Expense: {totals['expense']}")
+    print(f"📄 Consolidated report saved to: {output}")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
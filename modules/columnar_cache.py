@@ -0,0 +1,393 @@
+import csv
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from . import metrics
+from .file_lock import atomic_write
+from .money import NA, minor_array, parse_minor, precision, to_minor
+from .transaction_store import EPOCH, HEADERS
+
+CACHE_VERSION = 2
+
+# name -> dtype of every fixed-width column file.
+COLUMNS = {
+    "id": np.int64,
+    "days": np.int64,  # days since 1970-01-01
+    "cents": np.int64,  # amount in minor units of the currency (NA if invalid)
+    "type": np.int32,  # codes into meta["types"]
+    "category": np.int32,  # codes into meta["categories"]
+    "method": np.int32,  # codes into meta["methods"]
+    "desc_end": np.int64,  # end offset of each description in desc.bin
+}
+# Sorted date index: every row's days in ascending order, and the row
+# position each entry belongs to (ties keep ledger order).
+DATE_INDEX = ("date_days", "date_order")
+
+
+def _codes(values, normalize, dictionary):
+    """Dictionary-encode raw strings, extending the dictionary with new entries.
+
+    Normalization only runs once per distinct value, not once per row.
+    """
+    raw_codes, uniques = pd.factorize(values)
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    mapping = np.empty(len(uniques), dtype=np.int32)
+    for i, value in enumerate(uniques):
+        value = normalize(value.strip())
+        if value not in lookup:
+            lookup[value] = len(dictionary)
+            dictionary.append(value)
+        mapping[i] = lookup[value]
+    return mapping[raw_codes]
+
+
+class ColumnarCache:
+    """Memory-mapped column files mirroring a user's transactions.csv.
+
+    Lives in a cache/ folder next to the CSV. Only rows appended since the
+    last sync are parsed; a compacted or replaced CSV triggers a full
+    rebuild. Pending edits/deletes in the store's write log are applied on
+    top when the columns are read. A date-sorted index lets date ranges be
+    found by binary search instead of comparing every row.
+    """
+
+    def __init__(self, store):
+        """
+        :param store: TransactionStore whose CSV this cache mirrors
+        """
+        self.store = store
+        self.cache_dir = os.path.join(os.path.dirname(store.csv_path), "cache")
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+        self._columns = None
+
+    def _path(self, name):
+        ext = ".bin" if name == "desc" else ".col"
+        return os.path.join(self.cache_dir, name + ext)
+
+    # -------------------- META --------------------
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("version") != CACHE_VERSION or meta.get("precision") != precision():
+            return None
+        return meta
+
+    def _save_meta(self, meta):
+        with atomic_write(self.meta_path, "w") as f:
+            json.dump(meta, f)
+
+    # -------------------- SYNC --------------------
+    def sync(self):
+        """Bring the column files up to date with the CSV and return the meta."""
+        self.store.refresh_index()
+        st = os.stat(self.store.csv_path)
+        meta = self._load_meta()
+
+        if meta is None or meta["csv_ino"] != st.st_ino or meta["csv_size"] > st.st_size:
+            meta = self._rebuild(st)
+        elif meta["csv_size"] < st.st_size:
+            self._append_tail(meta, st)
+        else:
+            metrics.cache("columns", hit=True)
+            return meta
+        metrics.cache("columns", hit=False)
+        return meta
+
+    def _rebuild(self, st):
+        """Re-encode the whole CSV."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for name in list(COLUMNS) + list(DATE_INDEX) + ["desc"]:
+            open(self._path(name), "wb").close()
+        with open(self.store.csv_path, "r", newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        meta = {
+            "version": CACHE_VERSION,
+            "precision": precision(),
+            "header": header,
+            "csv_ino": st.st_ino,
+            "csv_size": len(_first_line(self.store.csv_path)),
+            "rows": 0,
+            "desc_size": 0,
+            "types": [],
+            "categories": [],
+            "methods": [],
+        }
+        self._append_tail(meta, st)
+        return meta
+
+    def _append_tail(self, meta, st):
+        """Parse only the bytes added to the CSV since the last sync."""
+        with open(self.store.csv_path, "rb") as f:
+            f.seek(meta["csv_size"])
+            tail = f.read(st.st_size - meta["csv_size"])
+        metrics.add(bytes_read=len(tail))
+        # Ignore a partially written last row; it is picked up next time.
+        tail = tail[: tail.rfind(b"\n") + 1]
+        if tail:
+            frame = pd.read_csv(
+                io.BytesIO(tail),
+                names=meta["header"],
+                index_col=False,
+                dtype=str,
+                keep_default_na=False,
+            )
+            self._append_columns(meta, self._encode_frame(frame, meta))
+        meta["csv_size"] += len(tail)
+        self._save_meta(meta)
+
+    def _encode_frame(self, frame, meta):
+        """Encode a frame of raw CSV strings into column arrays."""
+        for name in HEADERS:
+            if name not in frame.columns:
+                frame[name] = ""
+        ids = pd.to_numeric(frame["ID"], errors="coerce")
+        frame = frame[ids.notna().to_numpy()]
+
+        dates = pd.to_datetime(frame["Date"].str.strip(), format="%Y-%m-%d", errors="coerce")
+        return {
+            "id": ids.dropna().to_numpy(dtype=np.int64),
+            # NaT casts to the int64 minimum, i.e. NA.
+            "days": dates.to_numpy().astype("datetime64[D]").astype(np.int64),
+            "cents": parse_minor(frame["Amount"]),
+            "type": _codes(frame["Type"], str.capitalize, meta["types"]),
+            "category": _codes(frame["Category"], str.capitalize, meta["categories"]),
+            "method": _codes(frame["Payment Method"], str.title, meta["methods"]),
+            "desc": [d.strip().encode("utf-8") for d in frame["Description"]],
+        }
+
+    def _append_columns(self, meta, columns):
+        """Append encoded rows to the column files and advance meta."""
+        rows = meta["rows"]
+        descriptions = columns.pop("desc")
+        columns["desc_end"] = meta["desc_size"] + np.cumsum(
+            [len(d) for d in descriptions], dtype=np.int64
+        )
+
+        written = 0
+        for name, dtype in COLUMNS.items():
+            with open(self._path(name), "r+b") as f:
+                # Drop anything written after the last committed meta.
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                written += f.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        with open(self._path("desc"), "r+b") as f:
+            f.truncate(meta["desc_size"])
+            f.seek(0, os.SEEK_END)
+            written += f.write(b"".join(descriptions))
+        metrics.add(bytes_written=written)
+
+        self._index_dates(rows, columns["days"])
+        meta["rows"] = rows + len(columns["id"])
+        meta["desc_size"] = int(columns["desc_end"][-1]) if len(descriptions) else meta["desc_size"]
+
+    def _index_dates(self, rows, days):
+        """Add rows starting at position rows to the sorted date index.
+
+        Rows dated on or after the latest indexed date (the usual case) are
+        appended; back-dated rows are merged into place.
+        """
+        days = np.asarray(days, dtype=np.int64)
+        order = np.argsort(days, kind="stable")
+        new_days, new_order = days[order], rows + order
+        days_path, order_path = self._path("date_days"), self._path("date_order")
+        indexed = os.path.getsize(days_path) // 8
+
+        if indexed != rows or os.path.getsize(order_path) // 8 != rows:
+            # Left over from an interrupted sync: re-sort everything.
+            all_days = np.fromfile(self._path("days"), dtype=np.int64)[: rows + len(days)]
+            order = np.argsort(all_days, kind="stable")
+            self._replace(days_path, all_days[order])
+            self._replace(order_path, order)
+            return
+        if len(days) == 0:
+            return
+
+        with open(days_path, "r+b") as days_file:
+            if indexed:
+                days_file.seek(-8, os.SEEK_END)
+                latest = np.frombuffer(days_file.read(8), dtype=np.int64)[0]
+            if not indexed or new_days[0] >= latest:
+                days_file.seek(0, os.SEEK_END)
+                days_file.write(new_days.tobytes())
+                with open(order_path, "ab") as order_file:
+                    order_file.write(new_order.tobytes())
+                return
+
+        sorted_days = np.fromfile(days_path, dtype=np.int64)
+        at = np.searchsorted(sorted_days, new_days, side="right")
+        self._replace(order_path, np.insert(np.fromfile(order_path, dtype=np.int64), at, new_order))
+        self._replace(days_path, np.insert(sorted_days, at, new_days))
+
+    @staticmethod
+    def _replace(path, values):
+        """Atomically overwrite a column file."""
+        with atomic_write(path) as f:
+            np.asarray(values, dtype=np.int64).tofile(f)
+
+    # -------------------- READ --------------------
+    def columns(self):
+        """Return {name: array} for every live row, edits/deletes applied."""
+        meta = self.sync()
+        rows = meta["rows"]
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=(rows,))
+        columns["desc_start"] = np.concatenate(
+            (np.zeros(1, dtype=np.int64), columns["desc_end"])
+        )[:-1]
+
+        changes = self.store.pending_changes()
+        if changes:
+            columns = self._apply_changes(columns, changes, meta)
+        columns["by_date"] = tuple(
+            np.memmap(self._path(name), dtype=np.int64, mode="r", shape=(rows,))
+            if rows
+            else np.empty(0, dtype=np.int64)
+            for name in DATE_INDEX
+        )
+        metrics.add(rows=len(columns["id"]))
+        return columns, meta
+
+    def _apply_changes(self, columns, changes, meta):
+        """Overlay write-log updates and deletions on the base columns."""
+        columns = {name: np.array(values) for name, values in columns.items()}
+        changed_ids = np.fromiter(changes, dtype=np.int64)
+        positions = np.searchsorted(columns["id"], changed_ids)
+        found = positions < len(columns["id"])
+        found[found] &= columns["id"][positions[found]] == changed_ids[found]
+
+        keep = np.ones(len(columns["id"]), dtype=bool)
+        overrides = {}
+        for txn_id, position, exists in zip(changed_ids, positions, found):
+            txn = changes[int(txn_id)]
+            if not exists:
+                continue
+            if txn is None:
+                keep[position] = False
+                continue
+            row = {
+                "days": NA if txn.date is None else (txn.date - EPOCH).days,
+                "cents": to_minor(txn.amount),
+                "type": self._code(meta, "types", txn.type),
+                "category": self._code(meta, "categories", txn.category),
+                "method": self._code(meta, "methods", txn.payment_method),
+            }
+            for name, value in row.items():
+                columns[name][position] = value
+            overrides[int(position)] = txn.description
+
+        for name in columns:
+            columns[name] = columns[name][keep]
+        # Descriptions of edited rows, keyed by their position after deletions.
+        new_positions = np.cumsum(keep) - 1
+        columns["overrides"] = {
+            int(new_positions[p]): d for p, d in overrides.items() if keep[p]
+        }
+        # Lets range_positions() map date-index entries to these positions.
+        columns["remap"] = (keep, new_positions, np.array(sorted(overrides), dtype=np.int64))
+        return columns
+
+    @staticmethod
+    def _code(meta, dictionary, value):
+        values = meta[dictionary]
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    def range_positions(self, columns, start=None, end=None):
+        """Return positions, in ledger order, of rows dated within [start, end].
+
+        start and end are days since the epoch; None leaves that side open.
+        Rows without a valid date are never included.
+        """
+        low = NA + 1 if start is None else start
+        high = np.iinfo(np.int64).max if end is None else end
+        sorted_days, order = columns["by_date"]
+        lo = np.searchsorted(sorted_days, low, side="left")
+        hi = np.searchsorted(sorted_days, high, side="right")
+        positions = np.sort(order[lo:hi])
+
+        if "remap" in columns:
+            # The index describes the base file: drop deleted and edited rows,
+            # then re-check edited rows against their new dates.
+            keep, new_positions, edited = columns["remap"]
+            positions = positions[keep[positions] & ~np.isin(positions, edited)]
+            edited = new_positions[edited[keep[edited]]]
+            days = columns["days"][edited]
+            positions = np.union1d(
+                new_positions[positions], edited[(days >= low) & (days <= high)]
+            )
+        return positions
+
+    def descriptions(self, positions, columns=None):
+        """Decode descriptions for the given row positions only."""
+        columns = columns or self._columns
+        overrides = columns.get("overrides", {})
+        result = []
+        with open(self._path("desc"), "rb") as f:
+            for position in positions:
+                if position in overrides:
+                    result.append(overrides[position])
+                    continue
+                f.seek(columns["desc_start"][position])
+                size = columns["desc_end"][position] - columns["desc_start"][position]
+                result.append(f.read(size).decode("utf-8"))
+        return result
+
+    def to_frame(self, with_description=False, start=None, end=None):
+        """Build a report DataFrame straight from the column arrays.
+
+        Amount holds integer minor units (nullable Int64), so sums and
+        group totals are exact; format them with money.format_minor().
+
+        With a start and/or end date, only rows dated in that range are
+        read, found through the date index; the frame is then indexed by
+        row position.
+        """
+        columns, meta = self.columns()
+        self._columns = columns
+        if start is None and end is None:
+            positions = np.arange(len(columns["id"]))
+        else:
+            positions = self.range_positions(
+                columns,
+                None if start is None else (start - EPOCH).days,
+                None if end is None else (end - EPOCH).days,
+            )
+        # NA is the int64 minimum, which is exactly how NumPy stores NaT.
+        dates = np.asarray(columns["days"][positions]).astype("datetime64[D]")
+
+        frame = pd.DataFrame(
+            {
+                "ID": columns["id"][positions],
+                "Date": pd.to_datetime(dates),
+                "Type": _categorical(columns["type"][positions], meta["types"]),
+                "Category": _categorical(columns["category"][positions], meta["categories"]),
+                "Amount": minor_array(columns["cents"][positions]),
+                "Payment Method": _categorical(columns["method"][positions], meta["methods"]),
+            },
+            index=positions,
+        )
+        if with_description:
+            frame["Description"] = self.descriptions(positions, columns)
+        return frame
+
+
+def _categorical(codes, dictionary):
+    """Build a pandas Categorical whose categories sort like plain strings."""
+    values = pd.Categorical.from_codes(codes, dictionary)
+    return values.reorder_categories(sorted(dictionary))
+
+
+def _first_line(path):
+    """Return the raw bytes of the header line."""
+    with open(path, "rb") as f:
+        return f.readline()
@@ -0,0 +1,249 @@
+import json
+import os
+from datetime import date, timedelta
+import pandas as pd
+from . import metrics
+from .file_lock import atomic_write
+from .money import NA, precision, to_minor
+
+CUBE_FILE = "cube.json"
+# Cell coordinates, in key order. Months are "YYYY-MM" ("" for undated rows).
+DIMENSIONS = ("month", "type", "category", "method")
+MEASURES = ["sum", "count", "min", "max"]
+
+
+def month_key(day):
+    """Return the cube month of a date ("" for None)."""
+    return "" if day is None else f"{day.year:04d}-{day.month:02d}"
+
+
+def month_range(month):
+    """Return the first and last day of a "YYYY-MM" month."""
+    first = date.fromisoformat(month + "-01")
+    return first, (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+
+def check_dimensions(by, where):
+    """Raise ValueError for dimension names the cube doesn't have."""
+    unknown = (set(by) | set(where)) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}. Use {', '.join(DIMENSIONS)}.")
+
+
+def rollup_frame(by, rows):
+    """Build the result of rollup() from (*key, sum, count, min, max) rows."""
+    frame = pd.DataFrame(rows, columns=[*by, *MEASURES])
+    frame[MEASURES] = frame[MEASURES].astype("int64")
+    if by:
+        frame = frame.set_index(list(by)).sort_index()
+    return frame
+
+
+class Cube:
+    """Rollup of one ledger's amounts, persisted in cube.json.
+
+    Every (month, type, category, payment method) combination present in
+    the ledger is one cell holding the sum, count, min and max of its
+    amounts in minor units (rows with an unreadable amount are left out).
+    Writes through the TransactionStore update the touched cells; only
+    removing a cell's smallest or largest amount reads the ledger, for
+    that month. Slices and drill-downs combine cells, so they cost time
+    proportional to the number of cells, not transactions.
+
+    Changes are applied in memory and saved on flush(); a saved cube whose
+    stamp no longer matches the ledger is rebuilt.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.path = os.path.join(os.path.dirname(store.csv_path), CUBE_FILE)
+        self._cells = None  # (month, type, category, method) -> [sum, count, min, max]
+        self._stamp = None
+        self._dirty = False
+        store.add_listener(self)
+
+    # -------------------- PERSISTENCE --------------------
+    def _current(self, stamp):
+        """Make sure the in-memory cells describe the ledger at the given stamp."""
+        if self._cells is not None and self._stamp == stamp:
+            return True
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            if tuple(saved["stamp"]) == stamp and saved.get("precision", 2) == precision():
+                self._cells = {tuple(cell[:4]): cell[4:] for cell in saved["cells"]}
+                self._stamp, self._dirty = stamp, False
+                return True
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+            pass
+        self._cells = None
+        return False
+
+    def flush(self):
+        """Save the cube if it changed since it was last written."""
+        if self._cells is None or not self._dirty:
+            return
+        with atomic_write(self.path, "w") as f:
+            json.dump(
+                {
+                    "stamp": self._stamp,
+                    "precision": precision(),
+                    "cells": [[*key, *cell] for key, cell in self._cells.items()],
+                },
+                f,
+            )
+        self._dirty = False
+
+    def cells(self):
+        """Return the up-to-date cells, rebuilding them if they drifted."""
+        with self.store._lock:
+            current = self._current(self.store.state_stamp())
+            metrics.cache("cube", hit=current)
+            if not current:
+                self.rebuild()
+            return self._cells
+
+    # -------------------- INCREMENTAL UPDATES --------------------
+    @staticmethod
+    def _key(txn):
+        return month_key(txn.date), txn.type, txn.category, txn.payment_method
+
+    def _add(self, txn):
+        units = to_minor(txn.amount)
+        if units == NA:
+            return
+        cell = self._cells.get(self._key(txn))
+        if cell is None:
+            self._cells[self._key(txn)] = [units, 1, units, units]
+        else:
+            cell[0] += units
+            cell[1] += 1
+            cell[2] = min(cell[2], units)
+            cell[3] = max(cell[3], units)
+
+    def _remove(self, txn):
+        """Take a row out of its cell; False if the cell can't have held it (the cube drifted)."""
+        units = to_minor(txn.amount)
+        if units == NA:
+            return True
+        key = self._key(txn)
+        cell = self._cells.get(key)
+        if cell is None:
+            return False
+        cell[0] -= units
+        cell[1] -= 1
+        if cell[1] <= 0:
+            del self._cells[key]
+            return cell[1] == 0 and cell[0] == 0
+        if units in (cell[2], cell[3]):
+            extremes = self._extremes(key)
+            if extremes is None:
+                return False
+            cell[2], cell[3] = extremes
+        return True
+
+    def _extremes(self, key):
+        """Return the (min, max) amount of a cell, read from the ledger as it is now (None if empty)."""
+        month, t_type, category, method = key
+        if month:
+            frame = self.store.frame(start=month_range(month)[0], end=month_range(month)[1])
+        else:
+            frame = self.store.frame()
+            frame = frame[frame["Date"].isna()]
+        amounts = frame.loc[
+            (frame["Type"] == t_type) & (frame["Category"] == category) & (frame["Payment Method"] == method),
+            "Amount",
+        ].dropna()
+        if amounts.empty:
+            return None
+        return int(amounts.min()), int(amounts.max())
+
+    def _changed(self, before, add=(), remove=()):
+        if not self._current(before):
+            return
+        for txn in remove:
+            if not self._remove(txn):
+                # The cells had drifted from the ledger. The write itself has
+                # already happened, so rather than fail it, drop the cells;
+                # the saved stamp no longer matches, so the next read rebuilds.
+                self._cells = None
+                return
+        for txn in add:
+            self._add(txn)
+        self._stamp = self.store.state_stamp()
+        self._dirty = True
+
+    def on_append(self, before, transactions):
+        self._changed(before, add=transactions)
+
+    def on_update(self, before, old, new):
+        self._changed(before, add=[new], remove=[old])
+
+    def on_delete(self, before, old):
+        self._changed(before, remove=[old])
+
+    def on_compact(self, before):
+        self._changed(before)
+
+    # -------------------- REBUILD / VERIFY --------------------
+    def _compute(self):
+        """Compute the cells from scratch with one groupby over the ledger."""
+        frame = self.store.frame()
+        frame = frame[frame["Amount"].notna()]
+        months = frame["Date"].dt.strftime("%Y-%m").fillna("")
+        grouped = frame["Amount"].groupby(
+            [months, frame["Type"], frame["Category"], frame["Payment Method"]], observed=True
+        ).agg(MEASURES)
+        return {key: [int(v) for v in values] for key, values in zip(grouped.index, grouped.to_numpy())}
+
+    def rebuild(self):
+        """Recompute every cell from the ledger and save the cube."""
+        with self.store._lock:
+            stamp = self.store.state_stamp()
+            self._cells = self._compute()
+            self._stamp, self._dirty = stamp, True
+            self.flush()
+
+    def verify(self):
+        """Return the keys of cells that drifted from the ledger."""
+        with self.store._lock:
+            saved, actual = self.cells(), self._compute()
+        return sorted(key for key in set(saved) | set(actual) if saved.get(key) != actual.get(key))
+
+    # -------------------- QUERIES --------------------
+    def rollup(self, by=(), start=None, end=None, **where):
+        """Combine cells into sum, count, min and max per distinct value of `by`.
+
+        :param by: dimensions to group by, e.g. ("month", "category");
+            none gives a single row of grand totals
+        :param start: first "YYYY-MM" month to include
+        :param end: last "YYYY-MM" month to include (with either bound,
+            undated rows are left out)
+        :param where: dimension=value (or a list of values) to keep, e.g.
+            type="Expense"; values match exactly
+
+        Returns a DataFrame of minor units indexed by the `by` dimensions.
+        """
+        check_dimensions(by, where)
+        wanted = [
+            (DIMENSIONS.index(name), {value} if isinstance(value, str) else set(value))
+            for name, value in where.items()
+        ]
+        positions = [DIMENSIONS.index(name) for name in by]
+        combined = {}
+        for key, (total, count, low, high) in self.cells().items():
+            month = key[0]
+            if (start or end) and (not month or (start and month < start) or (end and month > end)):
+                continue
+            if any(key[i] not in values for i, values in wanted):
+                continue
+            group = tuple(key[i] for i in positions)
+            cell = combined.get(group)
+            if cell is None:
+                combined[group] = [total, count, low, high]
+            else:
+                cell[0] += total
+                cell[1] += count
+                cell[2] = min(cell[2], low)
+                cell[3] = max(cell[3], high)
+        return rollup_frame(by, [(*group, *cell) for group, cell in combined.items()])
@@ -1,53 +1,32 @@
-from decimal import Decimal
-import csv
+import os
 from datetime import datetime
+from .metrics import timed
+from .transaction_store import open_store
 
 
 class Dashboard:
     """Display a simple user dashboard/profile overview."""
 
-    def __init__(self, username, user_csv_path):
+    def __init__(self, username, user_csv_path, store=None):
         self.username = username
         self.user_csv_path = user_csv_path
+        self.store = store or open_store(os.path.dirname(user_csv_path))
 
-    def _read_transactions(self):
-        """Read all transactions from the user's CSV file."""
-        try:
-            with open(self.user_csv_path, "r") as f:
-                return list(csv.DictReader(f))
-        except Exception:
-            return []
-
+    @timed
     def show_dashboard(self):
         """Display profile info, financial summary, and rent reminder."""
-        rows = self._read_transactions()
-        total_income = Decimal("0.00")
-        total_expense = Decimal("0.00")
-        rent_found = False
-
-        # --- Calculate totals and check for Rent expense ---
-        for row in rows:
-            try:
-                amount = Decimal(row["Amount"])
-                t_type = row["Type"].strip().lower()
-                category = row["Category"].strip().lower()
-
-                if t_type == "income":
-                    total_income += amount
-                elif t_type == "expense":
-                    total_expense += amount
-                    if category == "rent":
-                        rent_found = True
-            except Exception:
-                continue
-
+        # --- Totals and Rent flag come from the running aggregates ---
+        aggregates = self.store.aggregates
+        total_income = aggregates.total("Income")
+        total_expense = aggregates.total("Expense")
+        rent_found = aggregates.has_rent()
         balance = total_income - total_expense
 
         # --- Display Dashboard ---
         print("\n📊 --- User Dashboard ---")
         print(f"👤 Username: {self.username}")
         print(f"📅 Joined On: {datetime.now().strftime('%Y-%m-%d')}")
-        print(f"🧾 Total Transactions: {len(rows)}")
+        print(f"🧾 Total Transactions: {aggregates.count()}")
         print(f"💰 Total Income:  +{total_income}")
         print(f"💸 Total Expense: -{total_expense}")
         print(f"💵 Net Balance:   {balance}")
@@ -59,9 +38,10 @@ class Dashboard:
         print("-------------------------------")
 
         # --- Show last 3 transactions ---
-        if rows:
+        recent = self.store.last(3)
+        if recent:
             print("🕒 Recent Transactions:")
-            for row in rows[-3:]:
+            for row in recent:
                 print(f"  {row['Date']} | {row['Type']} | {row['Category']} | {row['Amount']}")
         else:
             print("No transactions yet.")
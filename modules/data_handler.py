@@ -1,66 +1,175 @@
 import json
 import os
 import csv
+import sqlite3
+from .file_lock import BUSY_TIMEOUT, FileLock
+from .metrics import timed
 
 USERS_FILE = "users.json"
+USERS_DB = "users.db"
 DATABASE_DIR = "database"
 
 
 class DataHandler:
+    """Stores user accounts and creates per-user data folders.
+
+    Accounts live in an SQLite database keyed by the lowercased name, so a
+    login or duplicate-name check is a single indexed lookup and adding a
+    user is a single insert. A users.json left by older versions is
+    imported on first start and renamed to users.json.migrated.
+    """
+
     def __init__(self):
         self.user_file = USERS_FILE
+        self.user_db = USERS_DB
         self.database_dir = DATABASE_DIR
+        self._conn = None
         try:
             self.ensure_files_exist()
         except Exception as e:
             print(f"Error initializing data handler: {e}")
 
+    @timed
     def ensure_files_exist(self):
         """Create files and directories if they don't exist"""
         if not os.path.exists(self.database_dir):
             os.makedirs(self.database_dir)
-        if not os.path.exists(self.user_file):
-            with open(self.user_file, "w") as f:
-                json.dump({"users": []}, f, indent=4)
+        self._connect()
+        if os.path.exists(self.user_file):
+            # Two processes starting at once must not both import the file.
+            with FileLock(self.user_db + ".lock"):
+                if os.path.exists(self.user_file):
+                    self._migrate_json()
 
-    def load_users(self):
-        """Load users safely and recover from corruption"""
+    # -------------------- USER DATABASE --------------------
+    def _connect(self):
+        # Concurrent registrations queue on SQLite's write lock for up to BUSY_TIMEOUT.
+        conn = sqlite3.connect(self.user_db, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS users (
+                    user_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL UNIQUE,
+                    password TEXT NOT NULL
+                )"""
+            )
+        except sqlite3.DatabaseError:
+            conn.close()
+            print("User database corrupted — recreating it.")
+            os.replace(self.user_db, self.user_db + ".corrupt")
+            return self._connect()
+        self._conn = conn
+
+    def _migrate_json(self):
+        """Import the users of an old users.json, then set the file aside."""
         try:
             with open(self.user_file, "r") as file:
-                data = json.load(file)
-        except FileNotFoundError:
-            print("User file not found — creating a new one.")
-            data = {"users": []}
-            self.save_data(data)
-        except json.JSONDecodeError:
-            print("User file corrupted — recreating it.")
-            data = {"users": []}
-            self.save_data(data)
-        return data
+                users = json.load(file).get("users", [])
+        except (json.JSONDecodeError, AttributeError):
+            print("User file corrupted — skipping migration.")
+            users = []
+        with self._conn:
+            # The first of several case-insensitively equal names wins,
+            # matching the order the old linear scan checked them in.
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+                [(u["user_id"], u["name"], u["name"].lower(), u["password"]) for u in users],
+            )
+        os.replace(self.user_file, self.user_file + ".migrated")
+        print(f"Migrated {len(users)} users from {self.user_file} to {self.user_db}.")
+
+    @staticmethod
+    def _row_to_dict(row):
+        return {"user_id": row[0], "name": row[1], "password": row[2]}
 
+    @timed
+    def find_user(self, name):
+        """Return the user dict whose name matches case-insensitively, or None."""
+        row = self._conn.execute(
+            "SELECT user_id, name, password FROM users WHERE name_key = ?",
+            (name.lower(),),
+        ).fetchone()
+        return None if row is None else self._row_to_dict(row)
+
+    @timed
+    def add_user(self, user_data):
+        """Insert one user dict. Returns False if the name is already taken."""
+        try:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO users VALUES (?, ?, ?, ?)",
+                    (
+                        user_data["user_id"],
+                        user_data["name"],
+                        user_data["name"].lower(),
+                        user_data["password"],
+                    ),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    @timed
+    def update_password(self, user_id, password_hash):
+        """Replace the stored password hash of a user."""
+        with self._conn:
+            self._conn.execute("UPDATE users SET password = ? WHERE user_id = ?", (password_hash, user_id))
+
+    @timed
+    def load_users(self):
+        """Load every user as {"users": [...]}, in registration order"""
+        rows = self._conn.execute(
+            "SELECT user_id, name, password FROM users ORDER BY rowid"
+        ).fetchall()
+        return {"users": [self._row_to_dict(row) for row in rows]}
+
+    @timed
     def save_data(self, data):
-        """Save users to JSON file"""
+        """Replace all users with the given {"users": [...]} data"""
         try:
-            with open(self.user_file, "w") as file:
-                json.dump(data, file, indent=4)
+            with self._conn:
+                self._conn.execute("DELETE FROM users")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)",
+                    [
+                        (u["user_id"], u["name"], u["name"].lower(), u["password"])
+                        for u in data["users"]
+                    ],
+                )
         except Exception as e:
             print(f"Error saving data: {e}")
 
+    def user_dir(self, user_id, username):
+        """Return the data folder of a user."""
+        return os.path.join(self.database_dir, f"{username}_{user_id[:8]}".replace(" ", "_"))
+
+    @timed
     def create_user_csv(self, user_id, username):
-        """create a dedicated directory and csv file for the user."""
+        """create a dedicated directory and ledger file (CSV or SQLite) for the user."""
+        # Imported here: the ledger code loads NumPy, which login doesn't need.
+        from .transaction_store import STORAGE_BACKEND, open_store
+
         try:
-            safe_username = username.replace(" ", "_")
-            user_folder = f"{safe_username}_{user_id[:8]}"
-            user_dir = os.path.join(self.database_dir, user_folder)
+            user_dir = self.user_dir(user_id, username)
             os.makedirs(user_dir, exist_ok=True)
 
+            if STORAGE_BACKEND == "sqlite":
+                store = open_store(user_dir, "sqlite")
+                store.close()
+                print(f"Created user data folder and database at: {store.path}")
+                return store.path
+
             csv_filepath = os.path.join(user_dir, "transactions.csv")
 
-            if not os.path.exists(csv_filepath):
-                with open(csv_filepath, "w", newline="") as csvfile:
+            try:
+                # "x" fails instead of truncating a file another process just created.
+                with open(csv_filepath, "x", newline="") as csvfile:
                     writer = csv.writer(csvfile)
                     writer.writerow(
                         [
+                            "ID",
                             "Date",
                             "Type",
                             "Category",
@@ -70,7 +179,7 @@ class DataHandler:
                         ]
                     )
                 print(f"Created user data folder and CSV at: {csv_filepath}")
-            else:
+            except FileExistsError:
                 print(f"CSV already exists for user: {csv_filepath}")
             return csv_filepath
         except Exception as e:
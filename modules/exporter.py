@@ -0,0 +1,366 @@
+"""Export a ledger as CSV, JSON Lines or Parquet, optionally compressed or incremental."""
+
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from .file_lock import atomic_write
+from .money import NA, from_minor, precision, to_minor
+from .transaction_store import HEADERS, CSVTransactionStore
+
+FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet"}
+# Streaming compressions for CSV and JSON Lines (Parquet compresses internally).
+COMPRESSIONS = {"gzip": ".gz", "lzma": ".xz"}
+# Parquet codec for each compression option (None: Parquet's usual default).
+PARQUET_CODECS = {None: "snappy", "gzip": "gzip"}
+# Filters accepted besides the date range (see TransactionStore.filter_ids).
+FILTERS = ["t_type", "category", "min_amount", "max_amount", "payment_method"]
+EXPORT_STATE_FILE = "export_state.json"
+# Rows fetched, encoded and written per batch; bounds the exporter's memory.
+CHUNK_SIZE = 50_000
+# Bytes per read when copying the ledger file as is.
+COPY_BLOCK = 1 << 20
+
+
+class ExportResult:
+    """What one export run wrote, and how fast."""
+
+    def __init__(self, path):
+        self.path = path  # None for an incremental export that found nothing new
+        self.rows = 0
+        self.bytes_written = 0  # size of the file written
+        self.seconds = 0.0
+        self.raw = False  # True if the ledger file was copied without decoding rows
+        self.first_id = None
+        self.last_id = None
+        self.watermark = None  # highest ID exported so far under this export's name
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self):
+        return self.bytes_written / 2**20 / self.seconds if self.seconds else 0.0
+
+
+def _copy(source, target, size):
+    """Copy size bytes from the start of source to target, in the kernel where possible."""
+    if isinstance(target, io.BufferedWriter) and hasattr(os, "sendfile"):
+        target.flush()
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(target.fileno(), source.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            target.seek(0, os.SEEK_END)
+            return
+        except OSError:
+            if offset:
+                raise
+            # e.g. macOS, whose sendfile only writes to sockets
+
+    source.seek(0)
+    remaining = size
+    while remaining:
+        block = source.read(min(COPY_BLOCK, remaining))
+        if not block:
+            break
+        target.write(block)
+        remaining -= len(block)
+
+
+class Exporter:
+    """Streams a TransactionStore to a file in fixed-size chunks.
+
+    A whole-ledger CSV export of a CSV ledger with no pending edits is the
+    ledger file itself, so it is copied (with os.sendfile where available)
+    or fed straight into the compressor without parsing a row. Every other
+    export fetches CHUNK_SIZE rows at a time through the store, encodes
+    them and writes them before fetching the next, so memory stays bounded
+    whatever the ledger size. Files are written through atomic_write.
+
+    Incremental exports only include rows added since the last export of
+    the same name: the highest exported ID is kept in export_state.json in
+    the export folder. IDs grow with every add, so edits and deletions of
+    rows already exported are not picked up. Unless given a path, each one
+    is named after the IDs it holds (transactions_<first>-<last>.<ext>), so
+    no increment overwrites another, and one that finds nothing new writes
+    no file.
+    """
+
+    def __init__(self, store, export_dir, chunk_size=CHUNK_SIZE):
+        """
+        :param store: TransactionStore to export
+        :param export_dir: folder for default file names and export_state.json
+        :param chunk_size: rows per batch
+        """
+        self.store = store
+        self.export_dir = export_dir
+        self.chunk_size = chunk_size
+        self.state_path = os.path.join(export_dir, EXPORT_STATE_FILE)
+
+    # -------------------- WATERMARKS --------------------
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def watermark(self, name="default"):
+        """Return the highest ID exported under name (0 if none yet)."""
+        return self._load_state().get(name, {}).get("watermark", 0)
+
+    def _save_watermark(self, name, watermark, path):
+        state = self._load_state()
+        path = path or state.get(name, {}).get("path")  # the last file written, if this run wrote none
+        state[name] = {"watermark": watermark, "path": path, "exported_at": datetime.now().isoformat(timespec="seconds")}
+        with atomic_write(self.state_path, "w") as f:
+            json.dump(state, f, indent=2)
+
+    # -------------------- RUN --------------------
+    def default_path(self, fmt="csv", compression=None, ids=None):
+        """Return exports/transactions_export.<ext>, or transactions_<first>-<last>.<ext> for an ID range."""
+        stem = "transactions_export" if ids is None else f"transactions_{ids[0]}-{ids[1]}"
+        return os.path.join(self.export_dir, stem + FORMATS[fmt] + COMPRESSIONS.get(compression, ""))
+
+    def run(
+        self,
+        path=None,
+        fmt="csv",
+        compression=None,
+        start_date=None,
+        end_date=None,
+        incremental=False,
+        name="default",
+        progress=None,
+        **filters,
+    ):
+        """Export the ledger, returning an ExportResult.
+
+        :param path: file to write (default: default_path(), named after
+            the exported IDs for incremental exports)
+        :param fmt: "csv", "jsonl" or "parquet" (needs pyarrow)
+        :param compression: None, "gzip" or "lzma" ("gzip" only for Parquet)
+        :param start_date: first "YYYY-MM-DD" date to include
+        :param end_date: last "YYYY-MM-DD" date to include
+        :param incremental: only export rows added since the last
+            incremental export under name, then advance its watermark
+        :param name: watermark to use for incremental exports
+        :param progress: optional callable given the ExportResult after each chunk
+        :param filters: t_type, category, min_amount, max_amount and
+            payment_method, as for TransactionStore.filter_ids
+
+        Any date or filter selects through the store's filters, which leave
+        out rows whose date or amount can't be read. Raises ValueError for
+        an unknown format, compression or filter, an invalid filter value,
+        or Parquet without pyarrow.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}. Choose from: {', '.join(FORMATS)}")
+        if fmt == "parquet" and compression not in PARQUET_CODECS:
+            raise ValueError("Parquet exports support gzip compression only.")
+        if fmt != "parquet" and compression not in (None, *COMPRESSIONS):
+            raise ValueError(f"Unknown compression {compression!r}. Choose from: {', '.join(COMPRESSIONS)}")
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        criteria = {k: v for k, v in filters.items() if v not in (None, "")}
+        if start_date:
+            criteria["start_date"] = start_date
+        if end_date:
+            criteria["end_date"] = end_date
+
+        named_by_ids = incremental and path is None
+        if named_by_ids:
+            # The IDs are known once written; until then write to a name no
+            # other export uses.
+            os.makedirs(self.export_dir, exist_ok=True)
+            handle, path = tempfile.mkstemp(
+                FORMATS[fmt] + COMPRESSIONS.get(compression, ""), ".export-", self.export_dir
+            )
+            os.close(handle)
+        else:
+            path = path or self.default_path(fmt, compression)
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        result = ExportResult(path)
+        started = time.perf_counter()
+        after = self.watermark(name) if incremental else 0
+
+        try:
+            copied = fmt == "csv" and not criteria and not after and self._copy_ledger(path, compression, result)
+            if copied:
+                if progress is not None:
+                    progress(result)
+            else:
+                chunks = self._chunks(criteria, after)
+                if fmt == "parquet":
+                    self._write_parquet(path, compression, chunks, result, progress)
+                else:
+                    self._write_text(path, fmt, compression, chunks, result, progress)
+        except BaseException:
+            if named_by_ids:
+                os.remove(path)
+            raise
+
+        result.seconds = time.perf_counter() - started
+        result.bytes_written = os.path.getsize(path)
+        if named_by_ids:
+            if result.rows:
+                result.path = self.default_path(fmt, compression, (result.first_id, result.last_id))
+                os.replace(path, result.path)
+            else:
+                os.remove(path)
+                result.path = None
+        if incremental:
+            result.watermark = max(after, result.last_id or 0)
+            self._save_watermark(name, result.watermark, result.path)
+        return result
+
+    # -------------------- SELECTION --------------------
+    def _chunks(self, criteria, after):
+        """Yield lists of Transactions to export, in ID order, CHUNK_SIZE at a time."""
+        store = self.store
+        if criteria:
+            ids = np.asarray(store.filter_ids(**criteria), dtype=np.int64)
+            ids = ids[ids > after]
+            for start in range(0, len(ids), self.chunk_size):
+                yield store.get_many(ids[start : start + self.chunk_size].tolist())
+            return
+        position = store.id_position(after) if after else 0
+        while True:
+            chunk = store.page(position, self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+            position += len(chunk)
+
+    # -------------------- RAW COPY --------------------
+    def _copy_ledger(self, path, compression, result):
+        """Copy a CSV ledger's file as the export; False if it can't stand in for one."""
+        store = self.store
+        if not isinstance(store, CSVTransactionStore):
+            return False
+        with store._lock.shared():
+            store.refresh_index()  # assigns IDs to hand-added rows first
+            if store.pending_changes():
+                return False
+            source = open(store.csv_path, "rb")
+            size = os.fstat(source.fileno()).st_size
+            result.rows = store.count()
+            if result.rows:
+                result.first_id, result.last_id = store.page(0, 1)[0].id, store.last(1)[0].id
+        # A compaction replaces the file rather than changing it, and
+        # appends only add to its end, so the first size bytes read from
+        # this handle are the ledger as it was under the lock.
+        with source, atomic_write(path, "wb") as f:
+            if compression is None:
+                _copy(source, f, size)
+            else:
+                with self._compressor(f, compression) as out:
+                    _copy(source, out, size)
+        result.raw = True
+        return True
+
+    # -------------------- STREAMING --------------------
+    @staticmethod
+    def _compressor(f, compression):
+        """Wrap a binary file in a streaming compressor (closing it leaves f open)."""
+        if compression == "gzip":
+            return gzip.GzipFile(fileobj=f, mode="wb", mtime=0)
+        return lzma.LZMAFile(f, "wb")
+
+    def _write_text(self, path, fmt, compression, chunks, result, progress):
+        """Write CSV or JSON Lines, compressing on the fly."""
+        with atomic_write(path, "wb") as f:
+            out = self._compressor(f, compression) if compression else f
+            text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=False)
+            try:
+                if fmt == "csv":
+                    writer = csv.writer(text)
+                    writer.writerow(HEADERS)
+                for chunk in chunks:
+                    if fmt == "csv":
+                        writer.writerows(txn.to_row() for txn in chunk)
+                    else:
+                        text.write("".join(_json_line(txn) for txn in chunk))
+                    self._advance(result, chunk, progress)
+            finally:
+                # Flush into the compressor (and the compressor into f)
+                # without closing f, which atomic_write still needs.
+                text.flush()
+                text.detach()
+                if out is not f:
+                    out.close()
+
+    def _write_parquet(self, path, compression, chunks, result, progress):
+        """Write a Parquet file, one row group per chunk."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow).")
+
+        digits = precision()
+        schema = pa.schema(
+            [
+                ("ID", pa.int64()),
+                ("Date", pa.date32()),
+                ("Type", pa.dictionary(pa.int32(), pa.string())),
+                ("Category", pa.dictionary(pa.int32(), pa.string())),
+                ("Amount", pa.decimal128(18, digits)),
+                ("Payment Method", pa.dictionary(pa.int32(), pa.string())),
+                ("Description", pa.string()),
+            ]
+        )
+        with atomic_write(path, "wb") as f:
+            writer = pq.ParquetWriter(f, schema, compression=PARQUET_CODECS[compression])
+            try:
+                for chunk in chunks:
+                    # Unreadable dates and amounts become nulls.
+                    columns = [
+                        [txn.id for txn in chunk],
+                        [txn.date for txn in chunk],
+                        [txn.type for txn in chunk],
+                        [txn.category for txn in chunk],
+                        [_exact_amount(txn) for txn in chunk],
+                        [txn.payment_method for txn in chunk],
+                        [txn.description for txn in chunk],
+                    ]
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+                    ))
+                    self._advance(result, chunk, progress)
+            finally:
+                writer.close()
+
+    @staticmethod
+    def _advance(result, chunk, progress):
+        if chunk:
+            result.rows += len(chunk)
+            result.first_id = result.first_id or chunk[0].id
+            result.last_id = chunk[-1].id
+        if progress is not None:
+            progress(result)
+
+
+def _exact_amount(txn):
+    """Return an amount rounded half up to the currency's decimals, as reports see it (None if unreadable)."""
+    units = to_minor(txn.amount)
+    return None if units == NA else from_minor(units)
+
+
+def _json_line(txn):
+    """Encode a transaction as one JSON object keyed by the CSV headers (amounts as exact strings)."""
+    row = dict(zip(HEADERS, txn.to_row()))
+    row["ID"] = txn.id
+    return json.dumps(row, ensure_ascii=False) + "\n"
@@ -0,0 +1,131 @@
+"""Advisory file locks shared across processes, and atomic file replacement.
+
+Every process and thread touching a ledger takes its FileLock: readers a
+shared lock, writers an exclusive one (fcntl.flock on a .lock file next to
+the data). Time spent waiting for locks is added to LOCK_STATS. Where
+fcntl is unavailable (Windows) the lock only serializes threads of one
+process.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Seconds an SQLite connection waits for another process's write lock.
+BUSY_TIMEOUT = 30
+# Process-wide lock metrics: acquisitions, seconds spent waiting, longest wait.
+LOCK_STATS = {"acquired": 0, "wait_seconds": 0.0, "max_wait": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _record_wait(seconds):
+    with _stats_lock:
+        LOCK_STATS["acquired"] += 1
+        LOCK_STATS["wait_seconds"] += seconds
+        LOCK_STATS["max_wait"] = max(LOCK_STATS["max_wait"], seconds)
+
+
+class FileLock:
+    """Reentrant shared/exclusive lock on path, for threads and processes.
+
+    `with lock:` takes it exclusively, `with lock.shared():` shared. Threads
+    of one process always take turns (so the lock also replaces a
+    threading.RLock); processes holding it shared run side by side. Taking
+    it exclusively while holding it shared upgrades it until the outermost
+    release. The upgrade is not atomic: another writer may get in between,
+    so callers re-check what they read before writing.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: lock file to use (created if missing; never removed).
+            It is only held open while the lock is.
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+        self._owner = None
+
+    @property
+    def held_exclusive(self):
+        """True if the calling thread holds the lock exclusively."""
+        return self._exclusive and self._owner == threading.get_ident()
+
+    def _flock(self, exclusive):
+        if fcntl is None:
+            return
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def acquire(self, exclusive=True):
+        start = time.perf_counter()
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                self._flock(exclusive)
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                self._flock(True)
+                self._exclusive = True
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth += 1
+        self._owner = threading.get_ident()
+        _record_wait(time.perf_counter() - start)
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            self._exclusive = False
+            if self._fd is not None:
+                os.close(self._fd)  # closing drops the flock
+                self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire(exclusive=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @contextmanager
+    def shared(self):
+        self.acquire(exclusive=False)
+        try:
+            yield self
+        finally:
+            self.release()
+
+
+@contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    """Write path through a unique temp file that replaces it only once complete.
+
+    Readers see the old file or the new one, never a partial write, and
+    concurrent writers can't clobber each other's temp files.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,102 @@
+from datetime import datetime
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, InvalidOperation
+import numpy as np
+from .columnar_cache import EPOCH, NA
+from .money import precision
+
+
+def _days(date_str):
+    """Parse YYYY-MM-DD into days since the epoch (ValueError if invalid)."""
+    try:
+        return (datetime.strptime(date_str, "%Y-%m-%d").date() - EPOCH).days
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+
+
+def _minor(amount, rounding):
+    """Parse an amount bound into integer minor units (ValueError if invalid).
+
+    Stored amounts never have more decimals than the currency keeps (entry
+    and import reject them), so rounding a minimum up and a maximum down
+    selects the same rows as comparing the exact Decimals.
+    """
+    try:
+        value = Decimal(amount)
+    except InvalidOperation:
+        raise ValueError("Invalid amount. Please enter a valid number.")
+    if not value.is_finite():
+        raise ValueError("Invalid amount. Please enter a valid number.")
+    return int(value.scaleb(precision()).to_integral_value(rounding=rounding)), value
+
+
+class FilterEngine:
+    """Evaluates transaction filters as NumPy masks over the columnar cache."""
+
+    def __init__(self, cache):
+        """
+        :param cache: ColumnarCache of the ledger to filter
+        """
+        self.cache = cache
+
+    def compile(
+        self,
+        t_type=None,
+        category=None,
+        start_date=None,
+        end_date=None,
+        min_amount=None,
+        max_amount=None,
+        payment_method=None,
+    ):
+        """Turn filter values into a date range and a list of (column, test) predicates.
+
+        The date range is a (start, end) pair of days since the epoch, None
+        where open. Blank filters produce no predicate at all. Raises
+        ValueError for an unparseable date or amount.
+        """
+        predicates = []
+
+        def equals_ignoring_case(column, dictionary, value):
+            wanted = value.lower()
+
+            def test(values, meta):
+                codes = [i for i, v in enumerate(meta[dictionary]) if v.lower() == wanted]
+                return np.isin(values, codes)
+
+            predicates.append((column, test))
+
+        if t_type:
+            equals_ignoring_case("type", "types", t_type)
+        if category:
+            equals_ignoring_case("category", "categories", category)
+        if payment_method:
+            equals_ignoring_case("method", "methods", payment_method)
+        date_range = (
+            _days(start_date) if start_date else None,
+            _days(end_date) if end_date else None,
+        )
+        if min_amount:
+            low, value = _minor(min_amount, ROUND_CEILING)
+            if value:  # a zero minimum never filtered anything
+                predicates.append(("cents", lambda values, meta: values >= low))
+        if max_amount:
+            high, value = _minor(max_amount, ROUND_FLOOR)
+            if value:
+                predicates.append(("cents", lambda values, meta: values <= high))
+        return date_range, predicates
+
+    def filter_ids(self, **criteria):
+        """Return the IDs (in ledger order) of rows matching every filter."""
+        (start, end), predicates = self.compile(**criteria)
+        columns, meta = self.cache.columns()
+        # Rows whose date or amount can't be read never match a filter. A
+        # date range is looked up in the sorted date index, so only the rows
+        # inside it are tested further.
+        if start is None and end is None:
+            positions = np.flatnonzero(columns["days"] != NA)
+        else:
+            positions = self.cache.range_positions(columns, start, end)
+        positions = positions[columns["cents"][positions] != NA]
+        for column, test in predicates:
+            positions = positions[test(columns[column][positions], meta)]
+        return columns["id"][positions]
@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+import re
+import zipfile
+from collections import Counter
+import numpy as np
+from . import metrics
+from .file_lock import atomic_write
+from .money import NA, precision, to_minor
+from .transaction_store import EPOCH
+
+FINGERPRINTS_FILE = "fingerprints.npz"
+# Bloom filter sizing: bits per expected entry and number of probes
+# (about a 1% false-positive rate).
+BITS_PER_ENTRY = 10
+PROBES = 7
+MIN_CAPACITY = 1024
+# Batches smaller than this are hashed without pandas (single adds and edits).
+FACTORIZE_THRESHOLD = 1000
+
+_PRIME = np.uint64(0x100000001B3)
+_LOOSE = re.compile(r"[^0-9a-z]+")
+
+
+def _hash_strings(values):
+    """Stable 64-bit hash of each string (hashed once per distinct value)."""
+    if len(values) < FACTORIZE_THRESHOLD:
+        hashes = {v: _hash(v) for v in values}
+        return np.fromiter((hashes[v] for v in values), dtype=np.uint64, count=len(values))
+    import pandas as pd
+
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    hashes = np.fromiter(map(_hash, uniques), dtype=np.uint64, count=len(uniques))
+    return hashes[codes]
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _mix(*parts):
+    """Combine equally long uint64/int64 arrays into one hash per row."""
+    h = np.full(len(parts[0]), 0xCBF29CE484222325, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for part in parts:
+            h = (h ^ np.asarray(part).astype(np.uint64)) * _PRIME
+            h ^= h >> np.uint64(29)
+    return h
+
+
+def fingerprint_columns(days, cents, types, categories, methods, descriptions):
+    """Return (exact, near) fingerprints as uint64 arrays.
+
+    exact covers every field as stored; near only date, type, amount and
+    the description with case, spaces and punctuation ignored, so the same
+    payment entered with a different category or spelling still matches.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    cents = np.asarray(cents, dtype=np.int64)
+    type_hash = _hash_strings(types)
+    exact = _mix(
+        days,
+        cents,
+        type_hash,
+        _hash_strings(categories),
+        _hash_strings(methods),
+        _hash_strings(descriptions),
+    )
+    loose = [_LOOSE.sub("", d.lower()) for d in descriptions]
+    near = _mix(days, cents, type_hash, _hash_strings(loose))
+    return exact, near
+
+
+def fingerprint_transactions(transactions):
+    """Fingerprint Transaction objects the same way as the stored columns."""
+    return fingerprint_columns(
+        [NA if t.date is None else (t.date - EPOCH).days for t in transactions],
+        [to_minor(t.amount) for t in transactions],
+        [t.type for t in transactions],
+        [t.category for t in transactions],
+        [t.payment_method for t in transactions],
+        [t.description for t in transactions],
+    )
+
+
+class BloomFilter:
+    """Fixed-size bit array answering "definitely absent" for most new keys."""
+
+    def __init__(self, capacity):
+        self.capacity = max(capacity, MIN_CAPACITY)
+        self.size = self.capacity * BITS_PER_ENTRY
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        low, high = keys & np.uint64(0xFFFFFFFF), keys >> np.uint64(32)
+        probes = np.arange(PROBES, dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            return (low + probes * (high | np.uint64(1))) % np.uint64(self.size)
+
+    @staticmethod
+    def _split(positions):
+        """Return the byte index and bit mask of each bit position."""
+        masks = np.left_shift(np.uint8(1), (positions & np.uint64(7)).astype(np.uint8))
+        return (positions >> np.uint64(3)).astype(np.intp), masks
+
+    def add(self, keys):
+        index, masks = self._split(self._positions(keys).ravel())
+        np.bitwise_or.at(self.bits, index, masks)
+
+    def might_contain(self, keys):
+        index, masks = self._split(self._positions(keys))
+        return (self.bits[index] & masks).astype(bool).all(axis=0)
+
+
+class FingerprintIndex:
+    """Content fingerprints of every transaction, for duplicate detection.
+
+    Maps exact and near fingerprints to the IDs carrying them, behind a
+    Bloom filter so rows that are certainly new never touch the maps. Kept
+    up to date as a store listener and saved to fingerprints.npz on
+    flush(); rebuilt from the columnar cache when its stamp is stale.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.path = os.path.join(os.path.dirname(store.csv_path), FINGERPRINTS_FILE)
+        self._stamp = None
+        self._exact = None  # fingerprint -> list of IDs
+        self._near = None
+        self._ids = None  # ID -> (exact, near), to undo on edit/delete
+        self._bloom = None
+        self._dirty = False
+        store.add_listener(self)
+
+    # -------------------- PERSISTENCE --------------------
+    def _current(self, stamp):
+        """Make sure the in-memory index describes the ledger at the given stamp."""
+        if self._exact is not None and self._stamp == stamp:
+            return True
+        try:
+            with np.load(self.path, allow_pickle=False) as saved:
+                meta = json.loads(str(saved["meta"]))
+                if tuple(meta["stamp"]) == stamp and meta["precision"] == precision():
+                    bloom = BloomFilter(meta["bloom_capacity"])
+                    bloom.bits = saved["bloom"]
+                    self._exact, self._near, self._ids = {}, {}, {}
+                    self._index(saved["ids"].tolist(), saved["exact"], saved["near"])
+                    self._bloom = bloom
+                    self._stamp = stamp
+                    self._dirty = False
+                    return True
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        self._exact = None
+        return False
+
+    def flush(self):
+        """Save the index if it changed since it was last written.
+
+        Only the (ID, exact, near) rows and the Bloom filter bits are
+        stored; replaying the rows in the same order rebuilds the maps with
+        their postings in the same order.
+        """
+        if self._exact is None or not self._dirty:
+            return
+        keys = np.array(list(self._ids.values()), dtype=np.uint64).reshape(-1, 2)
+        meta = {"stamp": self._stamp, "precision": precision(), "bloom_capacity": self._bloom.capacity}
+        with atomic_write(self.path) as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                ids=np.fromiter(self._ids, dtype=np.int64, count=len(self._ids)),
+                exact=keys[:, 0],
+                near=keys[:, 1],
+                bloom=self._bloom.bits,
+            )
+        self._dirty = False
+
+    def rebuild(self):
+        """Fingerprint every transaction from scratch using the columnar cache."""
+        stamp = self.store.state_stamp()
+        cache = self.store.cache
+        columns, meta = cache.columns()
+
+        def strings(column, dictionary):
+            return np.asarray(meta[dictionary], dtype=object)[columns[column]]
+
+        exact, near = fingerprint_columns(
+            columns["days"],
+            columns["cents"],
+            strings("type", "types"),
+            strings("category", "categories"),
+            strings("method", "methods"),
+            cache.descriptions(range(len(columns["id"])), columns),
+        )
+        self._exact, self._near, self._ids = {}, {}, {}
+        self._bloom = BloomFilter(4 * len(exact))
+        self._add(columns["id"].tolist(), exact, near)
+        self._stamp = stamp
+        self._dirty = True
+        self.flush()
+
+    def _ensure(self):
+        current = self._current(self.store.state_stamp())
+        metrics.cache("fingerprints", hit=current)
+        if not current:
+            self.rebuild()
+
+    # -------------------- INCREMENTAL UPDATES --------------------
+    def _add(self, ids, exact, near):
+        # Both kinds of key share one filter, sized in keys (two per row);
+        # it is rebuilt twice as large once it fills up.
+        keys_needed = 2 * (len(self._ids) + len(ids))
+        if keys_needed > self._bloom.capacity:
+            self._bloom = BloomFilter(2 * keys_needed)
+            keys = list(self._exact) + list(self._near)
+            self._bloom.add(np.array(keys, dtype=np.uint64))
+        self._bloom.add(np.concatenate((exact, near)))
+        self._index(ids, exact, near)
+
+    def _index(self, ids, exact, near):
+        for txn_id, e, n in zip(ids, exact.tolist(), near.tolist()):
+            self._exact.setdefault(e, []).append(txn_id)
+            self._near.setdefault(n, []).append(txn_id)
+            self._ids[txn_id] = (e, n)
+
+    def _remove(self, txn_id):
+        # Bloom filters can't forget; a stale bit only costs a map lookup.
+        keys = self._ids.pop(txn_id, None)
+        if keys is None:
+            return
+        for postings, key in zip((self._exact, self._near), keys):
+            postings[key].remove(txn_id)
+            if not postings[key]:
+                del postings[key]
+
+    def _changed(self, before, add=(), remove=()):
+        if not self._current(before):
+            return
+        for txn in remove:
+            self._remove(txn.id)
+        if add:
+            exact, near = fingerprint_transactions(add)
+            self._add([txn.id for txn in add], exact, near)
+        self._stamp = self.store.state_stamp()
+        self._dirty = True
+
+    def on_append(self, before, transactions):
+        self._changed(before, add=transactions)
+
+    def on_update(self, before, old, new):
+        self._changed(before, add=[new], remove=[old])
+
+    def on_delete(self, before, old):
+        self._changed(before, remove=[old])
+
+    def on_compact(self, before):
+        self._changed(before)
+
+    # -------------------- QUERIES --------------------
+    def match(self, transactions, since=None):
+        """Find existing rows duplicating each of the given transactions.
+
+        Returns one entry per transaction: ("exact", ID), ("near", ID) or
+        None. Exact matches are counted like a multiset: a row already in
+        the ledger only excuses one incoming copy, so a batch holding the
+        same payment twice needs two matching rows to be fully skipped.
+        Near matches are only reported for rows with no exact twin at all.
+
+        :param since: optional first ID added by the caller itself; rows
+            from that ID on are the caller's own and don't count as existing
+        """
+        if not transactions:
+            return []
+        return self.match_fingerprints(*fingerprint_transactions(transactions), since=since)
+
+    def match_fingerprints(self, exact, near, since=None):
+        """match() for fingerprints already computed by fingerprint_transactions()."""
+        with self.store._lock:
+            self._ensure()
+            maybe_exact = self._bloom.might_contain(exact)
+            maybe_near = self._bloom.might_contain(near)
+            return match_keys(
+                exact,
+                near,
+                lambda i, key: self._exact.get(key, ()) if maybe_exact[i] else (),
+                lambda i, key: self._near.get(key, ()) if maybe_near[i] else (),
+                since,
+            )
+
+
+def match_keys(exact, near, exact_ids, near_ids, since=None):
+    """Shared matching rules of FingerprintIndex.match() for any backend.
+
+    exact_ids(i, key) / near_ids(i, key) return the IDs (oldest first)
+    carrying the i-th row's exact or near fingerprint.
+    """
+    used = Counter()
+    result = []
+    for i, (e, n) in enumerate(zip(exact.tolist(), near.tolist())):
+        ids = exact_ids(i, e)
+        if ids:
+            if since is not None:
+                # Edits re-append IDs, so postings aren't always in ID order.
+                existing = [txn_id for txn_id in ids if txn_id < since]
+            else:
+                existing = ids
+            if len(existing) - used[e] > 0:
+                result.append(("exact", existing[used[e]]))
+                used[e] += 1
+            else:
+                result.append(None)  # a genuine repeat of the same payment
+            continue
+        ids = near_ids(i, n)
+        result.append(("near", ids[-1]) if ids else None)
+    return result
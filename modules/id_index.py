@@ -0,0 +1,126 @@
+import os
+import struct
+import numpy as np
+from .file_lock import atomic_write
+
+# Header: format version, CSV inode, CSV size, log size. The sizes tell us
+# whether the CSV or log were changed by something that did not update us.
+HEADER = struct.Struct("<4q")
+SLOT = struct.Struct("<q")
+VERSION = 1
+
+MISSING = -1
+
+
+def in_log(offset):
+    """Encode a write-log byte offset as an index value."""
+    return -(offset + 2)
+
+
+def log_offset(value):
+    """Decode an index value produced by in_log()."""
+    return -value - 2
+
+
+class IdIndex:
+    """Fixed-width sidecar mapping transaction ID -> byte offset.
+
+    Slot N (for ID N + 1) holds an int64: a byte offset into transactions.csv
+    when >= 0, MISSING for deleted/unknown IDs, or an in_log() value when the
+    current version of the row lives in the write log. Looking up an ID is a
+    single seek, no matter how large the ledger is.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    # -------------------- HEADER --------------------
+    def stamp(self):
+        """Return the (csv inode, csv size, log size) the index was built for."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        version, ino, csv_size, log_size = HEADER.unpack(data)
+        if version != VERSION:
+            return None
+        return ino, csv_size, log_size
+
+    def set_stamp(self, stamp):
+        """Record the file state the index is now in sync with."""
+        with open(self.path, "r+b") as f:
+            f.write(HEADER.pack(VERSION, *stamp))
+
+    # -------------------- SLOTS --------------------
+    def max_id(self):
+        """Return the highest ID that was ever assigned."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        return max(0, (size - HEADER.size) // SLOT.size)
+
+    def lookup(self, txn_id):
+        """Return the index value stored for an ID (MISSING if none)."""
+        if txn_id < 1:
+            return MISSING
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(HEADER.size + (txn_id - 1) * SLOT.size)
+                data = f.read(SLOT.size)
+        except FileNotFoundError:
+            return MISSING
+        if len(data) < SLOT.size:
+            return MISSING
+        return SLOT.unpack(data)[0]
+
+    def lookup_many(self, txn_ids):
+        """Return the index values of several IDs with one open file."""
+        values = []
+        try:
+            with open(self.path, "rb") as f:
+                for txn_id in txn_ids:
+                    if txn_id < 1:
+                        values.append(MISSING)
+                        continue
+                    f.seek(HEADER.size + (txn_id - 1) * SLOT.size)
+                    data = f.read(SLOT.size)
+                    values.append(SLOT.unpack(data)[0] if len(data) == SLOT.size else MISSING)
+        except FileNotFoundError:
+            return [MISSING] * len(txn_ids)
+        return values
+
+    def live_ids(self):
+        """Return the IDs that currently hold a row, ascending (their ledger order)."""
+        try:
+            slots = np.fromfile(self.path, dtype="<i8", offset=HEADER.size)
+        except FileNotFoundError:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(slots != MISSING) + 1
+
+    def set(self, txn_id, value):
+        """Store the value for an existing or new ID."""
+        self.set_range(txn_id, [value])
+
+    def set_range(self, first_id, values):
+        """Store values for consecutive IDs starting at first_id."""
+        with open(self.path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            end_slot = (f.tell() - HEADER.size) // SLOT.size
+            if first_id - 1 > end_slot:
+                # Fill the gap left by IDs that were never written.
+                f.write(SLOT.pack(MISSING) * (first_id - 1 - end_slot))
+            f.seek(HEADER.size + (first_id - 1) * SLOT.size)
+            f.write(b"".join(SLOT.pack(v) for v in values))
+
+    def rebuild(self, entries, max_id, stamp):
+        """Atomically replace the index with {id: value} entries."""
+        slots = [MISSING] * max_id
+        for txn_id, value in entries.items():
+            slots[txn_id - 1] = value
+        with atomic_write(self.path) as f:
+            f.write(HEADER.pack(VERSION, *stamp))
+            f.write(struct.pack(f"<{max_id}q", *slots))
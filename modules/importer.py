@@ -0,0 +1,256 @@
+import csv
+import os
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import numpy as np
+import pandas as pd
+from .fingerprints import fingerprint_transactions
+from .money import fits_precision, precision
+from .transaction_manager import PAYMENT_METHODS, TRANSACTION_TYPES
+from .transaction_store import HEADERS, Transaction
+
+# Rows read, validated and written per batch; bounds the importer's memory.
+CHUNK_SIZE = 50_000
+# Plain decimals, which float parsing reads exactly like Decimal does.
+SIMPLE_NUMBER = r"[+-]?(?:\d+\.?\d*|\.\d+)"
+
+
+def _valid_date(value):
+    """Scalar fallback with the same rule as TransactionManager._validate_date."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _valid_amount(value):
+    """Scalar fallback for the number part of TransactionManager._validate_amount."""
+    try:
+        return Decimal(value) >= 0
+    except (InvalidOperation, ValueError):
+        return False
+
+
+def _fits_precision(value):
+    """Scalar fallback for the decimals part of TransactionManager._validate_amount."""
+    try:
+        return fits_precision(Decimal(value))
+    except (InvalidOperation, ValueError):
+        return False
+
+
+def validate(frame):
+    """Check a chunk of stripped string columns in bulk.
+
+    Applies the rules of TransactionManager's _validate_date, _validate_type,
+    non-empty category, _validate_amount and _validate_payment_method, in
+    the order add_transaction asks for the fields. Returns (reasons,
+    dates): the rejection reason of every row ("" when valid) and the
+    parsed dates.
+    """
+    dates = pd.to_datetime(frame["Date"], format="%Y-%m-%d", errors="coerce")
+    # strptime also accepts forms like 2024-1-5 that the fast path may not.
+    for i in np.flatnonzero(dates.isna().to_numpy() & (frame["Date"] != "").to_numpy()):
+        parsed = _valid_date(frame["Date"].iat[i])
+        if parsed is not None:
+            dates.iat[i] = parsed
+
+    amounts = frame["Amount"]
+    digits = precision()
+    simple = amounts.str.fullmatch(SIMPLE_NUMBER).to_numpy()
+    valid_amount = np.zeros(len(frame), dtype=bool)
+    valid_amount[simple] = pd.to_numeric(amounts[simple]).to_numpy() >= 0
+    # Amounts are kept in whole minor units, so more decimals (other than
+    # trailing zeros) would be rounded away.
+    exact_amount = np.zeros(len(frame), dtype=bool)
+    exact_amount[simple] = amounts[simple].str.fullmatch(rf"[+-]?\d*(?:\.\d{{0,{digits}}}0*)?").to_numpy()
+    for i in np.flatnonzero(~simple):
+        valid_amount[i] = _valid_amount(amounts.iat[i])
+        exact_amount[i] = _fits_precision(amounts.iat[i])
+
+    reasons = np.select(
+        [
+            dates.isna().to_numpy(),
+            ~frame["Type"].str.lower().isin(TRANSACTION_TYPES).to_numpy(),
+            (frame["Category"] == "").to_numpy(),
+            ~valid_amount,
+            ~exact_amount,
+            ~frame["Payment Method"].str.lower().isin(PAYMENT_METHODS).to_numpy(),
+        ],
+        [
+            "invalid date",
+            "invalid type",
+            "empty category",
+            "invalid amount",
+            f"more than {digits} decimals",
+            "invalid payment method",
+        ],
+        default="",
+    )
+    return reasons, dates
+
+
+class ImportResult:
+    """Counts and timing of one import run."""
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0  # invalid rows
+        self.duplicates = 0  # exact copies of existing rows, skipped
+        self.possible_duplicates = 0  # near matches, imported anyway
+        self.seconds = 0.0
+        self.reject_path = None
+        self.rejected_rows = []  # rejected rows plus reason, when no reject file is used
+        # IDs assigned to the imported rows; rows other writers add during
+        # the run may also fall in this range.
+        self.first_id = None
+        self.last_id = None
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+
+class CSVImporter:
+    """Streams a CSV file into a TransactionStore in fixed-size chunks.
+
+    Each chunk is validated as a whole, its valid rows are appended in one
+    write and fsync (which also updates the store's indexes and totals),
+    and its rejected rows are written to a reject file with a Reason
+    column. Rows that exactly duplicate a transaction already in the
+    ledger are skipped and land in the reject file too. Only one chunk is
+    held in memory at a time.
+    """
+
+    def __init__(self, store, chunk_size=CHUNK_SIZE, skip_duplicates=True):
+        """
+        :param store: TransactionStore receiving the imported rows
+        :param chunk_size: rows per batch
+        :param skip_duplicates: skip rows identical to existing transactions
+        """
+        self.store = store
+        self.chunk_size = chunk_size
+        self.skip_duplicates = skip_duplicates
+
+    def run(self, source, reject_path, progress=None):
+        """Import source, returning an ImportResult.
+
+        :param reject_path: where rejected rows go; only created if needed
+        :param progress: optional callable given the ImportResult after each chunk
+        """
+        # utf-8-sig drops the byte order mark Excel puts before "Date".
+        with open(source, "r", encoding="utf-8-sig", newline="") as infile:
+            reader = csv.reader(infile)
+            header = [name.strip() for name in next(reader, [])]
+            return self.run_rows(header, reader, reject_path, progress)
+
+    def run_rows(self, header, rows, reject_path=None, progress=None):
+        """Import an iterable of string lists laid out as header, returning an ImportResult.
+
+        :param reject_path: where rejected rows go; if None they are kept in
+            ImportResult.rejected_rows instead
+        :param progress: optional callable given the ImportResult after each chunk
+        """
+        result = ImportResult()
+        start = time.perf_counter()
+        rejects = None
+        try:
+            for chunk in self._chunks(rows):
+                valid, sources, rejected = self._process(header, chunk)
+                result.rejected += len(rejected)
+                if self.skip_duplicates and valid:
+                    valid = self._skip_duplicates(valid, sources, rejected, result)
+                if rejected and reject_path is None:
+                    result.rejected_rows.extend(rejected)
+                elif rejected:
+                    if rejects is None:
+                        rejects = self._open_rejects(reject_path, header)
+                        result.reject_path = reject_path
+                    rejects[1].writerows(rejected)
+                if valid:
+                    self.store.append(valid, keep_in_memory=False)
+                    result.first_id = result.first_id or valid[0].id
+                    result.last_id = valid[-1].id
+                result.read += len(chunk)
+                result.imported += len(valid)
+                result.seconds = time.perf_counter() - start
+                if progress:
+                    progress(result)
+        finally:
+            if rejects is not None:
+                rejects[0].close()
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _chunks(self, reader):
+        chunk = []
+        for row in reader:
+            if not row:
+                continue  # blank line, skipped like csv.DictReader does
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _open_rejects(path, header):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(path, "w", encoding="utf-8", newline="")
+        writer = csv.writer(f)
+        writer.writerow(header + ["Reason"])
+        return f, writer
+
+    def _process(self, header, chunk):
+        """Split one chunk into (transactions, their source rows, reject rows)."""
+        width = len(header)
+        rejected = [row + ["wrong number of fields"] for row in chunk if len(row) > width]
+        rows = [row + [""] * (width - len(row)) for row in chunk if len(row) <= width]
+        if not rows:
+            return [], [], rejected
+
+        frame = pd.DataFrame(rows, columns=header, dtype=object)
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        for name in HEADERS[1:]:  # IDs are assigned by this ledger
+            frame[name] = frame[name].str.strip() if name in frame.columns else ""
+        reasons, dates = validate(frame)
+
+        bad = np.flatnonzero(reasons != "")
+        rejected.extend(rows[i] + [reasons[i]] for i in bad)
+        ok = reasons == ""
+        transactions = [
+            Transaction(date, t_type, category, Decimal(amount), method, description)
+            for date, t_type, category, amount, method, description in zip(
+                dates[ok].dt.date,
+                frame["Type"][ok].str.capitalize(),
+                frame["Category"][ok].str.capitalize(),
+                frame["Amount"][ok],
+                frame["Payment Method"][ok].str.title(),
+                frame["Description"][ok],
+            )
+        ]
+        return transactions, [rows[i] for i in np.flatnonzero(ok)], rejected
+
+    def _skip_duplicates(self, transactions, sources, rejected, result):
+        """Drop rows that exactly duplicate existing transactions.
+
+        Skipped rows are added to rejected; near matches are only counted.
+        Rows earlier chunks of this run added don't count as existing, so a
+        file repeating the same payment isn't treated as duplicating itself.
+        Returns the transactions to append.
+        """
+        exact, near = fingerprint_transactions(transactions)
+        matches = self.store.fingerprints.match_fingerprints(exact, near, since=result.first_id)
+        kept = []
+        for txn, source, match in zip(transactions, sources, matches):
+            if match is not None and match[0] == "exact":
+                rejected.append(source + [f"duplicate of ID {match[1]}"])
+                result.duplicates += 1
+                continue
+            if match is not None:
+                result.possible_duplicates += 1
+            kept.append(txn)
+        return kept
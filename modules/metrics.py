@@ -0,0 +1,346 @@
+"""Operation timing and I/O metrics, switched on at runtime.
+
+Set PFM_PROFILE=1 (or run `python main.py --profile`) to record, for every
+public TransactionManager, ReportsManager, Dashboard and DataHandler
+operation:
+
+  * a latency histogram (calls, errors, total and maximum seconds),
+  * rows scanned and bytes read and written by the stores and caches
+    while it ran (nested operations count toward their callers too),
+  * hit/miss counts of the derived-data caches (running totals, cube,
+    search and duplicate indexes, column files),
+
+plus the ledger lock metrics of file_lock.LOCK_STATS. snapshot() returns
+them as a dict; write_snapshot() saves JSON or, for a .prom path,
+Prometheus text. PFM_PROFILE_OUTPUT names a file the snapshot is written
+to at exit (and turns metrics on). PFM_CPROFILE=<dir> also runs cProfile over each top-level
+operation and saves one <operation>.prof per operation name there
+(inspect with `python -m pstats`).
+
+When off, a wrapped operation costs one global check and the counting
+hooks return at once. Operations that prompt for input include the time
+spent waiting for the user.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from .file_lock import LOCK_STATS, atomic_write
+
+# Upper bounds (seconds) of the latency histogram buckets; a +Inf bucket follows.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNTERS = ("rows", "bytes_read", "bytes_written")
+
+_enabled = False
+_output = None
+_cprofile_dir = None
+_operations = {}  # name -> stats dict
+_caches = {}  # name -> [hits, misses]
+_totals = dict.fromkeys(COUNTERS, 0)  # counted outside any operation too
+_profiles = {}  # operation name -> cProfile.Profile
+_profiling = False  # only one cProfile.Profile can run at a time
+_registry_lock = threading.Lock()
+_local = threading.local()
+_atexit_registered = False
+
+
+def enabled():
+    """True if metrics are being recorded."""
+    return _enabled
+
+
+def enable(output=None, cprofile_dir=None):
+    """Start recording metrics.
+
+    :param output: file to write the snapshot to at exit (.prom for
+        Prometheus text, anything else for JSON)
+    :param cprofile_dir: folder to save a cProfile trace per operation in
+    """
+    global _enabled, _output, _cprofile_dir, _atexit_registered
+    _output = output or _output
+    _cprofile_dir = cprofile_dir or _cprofile_dir
+    if _cprofile_dir:
+        os.makedirs(_cprofile_dir, exist_ok=True)
+    if not _atexit_registered:
+        atexit.register(_at_exit)
+        _atexit_registered = True
+    _enabled = True
+
+
+def disable():
+    """Stop recording metrics (what was recorded is kept)."""
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _registry_lock:
+        _operations.clear()
+        _caches.clear()
+        _profiles.clear()
+        for name in COUNTERS:
+            _totals[name] = 0
+
+
+# -------------------- RECORDING --------------------
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _new_operation():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "seconds": 0.0,
+        "max_seconds": 0.0,
+        "buckets": [0] * (len(BUCKETS) + 1),
+        **dict.fromkeys(COUNTERS, 0),
+    }
+
+
+def _start_profile(name):
+    global _profiling
+    with _registry_lock:
+        if _profiling:
+            return None
+        _profiling = True
+        profile = _profiles.get(name)
+        if profile is None:
+            import cProfile
+
+            profile = _profiles[name] = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def _stop_profile(profile):
+    global _profiling
+    profile.disable()
+    with _registry_lock:
+        _profiling = False
+
+
+def _record(name, span, seconds, failed):
+    with _registry_lock:
+        stats = _operations.get(name)
+        if stats is None:
+            stats = _operations[name] = _new_operation()
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        position = 0
+        while position < len(BUCKETS) and seconds > BUCKETS[position]:
+            position += 1
+        stats["buckets"][position] += 1
+        for counter in COUNTERS:
+            stats[counter] += span[counter]
+
+
+@contextmanager
+def operation(name):
+    """Time the enclosed block as one call of operation `name`.
+
+    Yields the dict of rows/bytes counted while the block runs (None when
+    metrics are off).
+    """
+    if not _enabled:
+        yield None
+        return
+    stack = _stack()
+    span = dict.fromkeys(COUNTERS, 0)
+    profile = _start_profile(name) if _cprofile_dir and not stack else None
+    stack.append(span)
+    failed = False
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stack.pop()
+        if profile is not None:
+            _stop_profile(profile)
+        _record(name, span, seconds, failed)
+
+
+def timed(func):
+    """Decorator recording each call of func as operation "<Class>.<method>"."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with operation(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def add(rows=0, bytes_read=0, bytes_written=0):
+    """Count rows scanned and bytes read/written toward the running operations."""
+    if not _enabled:
+        return
+    for span in _stack():
+        span["rows"] += rows
+        span["bytes_read"] += bytes_read
+        span["bytes_written"] += bytes_written
+    with _registry_lock:
+        _totals["rows"] += rows
+        _totals["bytes_read"] += bytes_read
+        _totals["bytes_written"] += bytes_written
+
+
+def cache(name, hit):
+    """Count a hit (hit=True) or miss of the cache called name."""
+    if not _enabled:
+        return
+    with _registry_lock:
+        counts = _caches.get(name)
+        if counts is None:
+            counts = _caches[name] = [0, 0]
+        counts[0 if hit else 1] += 1
+
+
+# -------------------- REPORTING --------------------
+def _quantile(stats, q):
+    """Estimate a latency quantile as the upper bound of the bucket holding it."""
+    wanted = q * stats["calls"]
+    seen = 0
+    for bound, count in zip(BUCKETS, stats["buckets"]):
+        seen += count
+        if count and seen >= wanted:
+            return min(bound, stats["max_seconds"])
+    return stats["max_seconds"]
+
+
+def snapshot():
+    """Return everything recorded so far as a JSON-serializable dict."""
+    with _registry_lock:
+        operations = {}
+        for name, stats in sorted(_operations.items()):
+            operations[name] = {
+                **{k: v for k, v in stats.items() if k != "buckets"},
+                "mean_seconds": stats["seconds"] / stats["calls"],
+                "p50_seconds": _quantile(stats, 0.5),
+                "p95_seconds": _quantile(stats, 0.95),
+                "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], stats["buckets"])),
+            }
+        caches = {
+            name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            for name, (hits, misses) in sorted(_caches.items())
+        }
+        return {
+            "enabled": _enabled,
+            "operations": operations,
+            "caches": caches,
+            "totals": dict(_totals),
+            "locks": dict(LOCK_STATS),
+        }
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def to_prometheus(snap=None):
+    """Render a snapshot in the Prometheus text exposition format."""
+    snap = snap or snapshot()
+    lines = [
+        "# HELP pfm_operation_seconds Latency of manager operations.",
+        "# TYPE pfm_operation_seconds histogram",
+    ]
+    for name, stats in snap["operations"].items():
+        label = f'operation="{_label(name)}"'
+        cumulative = 0
+        for bound, count in stats["buckets"].items():
+            cumulative += count
+            lines.append(f'pfm_operation_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f"pfm_operation_seconds_sum{{{label}}} {stats['seconds']}")
+        lines.append(f"pfm_operation_seconds_count{{{label}}} {stats['calls']}")
+    for counter in ("errors", *COUNTERS):
+        lines.append(f"# TYPE pfm_operation_{counter}_total counter")
+        for name, stats in snap["operations"].items():
+            lines.append(f'pfm_operation_{counter}_total{{operation="{_label(name)}"}} {stats[counter]}')
+    lines.append("# TYPE pfm_cache_requests_total counter")
+    for name, stats in snap["caches"].items():
+        lines.append(f'pfm_cache_requests_total{{cache="{_label(name)}",result="hit"}} {stats["hits"]}')
+        lines.append(f'pfm_cache_requests_total{{cache="{_label(name)}",result="miss"}} {stats["misses"]}')
+    for counter in COUNTERS:
+        lines.append(f"# TYPE pfm_{counter}_total counter")
+        lines.append(f"pfm_{counter}_total {snap['totals'][counter]}")
+    lines.append("# TYPE pfm_lock_acquired_total counter")
+    lines.append(f"pfm_lock_acquired_total {snap['locks']['acquired']}")
+    lines.append("# TYPE pfm_lock_wait_seconds_total counter")
+    lines.append(f"pfm_lock_wait_seconds_total {snap['locks']['wait_seconds']}")
+    lines.append("# TYPE pfm_lock_max_wait_seconds gauge")
+    lines.append(f"pfm_lock_max_wait_seconds {snap['locks']['max_wait']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path):
+    """Save the snapshot to path: Prometheus text for .prom files, JSON otherwise."""
+    snap = snapshot()
+    with atomic_write(path, "w") as f:
+        if path.endswith(".prom"):
+            f.write(to_prometheus(snap))
+        else:
+            json.dump(snap, f, indent=2)
+
+
+def save_profiles():
+    """Save the cProfile trace of each operation to <cprofile dir>/<operation>.prof."""
+    if not _cprofile_dir:
+        return []
+    with _registry_lock:
+        profiles = list(_profiles.items())
+    paths = []
+    for name, profile in profiles:
+        path = os.path.join(_cprofile_dir, f"{name}.prof")
+        profile.dump_stats(path)
+        paths.append(path)
+    return paths
+
+
+def format_summary(snap=None):
+    """Return a text table of the recorded operations and caches."""
+    snap = snap or snapshot()
+    lines = [
+        f"{'operation':<36} {'calls':>6} {'mean':>9} {'p95':>9} {'max':>9} {'rows':>10} {'read':>10} {'written':>10}"
+    ]
+    for name, stats in snap["operations"].items():
+        lines.append(
+            f"{name:<36} {stats['calls']:>6} {stats['mean_seconds'] * 1000:>7.1f}ms "
+            f"{stats['p95_seconds'] * 1000:>7.1f}ms {stats['max_seconds'] * 1000:>7.1f}ms "
+            f"{stats['rows']:>10,} {stats['bytes_read']:>10,} {stats['bytes_written']:>10,}"
+        )
+    for name, stats in snap["caches"].items():
+        lines.append(f"cache {name:<30} {stats['hits']:>6} hits {stats['misses']:>6} misses ({stats['hit_rate']:.0%})")
+    locks = snap["locks"]
+    lines.append(f"locks: {locks['acquired']} acquired, {locks['wait_seconds']:.3f}s waiting, max {locks['max_wait'] * 1000:.1f}ms")
+    return "\n".join(lines)
+
+
+def _at_exit():
+    if _output:
+        write_snapshot(_output)
+    save_profiles()
+
+
+if (
+    os.environ.get("PFM_PROFILE", "").lower() not in ("", "0", "false", "no")
+    or os.environ.get("PFM_PROFILE_OUTPUT")
+    or os.environ.get("PFM_CPROFILE")
+):
+    enable(os.environ.get("PFM_PROFILE_OUTPUT"), os.environ.get("PFM_CPROFILE"))
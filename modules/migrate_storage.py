@@ -0,0 +1,120 @@
+"""Move user folders from the CSV backend to SQLite.
+
+Usage: python -m modules.migrate_storage [--database-dir DIR] [FOLDER ...]
+
+Every folder (or only the named ones) holding a transactions.csv and no
+transactions.db is converted: IDs are preserved, the row count and every
+row are checked against the CSV, and the CSV is kept as
+transactions.csv.migrated while its derived files are removed.
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import time
+from .aggregates import AGGREGATES_FILE
+from .cube import CUBE_FILE
+from .data_handler import DATABASE_DIR
+from .fingerprints import FINGERPRINTS_FILE
+from .search_index import SEARCH_INDEX_FILE
+from .sqlite_store import SQLiteTransactionStore
+from .transaction_store import CSV_FILE, SQLITE_FILE, CSVTransactionStore
+
+BATCH_SIZE = 50_000
+# Files the CSV backend derives from transactions.csv.
+DERIVED_FILES = ["transactions.log", "transactions.idx", AGGREGATES_FILE, CUBE_FILE, SEARCH_INDEX_FILE, FINGERPRINTS_FILE]
+# Pickled sidecars written by older versions.
+DERIVED_FILES += ["search_index.pkl", "fingerprints.pkl"]
+DERIVED_DIRS = ["cache"]
+
+
+def migrate_folder(user_dir, batch_size=BATCH_SIZE):
+    """Convert one user folder, returning the number of rows copied.
+
+    Raises RuntimeError (leaving the CSV untouched) if the copy doesn't
+    match the source.
+    """
+    csv_path = os.path.join(user_dir, CSV_FILE)
+    db_path = os.path.join(user_dir, SQLITE_FILE)
+    tmp_path = db_path + ".tmp"
+    for path in (tmp_path, tmp_path + "-journal"):
+        if os.path.exists(path):
+            os.remove(path)  # left by an interrupted run
+
+    source = CSVTransactionStore(csv_path)
+    source.compact()  # fold pending log edits into the CSV
+    transactions = source.all()
+    # Build the copy in rollback-journal mode: a WAL copy can leave -wal/-shm
+    # files behind that no longer match the file once it is renamed.
+    target = SQLiteTransactionStore(tmp_path, journal_mode="DELETE")
+    try:
+        for start in range(0, len(transactions), batch_size):
+            target.restore(transactions[start : start + batch_size])
+        copied = target.all()
+        if len(copied) != len(transactions) or any(
+            a.to_row() != b.to_row() for a, b in zip(transactions, copied)
+        ):
+            raise RuntimeError(f"Copy of {csv_path} does not match the original")
+        target.compact()
+    except Exception:
+        target.close()
+        os.remove(tmp_path)
+        raise
+    target.close()
+    source.close()
+
+    os.replace(tmp_path, db_path)
+    # Switch to WAL once, before any store opens the database concurrently.
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+    os.replace(csv_path, csv_path + ".migrated")
+    for name in DERIVED_FILES:
+        path = os.path.join(user_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    for name in DERIVED_DIRS:
+        shutil.rmtree(os.path.join(user_dir, name), ignore_errors=True)
+    return len(transactions)
+
+
+def pending_folders(database_dir, names=None):
+    """Return the user folders still on the CSV backend."""
+    folders = []
+    for name in sorted(names or os.listdir(database_dir)):
+        user_dir = os.path.join(database_dir, name)
+        if os.path.exists(os.path.join(user_dir, CSV_FILE)) and not os.path.exists(
+            os.path.join(user_dir, SQLITE_FILE)
+        ):
+            folders.append(user_dir)
+    return folders
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV user folders to SQLite.")
+    parser.add_argument("folders", nargs="*", help="user folder names (default: all)")
+    parser.add_argument("--database-dir", default=DATABASE_DIR)
+    args = parser.parse_args(argv)
+
+    folders = pending_folders(args.database_dir, args.folders)
+    if not folders:
+        print("Nothing to migrate.")
+        return 0
+    failed = 0
+    for user_dir in folders:
+        start = time.perf_counter()
+        try:
+            rows = migrate_folder(user_dir)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {user_dir}: {e}")
+            continue
+        print(f"✅ {user_dir}: {rows} transactions in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+import functools
+import os
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+import numpy as np
+
+# pandas is imported by the functions that need it, so adding a transaction
+# or drawing the dashboard doesn't pay for loading it.
+
+# Currency of the ledgers; decides how many decimals amounts are kept to.
+CURRENCY = os.environ.get("PFM_CURRENCY", "USD").upper()
+# ISO 4217 minor-unit exponents that differ from the usual two decimals.
+MINOR_UNITS = {
+    "BHD": 3,
+    "CLP": 0,
+    "IQD": 3,
+    "ISK": 0,
+    "JOD": 3,
+    "JPY": 0,
+    "KRW": 0,
+    "KWD": 3,
+    "LYD": 3,
+    "OMR": 3,
+    "TND": 3,
+    "UGX": 0,
+    "VND": 0,
+}
+# Sentinel for amounts that could not be parsed (the int64 minimum).
+NA = np.iinfo(np.int64).min
+_MAX = np.iinfo(np.int64).max
+# Below this magnitude parsing and scaling a float64 err by at most a
+# quarter unit, so one landing within 1e-6 of an integer rounds to it just
+# as the Decimal would. (Up to 2**53 a half-unit tie can land on an integer.)
+_FLOAT_EXACT = 2**50
+
+
+def precision(currency=CURRENCY):
+    """Return the number of decimals kept for a currency."""
+    return MINOR_UNITS.get(currency, 2)
+
+
+def to_minor(amount, currency=CURRENCY):
+    """Convert a Decimal amount to integer minor units, rounding half up.
+
+    Returns NA for a missing, non-finite or out-of-range amount.
+    """
+    if amount is None or not amount.is_finite():
+        return NA
+    units = int(amount.scaleb(precision(currency)).to_integral_value(rounding=ROUND_HALF_UP))
+    return units if -_MAX <= units <= _MAX else NA
+
+
+def fits_precision(amount, currency=CURRENCY):
+    """True if a Decimal amount is finite and has no more decimals than the currency keeps.
+
+    Such amounts convert to minor units without rounding, so totals of them
+    equal the Decimal totals exactly.
+    """
+    if not amount.is_finite():
+        return False
+    scaled = amount.scaleb(precision(currency))
+    return scaled == scaled.to_integral_value()
+
+
+def from_minor(units, currency=CURRENCY):
+    """Convert integer minor units back to an exact Decimal."""
+    return Decimal(int(units)).scaleb(-precision(currency))
+
+
+def parse_minor(amounts, currency=CURRENCY):
+    """Vectorized string -> minor units conversion matching to_minor(Decimal(s)).
+
+    :param amounts: pandas Series of amount strings
+    """
+    import pandas as pd
+
+    scaled = pd.to_numeric(amounts, errors="coerce").to_numpy(dtype=np.float64)
+    scaled = scaled * 10 ** precision(currency)
+    rounded = np.round(scaled)
+    # Values with no more decimals than the currency keeps land within float
+    # error of an integer; anything else (half-unit ties, "1e3 ", garbage,
+    # huge values) goes through Decimal.
+    with np.errstate(invalid="ignore"):
+        exact = (
+            np.isfinite(scaled)
+            & (np.abs(scaled - rounded) < 1e-6)
+            & (np.abs(scaled) < _FLOAT_EXACT)
+        )
+
+    units = np.full(len(amounts), NA, dtype=np.int64)
+    units[exact] = rounded[exact]
+    for i in np.flatnonzero(~exact):
+        try:
+            units[i] = to_minor(Decimal(amounts.iat[i].strip()), currency)
+        except ArithmeticError:
+            pass
+    return units
+
+
+def minor_array(units):
+    """Wrap minor units in a nullable pandas Int64 array with NA entries masked."""
+    import pandas as pd
+
+    units = np.asarray(units, dtype=np.int64)
+    return pd.arrays.IntegerArray(units.copy(), units == NA)
+
+
+def format_minor(units, currency=CURRENCY):
+    """Format an array of minor units (NA or pd.NA for missing) as display strings."""
+    import pandas as pd
+
+    return [
+        "" if pd.isna(u) or u == NA else str(from_minor(u, currency))
+        for u in np.asarray(units, dtype=object)
+    ]
+
+
+@functools.total_ordering
+class Money:
+    """An exact amount of money held as integer minor units.
+
+    Adding, subtracting and comparing stay in integers; str() and format()
+    show the amount with the currency's number of decimals. Compares equal
+    to the Decimal it represents, and to 0.
+    """
+
+    __slots__ = ("units", "currency")
+
+    def __init__(self, units=0, currency=CURRENCY):
+        self.units = int(units)
+        self.currency = currency
+
+    @classmethod
+    def parse(cls, value, currency=CURRENCY):
+        """Create Money from a Decimal, int or string amount (ValueError if invalid)."""
+        try:
+            units = to_minor(Decimal(value), currency)
+        except (InvalidOperation, TypeError, ValueError):
+            units = NA
+        if units == NA:
+            raise ValueError(f"Invalid amount: {value!r}")
+        return cls(units, currency)
+
+    def to_decimal(self):
+        return from_minor(self.units, self.currency)
+
+    def _other_units(self, other):
+        if isinstance(other, Money):
+            if other.currency != self.currency:
+                raise ValueError(f"Cannot combine {self.currency} and {other.currency}")
+            return other.units
+        if other == 0:
+            return 0  # lets sum() start from its default 0
+        return NotImplemented
+
+    def __add__(self, other):
+        units = self._other_units(other)
+        if units is NotImplemented:
+            return units
+        return Money(self.units + units, self.currency)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        units = self._other_units(other)
+        if units is NotImplemented:
+            return units
+        return Money(self.units - units, self.currency)
+
+    def __neg__(self):
+        return Money(-self.units, self.currency)
+
+    def __abs__(self):
+        return Money(abs(self.units), self.currency)
+
+    def __truediv__(self, other):
+        """Money / Money is a float ratio; Money / n is Money rounded half up."""
+        if isinstance(other, Money):
+            return self.units / self._other_units(other)
+        if isinstance(other, np.integer):
+            other = int(other)
+        quotient = Decimal(self.units) / Decimal(other)
+        return Money(quotient.to_integral_value(rounding=ROUND_HALF_UP), self.currency)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.currency == other.currency and self.units == other.units
+        if isinstance(other, (int, Decimal)):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.units < self._other_units(other)
+        if isinstance(other, (int, Decimal)):
+            return self.to_decimal() < other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.to_decimal())
+
+    def __bool__(self):
+        return self.units != 0
+
+    def __str__(self):
+        return str(self.to_decimal())
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec)
+
+    def __repr__(self):
+        return f"Money('{self}', {self.currency!r})"
@@ -1,151 +1,275 @@
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import os
-import csv
+import pandas as pd
+from .exporter import Exporter
+from .importer import CSVImporter
+from .metrics import timed
+from .money import Money, format_minor
+from .transaction_store import open_store
 
 
 class ReportsManager:
-    def __init__(self, user_dir):
+    def __init__(self, user_dir, store=None):
         self.user_dir = user_dir
-        self.csv_path = os.path.join(user_dir, "transactions.csv")
         self.export_dir = os.path.join(user_dir, "exports")
-        os.makedirs(self.export_dir, exist_ok=True)
+        self.store = store or open_store(user_dir)
 
-    # -------------------- EXPORT TO CSV --------------------
+    # -------------------- EXPORT --------------------
+    @timed
     def export_to_csv(self):
-        """Export transactions to a new CSV file for backup or analysis."""
-        if not os.path.exists(self.csv_path):
+        """Export transactions for backup or analysis.
+
+        Prompts for the format (CSV, JSON Lines or Parquet), compression,
+        a date range and whether to export only the rows added since the
+        last incremental export; blank answers export the whole ledger as
+        exports/transactions_export.csv.
+        """
+        if self.store.count() == 0:
             print("❌ No transaction data found to export.")
             return
 
-        export_file = os.path.join(self.export_dir, "transactions_export.csv")
+        fmt = input("Format - csv, jsonl or parquet [csv]: ").strip().lower() or "csv"
+        compression = input("Compression - none, gzip or lzma [none]: ").strip().lower()
+        start_date = input("Start date (YYYY-MM-DD, blank for all): ").strip()
+        end_date = input("End date (YYYY-MM-DD, blank for all): ").strip()
+        incremental = input("Only rows added since the last export? (y/N): ").strip().lower() == "y"
+
+        def progress(result):
+            print(f"\r⏳ {result.rows:,} rows exported...", end="", flush=True)
 
         try:
-            with (
-                open(self.csv_path, "r", encoding="utf-8") as infile,
-                open(export_file, "w", encoding="utf-8", newline="") as outfile,
-            ):
-                reader = csv.reader(infile)
-                writer = csv.writer(outfile)
-                for row in reader:
-                    writer.writerow(row)
-
-            print(f"✅ Transactions successfully exported to: {export_file}")
+            result = Exporter(self.store, self.export_dir).run(
+                fmt=fmt,
+                compression=None if compression in ("", "none") else compression,
+                start_date=start_date,
+                end_date=end_date,
+                incremental=incremental,
+                progress=progress,
+            )
+            print()
+            if result.path is None:
+                print(f"ℹ️ No transactions added since ID {result.watermark}; nothing to export.")
+                return
+            if not result.rows:
+                print("ℹ️ No transactions matched; an empty export was written.")
+            print(f"✅ {result.rows:,} transactions exported to: {result.path}")
+            if result.raw:
+                print("📄 Ledger file copied as is (no rows decoded)")
+            if incremental:
+                print(f"🔖 Next incremental export starts after ID {result.watermark}")
+            print(
+                f"⏱️ {result.bytes_written / 2**20:,.1f} MB in {result.seconds:.2f}s "
+                f"({result.rows_per_second:,.0f} rows/sec, {result.megabytes_per_second:,.1f} MB/s)"
+            )
         except Exception as e:
-            print(f"❌ Error exporting CSV: {e}")
+            print(f"\n❌ Error exporting transactions: {e}")
 
     # -------------------- IMPORT FROM CSV --------------------
+    @timed
     def import_from_csv(self):
-        """Import transactions from a CSV file (must match columns)."""
+        """Import transactions from a CSV file (must match columns).
+
+        Rows are validated with the same rules as manual entry and rows
+        already in the ledger are skipped; both are saved to
+        imports/rejected_<timestamp>.csv with the reason.
+        """
         file_path = input("Enter CSV file path to import: ").strip()
         if not os.path.exists(file_path):
             print("❌ File not found.")
             return
 
+        reject_path = os.path.join(
+            self.user_dir, "imports", f"rejected_{datetime.now():%Y%m%d_%H%M%S}.csv"
+        )
+
+        def progress(result):
+            print(f"\r⏳ {result.read:,} rows processed...", end="", flush=True)
+
         try:
-            with (
-                open(file_path, "r", encoding="utf-8") as infile,
-                open(self.csv_path, "a", encoding="utf-8", newline="") as outfile,
-            ):
-                reader = csv.reader(infile)
-                writer = csv.writer(outfile)
-
-                next(reader, None)  # Skip header if exists
-                for row in reader:
-                    writer.writerow(row)
-
-            print(f"✅ Transactions imported successfully from: {file_path}")
+            result = CSVImporter(self.store).run(file_path, reject_path, progress)
+            if result.read:
+                print()
+            print(f"✅ Imported {result.imported:,} transactions from: {file_path}")
+            if result.duplicates:
+                print(f"🔁 {result.duplicates:,} duplicate rows skipped")
+            if result.possible_duplicates:
+                print(f"🔍 {result.possible_duplicates:,} imported rows look similar to existing ones")
+            if result.rejected:
+                print(f"⚠️ {result.rejected:,} invalid rows skipped")
+            if result.reject_path:
+                print(f"📄 Skipped rows saved to: {result.reject_path}")
+            print(f"⏱️ {result.rows_per_second:,.0f} rows/sec")
         except Exception as e:
-            print(f"❌ Error importing CSV: {e}")
+            print(f"\n❌ Error importing CSV: {e}")
 
-    def load_data(self):
-        try:
-            return pd.read_csv(self.csv_path)
-        except FileNotFoundError:
-            print("No transactions found.")
-            return pd.DataFrame()
+    @timed
+    def load_data(self, with_description=False):
+        """Load transactions as a DataFrame from the store (Amount in integer minor units)."""
+        return self.store.frame(with_description=with_description)
+
+    @staticmethod
+    def _formatted(amounts):
+        """Return a Series of minor units formatted as decimal amounts for printing."""
+        return pd.Series(format_minor(amounts), index=amounts.index, name=amounts.name)
+
+    # -------------------- COMPUTATIONS --------------------
+    # These return data instead of printing so batch jobs can reuse them.
+    # They are answered from the store's rollup cube, so they cost time
+    # proportional to the number of (month, type, category, method) cells.
+    # start and end are dates; the months they fall in are covered whole.
+    @timed
+    def rollup(self, by=(), start=None, end=None, **where):
+        """Return cube totals (sum, count, min, max in minor units) grouped by dimensions.
+
+        See Cube.rollup(); e.g. rollup(("month", "category"), type="Expense")
+        is the expense of each category in each month.
+        """
+        return self.store.cube.rollup(
+            by,
+            None if start is None else f"{start:%Y-%m}",
+            None if end is None else f"{end:%Y-%m}",
+            **where,
+        )
+
+    @timed
+    def summary(self, start=None, end=None):
+        """Return {"transactions", "total", "average"} of the rows with an amount."""
+        # Sums run on integer minor units, so they match the running totals exactly.
+        totals = self.rollup(start=start, end=end)
+        if totals.empty:
+            return {"transactions": 0, "total": Money(), "average": Money()}
+        total, count = int(totals["sum"].iloc[0]), int(totals["count"].iloc[0])
+        return {"transactions": count, "total": Money(total), "average": Money(total) / count}
+
+    @timed
+    def category_totals(self, start=None, end=None):
+        """Return a Series of minor-unit totals per category."""
+        totals = self.rollup(("category",), start, end)["sum"]
+        return totals.rename("Amount").rename_axis("Category")
 
+    @timed
+    def monthly_totals(self, start=None, end=None):
+        """Return a Series of minor-unit totals per month (undated rows left out)."""
+        totals = self.rollup(("month",), start, end)["sum"]
+        totals = totals[totals.index != ""]
+        months = pd.PeriodIndex(totals.index, freq="M", name="Date")
+        return pd.Series(totals.to_numpy(), index=months, name="Amount")
+
+    @staticmethod
+    def health_rating(ratio):
+        """Return (score, comment) for an income/expense ratio."""
+        if ratio > 2:
+            return "🟢 Excellent", "You’re saving a lot — great job!"
+        if ratio > 1.5:
+            return "🟩 Good", "Your finances are in good shape."
+        if ratio > 1:
+            return "🟨 Moderate", "You’re breaking even, try to save more."
+        if ratio > 0.5:
+            return "🟧 Poor", "You’re spending too much — watch your expenses."
+        return "🔴 Critical", "You’re broke! Expenses exceed income."
+
+    @timed
+    def health(self, start=None, end=None):
+        """Return {"income", "expense", "ratio", "score", "comment"}.
+
+        The whole ledger comes from the running totals, a period from the
+        cube. ratio, score and comment are None when there are no expenses.
+        """
+        if start is None and end is None:
+            aggregates = self.store.aggregates
+            income = aggregates.total("Income")
+            expense = aggregates.total("Expense")
+        else:
+            by_type = self.rollup(("type",), start, end)["sum"]
+            income, expense = Money(by_type.get("Income", 0)), Money(by_type.get("Expense", 0))
+        ratio = score = comment = None
+        if expense != 0:
+            ratio = income / expense
+            score, comment = self.health_rating(ratio)
+        return {"income": income, "expense": expense, "ratio": ratio, "score": score, "comment": comment}
+
+    # -------------------- REPORTS --------------------
+    @timed
     def dashboard_summary(self):
-        df = self.load_data()
-        if df.empty:
+        summary = self.summary()
+        if summary["transactions"] == 0:
             print("No data available for summary.")
             return
-        total_spent = df["Amount"].sum()
-        total_transactions = len(df)
-        avg_transaction = df["Amount"].mean()
         print(f"\n=== Dashboard Summary ===")
-        print(f"Total Transactions: {total_transactions}")
-        print(f"Total Spent: {total_spent:.2f}")
-        print(f"Average Transaction: {avg_transaction:.2f}")
+        print(f"Total Transactions: {summary['transactions']}")
+        print(f"Total Spent: {summary['total']}")
+        print(f"Average Transaction: {summary['average']}")
 
         # 👉 Call Financial Health Score directly after the summary
-        self.financial_health_score(df)
+        self.financial_health_score()
 
+    @timed
     def monthly_report(self, month, year):
-        df = self.load_data()
-        if df.empty:
+        if self.store.aggregates.count() == 0:
             return
-        df["Date"] = pd.to_datetime(df["Date"])
-        monthly_df = df[(df["Date"].dt.month == month) & (df["Date"].dt.year == year)]
+        # Only the month's rows are read, found through the date index.
+        first = date(year, month, 1)
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        monthly_df = self.store.frame(with_description=True, start=first, end=last)
         print(f"\n=== Monthly Report ({month}/{year}) ===")
-        print(monthly_df)
+        print(monthly_df.assign(Amount=self._formatted(monthly_df["Amount"])))
 
+    @timed
     def category_breakdown(self):
-        df = self.load_data()
-        if df.empty:
+        breakdown = self.category_totals()
+        if breakdown.empty:
             return
-        breakdown = df.groupby("Category")["Amount"].sum()
         print("\n=== Category Breakdown ===")
-        print(breakdown)
+        print(self._formatted(breakdown))
 
+    @timed
     def spending_trends(self):
-        df = self.load_data()
-        if df.empty:
+        trends = self.monthly_totals()
+        if trends.empty:
             return
-        df["Date"] = pd.to_datetime(df["Date"])
-        trends = df.groupby(df["Date"].dt.to_period("M"))["Amount"].sum()
         print("\n=== Spending Trends (Monthly) ===")
-        print(trends)
+        print(self._formatted(trends))
 
     # -------------------- FINANCIAL HEALTH SCORE --------------------
-    def financial_health_score(self, df):
+    @timed
+    def financial_health_score(self):
         """Simple financial health score based on income vs expenses ratio."""
-        if "Type" not in df.columns or "Amount" not in df.columns:
-            print("⚠️ Missing necessary columns (Type, Amount).")
-            return
-
-        total_income = df.loc[df["Type"].str.lower() == "income", "Amount"].sum()
-        total_expense = df.loc[df["Type"].str.lower() == "expense", "Amount"].sum()
+        health = self.health()
 
         print("\n💰 === Financial Health Score ===")
 
-        if total_expense == 0 and total_income == 0:
+        if health["expense"] == 0 and health["income"] == 0:
             print("No income or expenses recorded yet.")
             return
-        elif total_expense == 0:
+        elif health["expense"] == 0:
             print("🟢 Excellent! No expenses recorded yet.")
             return
 
-        ratio = total_income / total_expense
+        print(f"Total Income:  {health['income']}")
+        print(f"Total Expense: {health['expense']}")
+        print(f"Income/Expense Ratio: {health['ratio']:.2f}")
+        print(f"Financial Health: {health['score']}")
+        print(f"Comment: {health['comment']}")
 
-        if ratio > 2:
-            score = "🟢 Excellent"
-            comment = "You’re saving a lot — great job!"
-        elif ratio > 1.5:
-            score = "🟩 Good"
-            comment = "Your finances are in good shape."
-        elif ratio > 1:
-            score = "🟨 Moderate"
-            comment = "You’re breaking even, try to save more."
-        elif ratio > 0.5:
-            score = "🟧 Poor"
-            comment = "You’re spending too much — watch your expenses."
-        else:
-            score = "🔴 Critical"
-            comment = "You’re broke! Expenses exceed income."
-
-        print(f"Total Income:  {total_income:.2f}")
-        print(f"Total Expense: {total_expense:.2f}")
-        print(f"Income/Expense Ratio: {ratio:.2f}")
-        print(f"Financial Health: {score}")
-        print(f"Comment: {comment}")
+    # -------------------- VERIFY TOTALS --------------------
+    @timed
+    def verify_totals(self):
+        """Check the running totals and report cube against the ledger; rebuild what drifted."""
+        aggregates, cube = self.store.aggregates, self.store.cube
+        drift = aggregates.verify()
+        cube_drift = cube.verify()
+        if not drift and not cube_drift:
+            print("✅ Running totals match your transactions.")
+            return
+
+        if drift:
+            print(f"⚠️ Running totals drifted in {len(drift)} place(s):")
+            for section, key in drift:
+                print(f"  - {section}" + (f": {key}" if key is not None else ""))
+            aggregates.rebuild()
+        if cube_drift:
+            print(f"⚠️ Report totals drifted in {len(cube_drift)} cell(s):")
+            for key in cube_drift[:10]:
+                print(f"  - {' / '.join(part or '(no date)' for part in key)}")
+            cube.rebuild()
+        print("✅ Running totals rebuilt from your transactions.")
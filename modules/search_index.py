@@ -0,0 +1,213 @@
+import itertools
+import json
+import os
+import re
+import zipfile
+from collections import Counter
+import numpy as np
+import pandas as pd
+from . import metrics
+from .file_lock import atomic_write
+
+SEARCH_INDEX_FILE = "search_index.npz"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _fields(txn):
+    """Return the lowercased searchable values of a transaction."""
+    return {txn.category.lower(), txn.payment_method.lower(), txn.description.lower()}
+
+
+class SearchIndex:
+    """Inverted index over Category, Payment Method and Description.
+
+    Every distinct lowercased field value has a posting list of row IDs.
+    Values are reachable by whole token (for ranking) and by trigram (so a
+    keyword still matches anywhere inside a value, like the old substring
+    scan). Lookups only touch the values sharing the keyword's trigrams,
+    never every row.
+
+    Updates are applied in memory on every write and saved on flush(); a
+    saved index whose stamp no longer matches the ledger is rebuilt.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.path = os.path.join(os.path.dirname(store.csv_path), SEARCH_INDEX_FILE)
+        self._stamp = None
+        self._values = None  # value -> set of IDs
+        self._grams = None  # trigram -> set of values
+        self._tokens = None  # token -> set of values
+        self._dirty = False
+        store.add_listener(self)
+
+    # -------------------- PERSISTENCE --------------------
+    def _current(self, stamp):
+        """Make sure the in-memory index describes the ledger at the given stamp."""
+        if self._values is not None and self._stamp == stamp:
+            return True
+        try:
+            # Plain arrays only: loading never unpickles objects from disk.
+            with np.load(self.path, allow_pickle=False) as saved:
+                if tuple(json.loads(str(saved["meta"]))["stamp"]) == stamp:
+                    text, ends = saved["text"].tobytes(), saved["ends"].tolist()
+                    postings = np.split(saved["ids"], np.cumsum(saved["counts"])[:-1])
+                    self._values, self._grams, self._tokens = {}, {}, {}
+                    start = 0
+                    for end, ids in zip(ends, postings):
+                        self._add_ids(text[start:end].decode(), ids.tolist())
+                        start = end
+                    self._stamp = stamp
+                    self._dirty = False
+                    return True
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        self._values = None
+        return False
+
+    def flush(self):
+        """Save the index if it changed since it was last written.
+
+        Distinct values are stored as UTF-8 text with end offsets, each
+        followed by its count of IDs in one flat ID array; the trigram and
+        token maps are derived from the values again on load.
+        """
+        if self._values is None or not self._dirty:
+            return
+        encoded = [value.encode() for value in self._values]
+        with atomic_write(self.path) as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps({"stamp": self._stamp})),
+                text=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                ends=np.cumsum([len(value) for value in encoded], dtype=np.int64),
+                counts=np.array([len(ids) for ids in self._values.values()], dtype=np.int64),
+                ids=np.fromiter(itertools.chain.from_iterable(self._values.values()), dtype=np.int64),
+            )
+        self._dirty = False
+
+    def rebuild(self):
+        """Index every transaction from scratch using the columnar cache."""
+        stamp = self.store.state_stamp()
+        cache = self.store.cache
+        columns, meta = cache.columns()
+        ids = np.asarray(columns["id"])
+        desc_codes, desc_values = pd.factorize(
+            pd.Series(cache.descriptions(range(len(ids)), columns), dtype=object)
+        )
+
+        self._values, self._grams, self._tokens = {}, {}, {}
+        for codes, dictionary in (
+            (np.asarray(columns["category"]), meta["categories"]),
+            (np.asarray(columns["method"]), meta["methods"]),
+            (desc_codes, desc_values),
+        ):
+            # Group the row IDs of each distinct value in one pass.
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            starts = np.flatnonzero(np.diff(sorted_codes)) + 1
+            for code, group in zip(
+                sorted_codes[np.concatenate(([0], starts))].tolist() if len(codes) else [],
+                np.split(ids[order], starts),
+            ):
+                self._add_ids(dictionary[code].lower(), group.tolist())
+        self._stamp = stamp
+        self._dirty = True
+        self.flush()
+
+    def _ensure(self):
+        current = self._current(self.store.state_stamp())
+        metrics.cache("search_index", hit=current)
+        if not current:
+            self.rebuild()
+
+    # -------------------- INCREMENTAL UPDATES --------------------
+    def _add_ids(self, value, txn_ids):
+        ids = self._values.get(value)
+        if ids is None:
+            ids = self._values[value] = set()
+            for gram in _trigrams(value):
+                self._grams.setdefault(gram, set()).add(value)
+            for token in TOKEN_PATTERN.findall(value):
+                self._tokens.setdefault(token, set()).add(value)
+        ids.update(txn_ids)
+
+    def _remove_value(self, value, txn_id):
+        ids = self._values.get(value)
+        if ids is None:
+            return
+        ids.discard(txn_id)
+        if ids:
+            return
+        del self._values[value]
+        for postings, keys in ((self._grams, _trigrams(value)), (self._tokens, TOKEN_PATTERN.findall(value))):
+            for key in keys:
+                postings[key].discard(value)
+                if not postings[key]:
+                    del postings[key]
+
+    def _changed(self, before, add=(), remove=()):
+        if not self._current(before):
+            return
+        for txn in remove:
+            for value in _fields(txn):
+                self._remove_value(value, txn.id)
+        for txn in add:
+            for value in _fields(txn):
+                self._add_ids(value, (txn.id,))
+        self._stamp = self.store.state_stamp()
+        self._dirty = True
+
+    def on_append(self, before, transactions):
+        self._changed(before, add=transactions)
+
+    def on_update(self, before, old, new):
+        self._changed(before, add=[new], remove=[old])
+
+    def on_delete(self, before, old):
+        self._changed(before, remove=[old])
+
+    def on_compact(self, before):
+        self._changed(before)
+
+    # -------------------- QUERIES --------------------
+    def _matching_values(self, term):
+        """Return every indexed value containing term as a substring."""
+        grams = _trigrams(term)
+        if not grams:
+            # Too short for trigrams: check the distinct values instead.
+            return {value for value in self._values if term in value}
+        postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        candidates = set.intersection(*postings)
+        return {value for value in candidates if term in value}
+
+    def search(self, query):
+        """Return IDs of rows matching every whitespace-separated term, best first.
+
+        A term matches when it appears anywhere in the row's category,
+        payment method or description. Rows score higher for terms that
+        match a whole word.
+        """
+        self._ensure()
+        terms = query.lower().split()
+        if not terms:
+            return sorted(set().union(*self._values.values()))
+
+        matches = []
+        for term in terms:
+            values = self._matching_values(term)
+            matches.append((term, values, set().union(*(self._values[v] for v in values))))
+        result = set.intersection(*(ids for _, _, ids in matches))
+
+        # One point per term found somewhere in the row, two if it is a whole word.
+        scores = Counter()
+        for term, values, ids in matches:
+            whole = self._tokens.get(term, set()) & values
+            if whole:
+                whole_ids = set().union(*(self._values[v] for v in whole))
+                scores.update(txn_id for txn_id in result if txn_id in whole_ids)
+        return sorted(result, key=lambda txn_id: (-scores[txn_id], txn_id))
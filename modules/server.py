@@ -0,0 +1,261 @@
+"""HTTP/JSON service serving many users at once.
+
+Usage: python -m modules.server [--host 127.0.0.1] [--port 8080] [--threads 8]
+
+Endpoints (JSON in and out; all but /login need "Authorization: Bearer <token>"):
+  POST   /login                  {"name", "password"} -> {"token"}
+  POST   /logout
+  POST   /transactions           one transaction or a list, keyed by CSV header
+  PUT    /transactions/<id>      fields to change
+  DELETE /transactions/<id>
+  GET    /transactions?type=&category=&start=&end=&min=&max=&method=&search=&limit=
+  GET    /reports/<kind>?period=YYYY-MM
+
+The event loop only parses requests; ledger work runs in a bounded thread
+pool. Writes to one user's ledger are serialized by a per-user lock while
+reads, and requests for different users, run in parallel. Sessions are
+tokens rather than connections, so a client can use as many connections
+as it likes, or reconnect, without logging in again.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import secrets
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from .api import FinanceAPI
+from .user_manager import UserManager
+
+THREADS = 8
+MAX_BODY = 64 * 2**20
+# Query string parameter -> FinanceAPI.query filter.
+QUERY_FILTERS = {
+    "type": "t_type",
+    "category": "category",
+    "start": "start_date",
+    "end": "end_date",
+    "min": "min_amount",
+    "max": "max_amount",
+    "method": "payment_method",
+}
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class FinanceServer:
+    """Routes HTTP requests to one FinanceAPI per logged-in user."""
+
+    def __init__(self, threads=THREADS, user_manager=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pfm-io")
+        self.user_manager = user_manager or UserManager()
+        self.sessions = {}  # token -> user folder
+        self.apis = {}  # user folder -> FinanceAPI
+        self.locks = defaultdict(asyncio.Lock)  # user folder -> write lock
+
+    async def _io(self, func, *args, **kwargs):
+        """Run blocking ledger work in the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, functools.partial(func, *args, **kwargs))
+
+    async def _api(self, user_dir):
+        api = self.apis.get(user_dir)
+        if api is None:
+            async with self.locks[user_dir]:
+                api = self.apis.get(user_dir)
+                if api is None:
+                    api = self.apis[user_dir] = await self._io(FinanceAPI, user_dir)
+        return api
+
+    async def _write(self, user_dir, func, *args):
+        """Run a write with the user's lock held, so writes to one ledger never interleave."""
+        async with self.locks[user_dir]:
+            return await self._io(func, *args)
+
+    # -------------------- ROUTES --------------------
+    async def login(self, body):
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Expected {\"name\": ..., \"password\": ...}")
+        name, password = str(body.get("name") or ""), str(body.get("password") or "")
+        # Password hashing has its own pool so logins never hold up ledger work.
+        user = await asyncio.wrap_future(self.user_manager.submit_authenticate(name, password))
+        if user is None:
+            raise HTTPError(401, "Invalid name or password.")
+        user_dir = self.user_manager.data_handler.user_dir(user.user_id, user.name)
+        await self._io(os.makedirs, user_dir, exist_ok=True)
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = user_dir
+        return 200, {"token": token, "user": user.name}
+
+    async def dispatch(self, method, path, query, headers, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["login"]:
+            if method != "POST":
+                raise HTTPError(405, "Use POST.")
+            return await self.login(body)
+
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        user_dir = self.sessions.get(token)
+        if user_dir is None:
+            raise HTTPError(401, "Log in first.")
+        if parts == ["logout"]:
+            del self.sessions[token]
+            return 200, {}
+        api = await self._api(user_dir)
+
+        if parts and parts[0] == "transactions":
+            if len(parts) == 1 and method == "GET":
+                filters = {QUERY_FILTERS[k]: v for k, v in query.items() if k in QUERY_FILTERS}
+                limit = int(query["limit"]) if query.get("limit") else None
+                return 200, await self._io(api.query, filters, query.get("search"), limit)
+            if len(parts) == 1 and method == "POST":
+                rows = body if isinstance(body, list) else [body]
+                if not all(isinstance(row, dict) for row in rows):
+                    raise HTTPError(400, "Expected a transaction object or a list of them.")
+                result = await self._write(user_dir, api.add_transactions, rows)
+                return 201, {
+                    "first_id": result.first_id,
+                    "last_id": result.last_id,
+                    "imported": result.imported,
+                    "duplicates": result.duplicates,
+                    "rejected_rows": result.rejected_rows,
+                }
+            if len(parts) == 2 and method in ("PUT", "DELETE"):
+                try:
+                    txn_id = int(parts[1])
+                except ValueError:
+                    raise HTTPError(404, "No such transaction.")
+                if method == "PUT":
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "Expected an object of fields to change.")
+                    txn = await self._write(user_dir, api.update, txn_id, body)
+                else:
+                    txn = await self._write(user_dir, api.delete, txn_id)
+                if txn is None:
+                    raise HTTPError(404, "No such transaction.")
+                return 200, txn
+            raise HTTPError(405, "Unsupported method for /transactions.")
+        if len(parts) == 2 and parts[0] == "reports" and method == "GET":
+            return 200, await self._io(api.report, parts[1], query.get("period"))
+        raise HTTPError(404, "Unknown endpoint.")
+
+    # -------------------- HTTP --------------------
+    async def handle(self, reader, writer):
+        """Serve requests on one keep-alive connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Where the body ends is unknown, so the connection can't be reused.
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length."}, close=True)
+                    break
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Request body too large."}
+                    await self._respond(writer, status, payload, close=True)
+                    break
+                raw = await reader.readexactly(length) if length else b""
+                status, payload = await self._process(method, target, headers, raw)
+                close = headers.get("connection", "").lower() == "close"
+                await self._respond(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _process(self, method, target, headers, raw):
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            return 400, {"error": "Body is not valid JSON."}
+        try:
+            return await self.dispatch(method, url.path, query, headers, body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    async def _respond(writer, status, payload, close=False):
+        # Money (and anything else not JSON-native) is sent as its string form.
+        data = json.dumps(payload, default=str, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1")
+            + data
+        )
+        await writer.drain()
+
+    def close(self):
+        """Close every open ledger and stop the thread pool."""
+        for api in self.apis.values():
+            api.close()
+        self.apis.clear()
+        self.pool.shutdown()
+
+
+async def serve(host="127.0.0.1", port=8080, threads=THREADS, ready=None):
+    """Run the service until cancelled.
+
+    :param ready: optional callable given the bound port once listening
+    """
+    app = FinanceServer(threads)
+    server = await asyncio.start_server(app.handle, host, port, limit=2**16)
+    if ready:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, app.close)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the finance manager over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=THREADS, help="ledger I/O threads")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.threads, lambda port: print(f"Serving on {args.host}:{port}", flush=True)))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,649 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import ROUND_CEILING, ROUND_FLOOR
+import numpy as np
+import pandas as pd
+from . import metrics
+from .columnar_cache import EPOCH
+from .cube import check_dimensions, month_key, rollup_frame
+from .file_lock import BUSY_TIMEOUT, _record_wait
+from .filter_engine import _days, _minor
+from .fingerprints import fingerprint_transactions, match_keys
+from .money import NA, Money, minor_array, precision, to_minor
+from .search_index import TOKEN_PATTERN
+from .transaction_store import Transaction, TransactionStore, TransactionTable
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,            -- as stored in the CSV format
+        day INTEGER,                   -- days since 1970-01-01, NULL if invalid
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        amount TEXT NOT NULL,          -- exact decimal text
+        cents INTEGER,                 -- minor units of the currency, NULL if invalid
+        payment_method TEXT NOT NULL,
+        description TEXT NOT NULL,
+        type_key TEXT NOT NULL,        -- lowercased copies for filtering
+        category_key TEXT NOT NULL,
+        method_key TEXT NOT NULL,
+        exact_fp INTEGER NOT NULL,     -- duplicate-detection fingerprints
+        near_fp INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS transactions_day ON transactions (day)",
+    "CREATE INDEX IF NOT EXISTS transactions_type ON transactions (type_key)",
+    "CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category_key)",
+    "CREATE INDEX IF NOT EXISTS transactions_exact_fp ON transactions (exact_fp)",
+    "CREATE INDEX IF NOT EXISTS transactions_near_fp ON transactions (near_fp)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    # precision: decimals the cents column was computed with (2 before it was recorded)
+    # cube: 1 once the cube table has been filled from the transactions
+    "INSERT OR IGNORE INTO meta VALUES ('version', 0), ('next_id', 1), ('precision', 2), ('cube', 0)",
+    """CREATE TABLE IF NOT EXISTS cube (
+        month TEXT NOT NULL,           -- "YYYY-MM", "" for undated rows
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        method TEXT NOT NULL,
+        sum INTEGER NOT NULL,          -- minor units of the rows with a valid amount
+        count INTEGER NOT NULL,
+        min INTEGER NOT NULL,
+        max INTEGER NOT NULL,
+        PRIMARY KEY (month, type, category, method)
+    ) WITHOUT ROWID""",
+]
+
+
+def _month(row):
+    """SQL giving the cube month of a row's day."""
+    return f"COALESCE(strftime('%Y-%m', {row}.day * 86400, 'unixepoch'), '')"
+
+
+def _cell(row):
+    return (
+        f"month = {_month(row)} AND type = {row}.type AND category = {row}.category "
+        f"AND method = {row}.payment_method"
+    )
+
+
+UPSERT_CUBE = """INSERT INTO cube VALUES ({}, {}, {}, {}, {}, {}, {}, {})
+    ON CONFLICT (month, type, category, method) DO UPDATE SET
+    sum = sum + excluded.sum, count = count + excluded.count,
+    min = MIN(min, excluded.min), max = MAX(max, excluded.max)"""
+
+# Edits and deletes update the cube cells of the rows they touch in the
+# same transaction; inserts are added in bulk by _insert(). Removing a
+# cell's smallest or largest amount rescans that cell's rows for month.
+_REMOVE_OLD = f"""
+        UPDATE cube SET sum = sum - old.cents, count = count - 1 WHERE {_cell("old")};
+        DELETE FROM cube WHERE {_cell("old")} AND count = 0;
+        UPDATE cube SET (min, max) = (
+            SELECT MIN(t.cents), MAX(t.cents) FROM transactions t
+            WHERE t.category_key = old.category_key AND t.category = old.category
+              AND t.type = old.type AND t.payment_method = old.payment_method
+              AND t.cents IS NOT NULL
+              AND (old.day IS NULL AND t.day IS NULL
+                   OR t.day BETWEEN old.day - 31 AND old.day + 31 AND {_month("t")} = {_month("old")})
+        ) WHERE {_cell("old")} AND old.cents IN (min, max);"""
+CUBE_SCHEMA = [
+    f"""CREATE TRIGGER IF NOT EXISTS cube_delete AFTER DELETE ON transactions
+    WHEN old.cents IS NOT NULL BEGIN{_REMOVE_OLD}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cube_update_old AFTER UPDATE ON transactions
+    WHEN old.cents IS NOT NULL BEGIN{_REMOVE_OLD}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cube_update_new AFTER UPDATE ON transactions
+    WHEN new.cents IS NOT NULL BEGIN
+        {UPSERT_CUBE.format(_month("new"), "new.type", "new.category", "new.payment_method",
+                            "new.cents", 1, "new.cents", "new.cents")};
+    END""",
+]
+REBUILD_CUBE = [
+    "DELETE FROM cube",
+    f"""INSERT INTO cube SELECT {_month("transactions")}, type, category, payment_method,
+        SUM(cents), COUNT(cents), MIN(cents), MAX(cents)
+        FROM transactions WHERE cents IS NOT NULL GROUP BY 1, 2, 3, 4""",
+    "UPDATE meta SET value = 1 WHERE key = 'cube'",
+]
+
+# Trigram full-text index (needs SQLite 3.34+). Edits and deletes are
+# mirrored by triggers; inserts are added in bulk by _insert(), which is
+# an order of magnitude faster than a per-row trigger.
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        category, payment_method, description,
+        content='transactions', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, category, payment_method, description)
+        VALUES ('delete', old.id, old.category, old.payment_method, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_fts_update AFTER UPDATE ON transactions BEGIN
+        INSERT INTO transactions_fts (transactions_fts, rowid, category, payment_method, description)
+        VALUES ('delete', old.id, old.category, old.payment_method, old.description);
+        INSERT INTO transactions_fts (rowid, category, payment_method, description)
+        VALUES (new.id, new.category, new.payment_method, new.description);
+    END""",
+]
+
+COLUMNS = (
+    "id, date, day, type, category, amount, cents, payment_method, description, "
+    "type_key, category_key, method_key, exact_fp, near_fp"
+)
+INSERT = f"INSERT INTO transactions ({COLUMNS}) VALUES ({', '.join('?' * 14)})"
+INSERT_FTS = (
+    "INSERT INTO transactions_fts (rowid, category, payment_method, description) VALUES (?, ?, ?, ?)"
+)
+SELECT = "SELECT id, date, type, category, amount, payment_method, description FROM transactions"
+
+
+def _signed(key):
+    """Store an unsigned 64-bit fingerprint in SQLite's signed INTEGER."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def _cube_cells(values):
+    """Group rows from SQLiteTransactionStore._values() into (cube cell, sum, count, min, max)."""
+    cells, months = {}, {}
+    for value in values:
+        day, cents = value[2], value[6]
+        if cents is None:
+            continue
+        month = months.get(day)
+        if month is None:
+            month = months[day] = month_key(None if day is None else EPOCH + timedelta(days=day))
+        key = (month, value[3], value[4], value[7])
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [cents, 1, cents, cents]
+        else:
+            cell[0] += cents
+            cell[1] += 1
+            cell[2] = min(cell[2], cents)
+            cell[3] = max(cell[3], cents)
+    return ((*key, *cell) for key, cell in cells.items())
+
+
+def _to_transaction(row):
+    txn_id, date, t_type, category, amount, method, description = row
+    return Transaction.from_row(
+        {
+            "ID": txn_id,
+            "Date": date,
+            "Type": t_type,
+            "Category": category,
+            "Amount": amount,
+            "Payment Method": method,
+            "Description": description,
+        }
+    )
+
+
+class SQLiteAggregates:
+    """Totals computed by indexed SQL queries; always current, nothing to rebuild."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def total(self, t_type):
+        """Return the total of a transaction type as Money."""
+        (cents,) = self.store._query(
+            "SELECT COALESCE(SUM(cents), 0) FROM transactions WHERE type_key = ? AND type = ?",
+            (t_type.lower(), t_type),
+        )[0]
+        return Money(cents)
+
+    def count(self):
+        """Return the number of transactions, including unreadable rows."""
+        return self.store.count()
+
+    def has_rent(self):
+        """Return True if any Rent expense is recorded."""
+        return bool(
+            self.store._query(
+                "SELECT EXISTS (SELECT 1 FROM transactions "
+                "WHERE type_key = 'expense' AND type = 'Expense' AND category = 'Rent' "
+                "AND cents IS NOT NULL)"
+            )[0][0]
+        )
+
+    def verify(self):
+        return []
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteCube:
+    """Rollups answered from the cube table, which every write keeps current."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def rollup(self, by=(), start=None, end=None, **where):
+        """Same contract as Cube.rollup(), as one GROUP BY over the cube's cells."""
+        check_dimensions(by, where)
+        clauses, params = [], []
+        if start or end:
+            clauses.append("month != ''")
+        if start:
+            clauses.append("month >= ?")
+            params.append(start)
+        if end:
+            clauses.append("month <= ?")
+            params.append(end)
+        for name, value in where.items():
+            values = [value] if isinstance(value, str) else list(value)
+            clauses.append(f"{name} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        columns = "".join(f"{name}, " for name in by)
+        sql = f"SELECT {columns}SUM(sum), SUM(count), MIN(min), MAX(max) FROM cube"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        if by:
+            sql += f" GROUP BY {', '.join(by)}"
+        rows = self.store._query(sql, params)
+        if not by and rows[0][1] is None:
+            rows = []  # no matching cells
+        return rollup_frame(by, rows)
+
+    def verify(self):
+        return []
+
+    def rebuild(self):
+        self.store._rebuild_cube()
+
+
+class SQLiteFingerprints:
+    """Duplicate detection through the indexed fingerprint columns."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def match(self, transactions, since=None):
+        """Same contract as FingerprintIndex.match()."""
+        if not transactions:
+            return []
+        return self.match_fingerprints(*fingerprint_transactions(transactions), since=since)
+
+    def match_fingerprints(self, exact, near, since=None):
+        def lookup(column):
+            sql = f"SELECT id FROM transactions WHERE {column} = ? ORDER BY id"
+            return lambda i, key: [row[0] for row in self.store._query(sql, (_signed(key),))]
+
+        return match_keys(exact, near, lookup("exact_fp"), lookup("near_fp"), since)
+
+
+class SQLiteTransactionStore(TransactionStore):
+    """A user's transactions in an SQLite database (transactions.db).
+
+    Runs in WAL mode so readers never block the writer. Filters use the
+    indexes on day, type and category; keyword search uses a trigram
+    full-text index; inserts are batched with executemany over one cached
+    prepared statement inside a single transaction.
+    """
+
+    def __init__(self, path, journal_mode="WAL"):
+        """
+        :param path: Path to the user's transactions.db file (created if missing)
+        :param journal_mode: SQLite journal mode; the migration builds its copy
+            with "DELETE" so no -wal/-shm files outlive the connection
+        """
+        super().__init__()
+        self.path = path
+        self._lock = threading.RLock()
+        # Other processes may hold the write lock; wait for them rather than fail.
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        # Fingerprint keys are random, so their index pages are touched all
+        # over; a 64 MB page cache keeps batched inserts from thrashing.
+        self._conn.execute("PRAGMA cache_size=-65536")
+        with self._conn:
+            for statement in SCHEMA + CUBE_SCHEMA:
+                self._conn.execute(statement)
+        try:
+            with self._conn:
+                for statement in FTS_SCHEMA:
+                    self._conn.execute(statement)
+            self._fts = True
+        except sqlite3.OperationalError as exc:
+            # Only a build without FTS5/trigram falls back to scanning; a
+            # locked or broken database must not silently disable search.
+            if not str(exc).startswith(("no such module", "no such tokenizer")):
+                raise
+            self._fts = False
+        self._aggregates = SQLiteAggregates(self)
+        self._fingerprints = SQLiteFingerprints(self)
+        self._cube = SQLiteCube(self)
+        if self._meta("precision") != precision():
+            self._rescale()
+        if self._meta("cube") == 0:
+            self._rebuild_cube()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        metrics.add(rows=len(rows))
+        return rows
+
+    @contextmanager
+    def _writing(self):
+        """Run a write transaction holding the database's write lock from its start.
+
+        BEGIN IMMEDIATE makes other processes wait (up to BUSY_TIMEOUT) before
+        they read anything, so IDs and the version counter read inside can't
+        go stale before the commit. The wait counts towards LOCK_STATS.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            self._conn.execute("BEGIN IMMEDIATE")
+            _record_wait(time.perf_counter() - start)
+            with self._conn:
+                yield
+
+    def _meta(self, key):
+        return self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+    # -------------------- READ --------------------
+    def state_stamp(self):
+        return ("sqlite", self._query("SELECT value FROM meta WHERE key = 'version'")[0][0])
+
+    def all(self):
+        return TransactionTable(map(_to_transaction, self._query(SELECT + " ORDER BY id")))
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM transactions")[0][0]
+
+    def get(self, txn_id):
+        rows = self._query(SELECT + " WHERE id = ?", (int(txn_id),))
+        return _to_transaction(rows[0]) if rows else None
+
+    def get_many(self, ids):
+        ids = [int(i) for i in ids]
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start : start + 500]
+            sql = SELECT + f" WHERE id IN ({', '.join('?' * len(batch))})"
+            found.update((row[0], row) for row in self._query(sql, batch))
+        return [_to_transaction(found[i]) for i in ids if i in found]
+
+    def last(self, n):
+        rows = self._query(SELECT + " ORDER BY id DESC LIMIT ?", (n,))
+        return [_to_transaction(row) for row in reversed(rows)]
+
+    def page(self, start, size):
+        rows = self._query(SELECT + " ORDER BY id LIMIT ? OFFSET ?", (size, start))
+        return [_to_transaction(row) for row in rows]
+
+    def date_position(self, day):
+        """Position of the oldest row dated on or after day, via the day index."""
+        (first_id,) = self._query(
+            "SELECT MIN(id) FROM transactions WHERE day >= ?", ((day - EPOCH).days,)
+        )[0]
+        if first_id is None:
+            return None
+        return self._query("SELECT COUNT(*) FROM transactions WHERE id < ?", (first_id,))[0][0]
+
+    def id_position(self, txn_id):
+        return self._query("SELECT COUNT(*) FROM transactions WHERE id <= ?", (int(txn_id),))[0][0]
+
+    # -------------------- QUERIES --------------------
+    @property
+    def aggregates(self):
+        return self._aggregates
+
+    @property
+    def fingerprints(self):
+        return self._fingerprints
+
+    @property
+    def cube(self):
+        return self._cube
+
+    def filter_ids(
+        self,
+        t_type=None,
+        category=None,
+        start_date=None,
+        end_date=None,
+        min_amount=None,
+        max_amount=None,
+        payment_method=None,
+    ):
+        """Same filters and errors as FilterEngine, run as one indexed query."""
+        clauses = ["day IS NOT NULL", "cents IS NOT NULL"]
+        params = []
+        for column, value in (
+            ("type_key", t_type),
+            ("category_key", category),
+            ("method_key", payment_method),
+        ):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value.lower())
+        if start_date:
+            clauses.append("day >= ?")
+            params.append(_days(start_date))
+        if end_date:
+            clauses.append("day <= ?")
+            params.append(_days(end_date))
+        for bound, rounding, op in ((min_amount, ROUND_CEILING, ">="), (max_amount, ROUND_FLOOR, "<=")):
+            if bound:
+                cents, value = _minor(bound, rounding)
+                if value:  # a zero bound never filtered anything
+                    clauses.append(f"cents {op} ?")
+                    params.append(cents)
+        sql = f"SELECT id FROM transactions WHERE {' AND '.join(clauses)} ORDER BY id"
+        return [row[0] for row in self._query(sql, params)]
+
+    def _term_candidates(self, term):
+        """IDs that may contain term; verified afterwards."""
+        if self._fts and len(term) >= 3:
+            phrase = '"' + term.replace('"', '""') + '"'
+            return {
+                row[0]
+                for row in self._query(
+                    "SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?", (phrase,)
+                )
+            }
+        like = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return {
+            row[0]
+            for row in self._query(
+                "SELECT id FROM transactions WHERE category LIKE ?1 ESCAPE '\\' "
+                "OR payment_method LIKE ?1 ESCAPE '\\' OR description LIKE ?1 ESCAPE '\\'",
+                (like,),
+            )
+        }
+
+    def search_ids(self, query):
+        """Same matching and ranking as SearchIndex.search(), using the full-text index."""
+        terms = query.lower().split()
+        if not terms:
+            return [row[0] for row in self._query("SELECT id FROM transactions ORDER BY id")]
+        candidates = set.intersection(*(self._term_candidates(term) for term in terms))
+
+        scores = Counter()
+        result = []
+        for row in self.get_many(sorted(candidates)):
+            fields = [row.category.lower(), row.payment_method.lower(), row.description.lower()]
+            if not all(any(term in field for field in fields) for term in terms):
+                continue
+            tokens = {token for field in fields for token in TOKEN_PATTERN.findall(field)}
+            scores[row.id] = sum(term in tokens for term in terms)
+            result.append(row.id)
+        return sorted(result, key=lambda txn_id: (-scores[txn_id], txn_id))
+
+    def frame(self, with_description=False, start=None, end=None):
+        """Build the report DataFrame with one (date-indexed) query."""
+        columns = "id, day, type, category, cents, payment_method"
+        if with_description:
+            columns += ", description"
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("day >= ?")
+            params.append((start - EPOCH).days)
+        if end is not None:
+            clauses.append("day <= ?")
+            params.append((end - EPOCH).days)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            raw = pd.read_sql_query(
+                f"SELECT {columns} FROM transactions{where} ORDER BY id",
+                self._conn,
+                params=params,
+                dtype={"day": "Int64", "cents": "Int64"},
+            )
+        metrics.add(rows=len(raw))
+
+        def categorical(values):
+            return pd.Categorical(values, categories=sorted(set(values)))
+
+        # NULL days become NA, which NumPy reads as NaT (as in ColumnarCache.to_frame).
+        days = raw["day"].fillna(NA).to_numpy(dtype=np.int64).astype("datetime64[D]")
+        frame = pd.DataFrame(
+            {
+                "ID": raw["id"].to_numpy(dtype=np.int64),
+                "Date": pd.to_datetime(days),
+                "Type": categorical(raw["type"]),
+                "Category": categorical(raw["category"]),
+                "Amount": minor_array(raw["cents"].fillna(NA)),
+                "Payment Method": categorical(raw["payment_method"]),
+            }
+        )
+        if with_description:
+            frame["Description"] = raw["description"].to_numpy(dtype=object)
+        return frame
+
+    # -------------------- WRITE --------------------
+    def _values(self, transactions):
+        exact, near = fingerprint_transactions(transactions)
+        for txn, e, n in zip(
+            transactions, exact.view(np.int64).tolist(), near.view(np.int64).tolist()
+        ):
+            cents = to_minor(txn.amount)
+            yield (
+                txn.id,
+                txn["Date"],
+                None if txn.date is None else (txn.date - EPOCH).days,
+                txn.type,
+                txn.category,
+                txn["Amount"],
+                None if cents == NA else cents,
+                txn.payment_method,
+                txn.description,
+                txn.type.lower(),
+                txn.category.lower(),
+                txn.payment_method.lower(),
+                e,
+                n,
+            )
+
+    def _insert(self, transactions):
+        """Insert rows whose IDs are set, inside the caller's transaction."""
+        values = list(self._values(transactions))
+        self._conn.executemany(INSERT, values)
+        self._conn.executemany(UPSERT_CUBE.format(*"????????"), _cube_cells(values))
+        if self._fts:
+            self._conn.executemany(
+                INSERT_FTS,
+                ((t.id, t.category, t.payment_method, t.description) for t in transactions),
+            )
+
+    def _rescale(self):
+        """Recompute minor units and fingerprints after the currency's precision changed."""
+        with self._writing():
+            if self._meta("precision") == precision():
+                return  # another process rescaled it first
+            self._conn.executemany(
+                "UPDATE transactions SET cents = ?, exact_fp = ?, near_fp = ? WHERE id = ?",
+                ((v[6], v[12], v[13], v[0]) for v in self._values(self.all())),
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'precision'", (precision(),))
+            self._bump_version()
+
+    def _rebuild_cube(self):
+        """Refill the cube table from the transactions."""
+        with self._writing():
+            for statement in REBUILD_CUBE:
+                self._conn.execute(statement)
+
+    def _bump_version(self):
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def append(self, transactions, keep_in_memory=True):
+        """Insert transactions in one transaction, assigning their IDs."""
+        with self._lock:
+            before = self.state_stamp()
+            with self._writing():
+                next_id = self._meta("next_id")
+                for txn in transactions:
+                    txn.id = next_id
+                    next_id += 1
+                self._insert(transactions)
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (next_id,))
+                self._bump_version()
+            self._notify("on_append", before, transactions)
+
+    def restore(self, transactions):
+        """Insert transactions keeping the IDs they already have (for migrations)."""
+        if not transactions:
+            return
+        with self._lock:
+            before = self.state_stamp()
+            with self._writing():
+                self._insert(transactions)
+                next_id = max(self._meta("next_id"), max(t.id for t in transactions) + 1)
+                self._conn.execute("UPDATE meta SET value = ? WHERE key = 'next_id'", (next_id,))
+                self._bump_version()
+            self._notify("on_append", before, transactions)
+
+    def update(self, txn_id, transaction):
+        with self._lock:
+            old = self.get(txn_id)
+            if old is None:
+                return False
+            before = self.state_stamp()
+            transaction.id = txn_id
+            values = list(self._values([transaction]))[0]
+            with self._writing():
+                self._conn.execute(
+                    f"UPDATE transactions SET ({COLUMNS}) = ({', '.join('?' * 14)}) WHERE id = ?",
+                    values + (txn_id,),
+                )
+                self._bump_version()
+            self._notify("on_update", before, old, transaction)
+            return True
+
+    def delete(self, txn_id):
+        with self._lock:
+            old = self.get(txn_id)
+            if old is None:
+                return None
+            before = self.state_stamp()
+            with self._writing():
+                self._conn.execute("DELETE FROM transactions WHERE id = ?", (txn_id,))
+                self._bump_version()
+            self._notify("on_delete", before, old)
+            return old
+
+    def compact(self, background=False):
+        """Fold the WAL back into the database file."""
+        with self._lock:
+            before = self.state_stamp()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._notify("on_compact", before)
+
+    def close(self):
+        with self._lock:
+            try:
+                # Best effort: ANALYZE needs the write lock another process may hold.
+                self._conn.execute("PRAGMA optimize")
+            except sqlite3.OperationalError:
+                pass
+            finally:
+                self._conn.close()
@@ -1,32 +1,29 @@
-import csv
 import os
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
+from .metrics import timed
+from .money import fits_precision, precision
+from .transaction_store import HEADERS, Transaction, open_store
+
+# Accepted values (lowercase) for the type and payment method fields.
+TRANSACTION_TYPES = ["income", "expense"]
+PAYMENT_METHODS = ["cash", "card", "bank transfer", "wallet", "other"]
+# Rows shown per page by list_transactions.
+PAGE_SIZE = 20
 
 
 class TransactionManager:
     """Handles all operations related to transactions for a user."""
 
-    def __init__(self, user_csv_path):
+    def __init__(self, user_csv_path, store=None):
         """
         Initialize the transaction manager with the user's CSV path.
         :param user_csv_path: Path to the user's transactions.csv file
+        :param store: Shared TransactionStore for the session (created if omitted)
         """
         self.user_csv_path = user_csv_path
-        self.headers = [
-            "Date",
-            "Type",
-            "Category",
-            "Amount",
-            "Payment Method",
-            "Description",
-        ]
-
-        # Ensure file exists with headers
-        if not os.path.exists(self.user_csv_path):
-            with open(self.user_csv_path, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(self.headers)
+        self.headers = HEADERS
+        self.store = store or open_store(os.path.dirname(user_csv_path))
 
     # -------------------- VALIDATION HELPERS --------------------
     def _validate_date(self, date_str):
@@ -38,23 +35,39 @@ class TransactionManager:
             return False
 
     def _validate_amount(self, amount):
-        """Check that amount is a positive number."""
+        """Check that amount is a positive number with no more decimals than the currency keeps."""
         try:
             val = Decimal(amount)
-            return val >= 0
+            return val >= 0 and fits_precision(val)
         except (InvalidOperation, ValueError):
             return False
 
     def _validate_type(self, t_type):
         """Validate transaction type."""
-        return t_type.lower() in ["income", "expense"]
+        return t_type.lower() in TRANSACTION_TYPES
 
     def _validate_payment_method(self, method):
         """Validate payment method."""
-        allowed = ["cash", "card", "bank transfer", "wallet", "other"]
-        return method.lower() in allowed
+        return method.lower() in PAYMENT_METHODS
+
+    # -------------------- DUPLICATE CHECK --------------------
+    def _confirm_not_duplicate(self, transaction):
+        """Warn if the transaction matches an existing one; return True to add it."""
+        match = self.store.fingerprints.match([transaction])[0]
+        if match is None:
+            return True
+        kind, txn_id = match
+        existing = self.store.get(txn_id)
+        label = "an exact duplicate of" if kind == "exact" else "similar to"
+        print(f"⚠️ This looks {label} transaction {txn_id}:")
+        print(
+            f"   {existing['Date']} | {existing['Type']} | {existing['Category']} | "
+            f"{existing['Amount']} | {existing['Payment Method']} | {existing['Description']}"
+        )
+        return input("Add it anyway? (y/n): ").strip().lower() == "y"
 
     # -------------------- ADD TRANSACTION --------------------
+    @timed
     def add_transaction(self):
         """Add a new transaction with input validation."""
         try:
@@ -90,7 +103,7 @@ class TransactionManager:
             # Amount
             amount = input("Enter amount: ").strip()
             if not self._validate_amount(amount):
-                print("❌ Invalid amount. Please enter a valid number.")
+                print(f"❌ Invalid amount. Please enter a valid number with at most {precision()} decimals.")
                 return
 
             # Payment Method
@@ -110,11 +123,20 @@ class TransactionManager:
             description = input("Enter description (optional): ").strip()
 
             # Write to CSV
-            with open(self.user_csv_path, "a", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(
-                    [date_input, t_type, category, amount, payment_method, description]
-                )
+            transaction = Transaction.from_row(
+                {
+                    "Date": date_input,
+                    "Type": t_type,
+                    "Category": category,
+                    "Amount": amount,
+                    "Payment Method": payment_method,
+                    "Description": description,
+                }
+            )
+            if not self._confirm_not_duplicate(transaction):
+                print("❌ Transaction not added.")
+                return
+            self.store.append([transaction])
 
             print("✅ Transaction added successfully.")
 
@@ -123,17 +145,19 @@ class TransactionManager:
             ##########
             # -------------------- EDIT TRANSACTION --------------------
 
-    def edit_transaction(self, index):
-        """Edit an existing transaction by its index (1-based)."""
-        try:
-            with open(self.user_csv_path, "r", newline="") as f:
-                reader = list(csv.DictReader(f))
+    @timed
+    def edit_transaction(self, txn_id, rows=()):
+        """Edit an existing transaction by its ID.
 
-            if index < 1 or index > len(reader):
-                print("❌ Invalid transaction number.")
+        :param rows: rows already on screen (from list_transactions), reused if they hold the ID
+        """
+        try:
+            current = self.find_row(txn_id, rows)
+            if current is None:
+                print("❌ Invalid transaction ID.")
                 return
 
-            transaction = reader[index - 1]
+            transaction = dict(zip(self.headers, current.to_row()))
             print("\n--- Editing Transaction ---")
             print(f"Current: {transaction}")
 
@@ -161,7 +185,7 @@ class TransactionManager:
             new_amount = input(f"New Amount [{transaction['Amount']}]: ").strip()
             if new_amount:
                 if not self._validate_amount(new_amount):
-                    print("❌ Invalid amount.")
+                    print(f"❌ Invalid amount. Use a number with at most {precision()} decimals.")
                     return
                 transaction["Amount"] = new_amount
 
@@ -181,10 +205,7 @@ class TransactionManager:
                 transaction["Description"] = new_desc
 
             # Save back to file
-            with open(self.user_csv_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writeheader()
-                writer.writerows(reader)
+            self.store.update(txn_id, Transaction.from_row(transaction))
 
             print("✅ Transaction updated successfully.")
 
@@ -194,23 +215,15 @@ class TransactionManager:
             ############
 
     # -------------------- DELETE TRANSACTION --------------------
-    def delete_transaction(self, index):
-        """Delete a transaction by its index (1-based)."""
+    @timed
+    def delete_transaction(self, txn_id):
+        """Delete a transaction by its ID."""
         try:
-            with open(self.user_csv_path, "r", newline="") as f:
-                reader = list(csv.DictReader(f))
-
-            if index < 1 or index > len(reader):
-                print("❌ Invalid transaction number.")
+            deleted = self.store.delete(txn_id)
+            if deleted is None:
+                print("❌ Invalid transaction ID.")
                 return
 
-            deleted = reader.pop(index - 1)
-
-            with open(self.user_csv_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writeheader()
-                writer.writerows(reader)
-
             print(
                 f"✅ Deleted transaction: {deleted['Category']} ({deleted['Amount']})"
             )
@@ -219,49 +232,86 @@ class TransactionManager:
             print(f"Error deleting transaction: {e}")
 
     # -------------------- READ TRANSACTIONS --------------------
-    def _read_transactions(self):
+    @timed
+    def find_row(self, txn_id, rows=()):
+        """Return the transaction with txn_id, from rows if it is there, else from the store."""
+        for row in rows:
+            if row.id == txn_id:
+                return row
+        return self.store.get(txn_id)
+
+    @staticmethod
+    def _print_rows(rows):
+        for row in rows:
+            print(
+                f"{row.id}. {row['Date']} | {row['Type']} | {row['Category']} | "
+                f"{row['Amount']} | {row['Payment Method']} | {row['Description']}"
+            )
+
+    # -------------------- LIST TRANSACTIONS --------------------
+    @timed
+    def list_transactions(self, page_size=PAGE_SIZE):
+        """Page through transactions, starting at the most recent page.
+
+        Only the rows on screen are read from disk. Returns the rows of the
+        page left open so edit/delete can reuse them.
+        """
         try:
-            with open(self.user_csv_path, "r") as f:
-                return list(csv.DictReader(f))
+            total = self.store.count()
         except Exception as e:
             print(f"Error reading file: {e}")
             return []
-
-    # -------------------- LIST TRANSACTIONS --------------------
-    def list_transactions(self):
-        """Display all transactions."""
-        rows = self._read_transactions()
-        if not rows:
+        if not total:
             print("No transactions found.")
-            return
+            return []
 
-        print("\n--- Transactions ---")
-        for i, row in enumerate(rows, start=1):
-            print(
-                f"{i}. {row['Date']} | {row['Type']} | {row['Category']} | "
-                f"{row['Amount']} | {row['Payment Method']} | {row['Description']}"
-            )
+        pages = (total + page_size - 1) // page_size
+        page, shown, rows = pages - 1, None, []
+        while True:
+            if page != shown:
+                rows = self.store.page(page * page_size, page_size)
+                shown = page
+                print(f"\n--- Transactions (page {page + 1} of {pages}, {total} in total) ---")
+                self._print_rows(rows)
+
+            choice = input("[n]ext, [p]revious, [d]ate jump, Enter to finish: ").strip().lower()
+            if not choice:
+                return rows
+            if choice == "n":
+                if page + 1 < pages:
+                    page += 1
+                else:
+                    print("Already on the last page.")
+            elif choice == "p":
+                if page > 0:
+                    page -= 1
+                else:
+                    print("Already on the first page.")
+            elif choice == "d":
+                date_str = input("Jump to date (YYYY-MM-DD): ").strip()
+                if not self._validate_date(date_str):
+                    print("❌ Invalid date format.")
+                    continue
+                position = self.store.date_position(datetime.strptime(date_str, "%Y-%m-%d").date())
+                if position is None:
+                    print("❌ No transactions on or after that date.")
+                else:
+                    page, shown = position // page_size, None
+            else:
+                print("❌ Invalid choice.")
 
     # -------------------- BALANCE FEATURE --------------------
+    @timed
     def calculate_balance(self):
         """Calculate total income, total expenses, and net balance."""
-        rows = self._read_transactions()
-        income_total = Decimal("0.00")
-        expense_total = Decimal("0.00")
-
-        for row in rows:
-            try:
-                amount = Decimal(row["Amount"])
-                if row["Type"].lower() == "income":
-                    income_total += amount
-                elif row["Type"].lower() == "expense":
-                    expense_total += amount
-            except (InvalidOperation, KeyError):
-                continue
+        aggregates = self.store.aggregates
+        income_total = aggregates.total("Income")
+        expense_total = aggregates.total("Expense")
 
         balance = income_total - expense_total
         return income_total, expense_total, balance
 
+    @timed
     def view_balance(self):
         """Display current financial summary."""
         income_total, expense_total, balance = self.calculate_balance()
@@ -276,29 +326,51 @@ class TransactionManager:
             print(f"Net Balance:   🔴 {balance}")
 
     # -------------------- SEARCH TRANSACTIONS --------------------
+    @timed
+    def find_transactions(self, keyword):
+        """Return transactions matching every word of keyword, best matches first."""
+        return self.store.get_many(self.store.search_ids(keyword))
+
+    @timed
     def search_transactions(self, keyword):
         """Search transactions by keyword in category, payment method, or description."""
-        rows = self._read_transactions()
+        results = self.find_transactions(keyword)
         keyword = keyword.lower()
-        results = [
-            row
-            for row in rows
-            if keyword in row["Category"].lower()
-            or keyword in row["Payment Method"].lower()
-            or keyword in row["Description"].lower()
-        ]
 
         if results:
             print(f"\n🔎 Search Results for '{keyword}':")
-            for i, row in enumerate(results, start=1):
-                print(
-                    f"{i}. {row['Date']} | {row['Type']} | {row['Category']} | "
-                    f"{row['Amount']} | {row['Payment Method']} | {row['Description']}"
-                )
+            self._print_rows(results)
         else:
             print(f"\n❌ No transactions found matching '{keyword}'.")
 
     # -------------------- FILTER TRANSACTIONS --------------------
+    @timed
+    def query_transactions(
+        self,
+        t_type=None,
+        category=None,
+        start_date=None,
+        end_date=None,
+        min_amount=None,
+        max_amount=None,
+        payment_method=None,
+    ):
+        """Return the transactions matching all given filters (blank filters are ignored).
+
+        Raises ValueError for an invalid date or amount.
+        """
+        ids = self.store.filter_ids(
+            t_type=t_type,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            payment_method=payment_method,
+        )
+        return self.store.get_many(ids)
+
+    @timed
     def filter_transactions(
         self,
         t_type=None,
@@ -310,50 +382,22 @@ class TransactionManager:
         payment_method=None,
     ):
         """Filter transactions based on multiple criteria."""
-        rows = self._read_transactions()
-
-        def parse_date(d):
-            return datetime.strptime(d, "%Y-%m-%d") if d else None
-
-        start_date = parse_date(start_date)
-        end_date = parse_date(end_date)
-        min_amount = Decimal(min_amount) if min_amount else None
-        max_amount = Decimal(max_amount) if max_amount else None
-
-        results = []
-        for row in rows:
-            try:
-                row_date = parse_date(row["Date"])
-                row_amount = Decimal(row["Amount"])
-
-                if t_type and row["Type"].lower() != t_type.lower():
-                    continue
-                if category and row["Category"].lower() != category.lower():
-                    continue
-                if (
-                    payment_method
-                    and row["Payment Method"].lower() != payment_method.lower()
-                ):
-                    continue
-                if start_date and row_date < start_date:
-                    continue
-                if end_date and row_date > end_date:
-                    continue
-                if min_amount and row_amount < min_amount:
-                    continue
-                if max_amount and row_amount > max_amount:
-                    continue
-
-                results.append(row)
-            except Exception:
-                continue
+        try:
+            results = self.query_transactions(
+                t_type,
+                category,
+                start_date,
+                end_date,
+                min_amount,
+                max_amount,
+                payment_method,
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
 
         if results:
             print("\n✅ Filtered Transactions:")
-            for i, row in enumerate(results, start=1):
-                print(
-                    f"{i}. {row['Date']} | {row['Type']} | {row['Category']} | "
-                    f"{row['Amount']} | {row['Payment Method']} | {row['Description']}"
-                )
+            self._print_rows(results)
         else:
             print("\n❌ No transactions match your filters.")
@@ -0,0 +1,1072 @@
+import bisect
+import csv
+import io
+import os
+import sys
+import threading
+from array import array
+from datetime import date as Date, datetime
+from decimal import Decimal, InvalidOperation
+import numpy as np
+from . import metrics
+from .file_lock import BUSY_TIMEOUT, FileLock, atomic_write
+from .id_index import MISSING, IdIndex, in_log, log_offset
+from .money import NA, from_minor, precision, to_minor
+
+HEADERS = [
+    "ID",
+    "Date",
+    "Type",
+    "Category",
+    "Amount",
+    "Payment Method",
+    "Description",
+]
+
+# Backend of users whose folder holds no ledger yet: "csv" or "sqlite".
+STORAGE_BACKEND = os.environ.get("PFM_STORAGE", "csv")
+CSV_FILE = "transactions.csv"
+# Day 0 of the integer day numbers kept by the cache, fingerprints and SQLite.
+EPOCH = Date(1970, 1, 1)
+SQLITE_FILE = "transactions.db"
+# "log" appends edits/deletes to transactions.log; "rewrite" rewrites the CSV.
+WRITE_MODE = os.environ.get("PFM_WRITE_MODE", "log")
+# Number of write-log records that triggers a background compaction.
+COMPACT_THRESHOLD = 500
+
+
+class Transaction:
+    """A single transaction row with typed fields.
+
+    Uses __slots__ and interned type/category/method strings, since
+    ledgers create many of these.
+    """
+
+    __slots__ = ("id", "date", "type", "category", "amount", "payment_method", "description", "raw")
+
+    def __init__(
+        self,
+        date,
+        t_type,
+        category,
+        amount,
+        payment_method,
+        description,
+        raw=None,
+        txn_id=None,
+    ):
+        """
+        Create a transaction from already-parsed values.
+        :param date: datetime.date, or None if the stored date is invalid
+        :param amount: Decimal, or None if the stored amount is invalid
+        :param raw: original CSV values, kept only for rows that failed to parse
+        :param txn_id: stable ID, assigned by the store when first saved
+        """
+        self.id = txn_id
+        self.date = date
+        self.type = t_type
+        self.category = category
+        self.amount = amount
+        self.payment_method = payment_method
+        self.description = description
+        self.raw = raw
+
+    @staticmethod
+    def from_row(row):
+        """Parse a CSV row (dict keyed by header) into a Transaction."""
+        date_str = (row.get("Date") or "").strip()
+        amount_str = (row.get("Amount") or "").strip()
+        raw = None
+
+        try:
+            date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            date = None
+        try:
+            amount = Decimal(amount_str)
+        except (InvalidOperation, ValueError):
+            amount = None
+
+        if date is None or amount is None:
+            raw = {"Date": date_str, "Amount": amount_str}
+
+        try:
+            txn_id = int(row.get("ID") or "")
+        except ValueError:
+            txn_id = None
+
+        return Transaction(
+            date=date,
+            t_type=sys.intern((row.get("Type") or "").strip().capitalize()),
+            category=sys.intern((row.get("Category") or "").strip().capitalize()),
+            amount=amount,
+            payment_method=sys.intern((row.get("Payment Method") or "").strip().title()),
+            description=(row.get("Description") or "").strip(),
+            raw=raw,
+            txn_id=txn_id,
+        )
+
+    def to_row(self):
+        """Convert the transaction back into a list of CSV values."""
+        return [self[h] for h in HEADERS]
+
+    def __getitem__(self, key):
+        """Allow row['Date'] style access like the csv.DictReader rows this replaces."""
+        if key == "ID":
+            return "" if self.id is None else str(self.id)
+        if key == "Date":
+            if self.date is None:
+                return self.raw["Date"]
+            return self.date.strftime("%Y-%m-%d")
+        if key == "Amount":
+            if self.amount is None:
+                return self.raw["Amount"]
+            return str(self.amount)
+        if key == "Type":
+            return self.type
+        if key == "Category":
+            return self.category
+        if key == "Payment Method":
+            return self.payment_method
+        if key == "Description":
+            return self.description
+        raise KeyError(key)
+
+    def __repr__(self):
+        return repr(dict(zip(HEADERS, self.to_row())))
+
+
+class _Codes:
+    """Dictionary encoding of a categorical string column into small ints."""
+
+    __slots__ = ("values", "lookup", "codes")
+
+    def __init__(self):
+        self.values = []  # code -> string
+        self.lookup = {}  # string -> code
+        self.codes = array("H")
+
+    def encode(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+            if code > 0xFFFF and self.codes.typecode == "H":
+                self.codes = array("i", self.codes)
+        return code
+
+
+class TransactionTable:
+    """Array-of-columns container holding many transactions compactly.
+
+    IDs, dates (as ordinals) and amounts (as minor units plus the exponent
+    they were written with) live in array('q')/array('b') columns, type,
+    category and payment method as small-int codes into shared string
+    tables, and descriptions in one UTF-8 buffer. Transaction objects are
+    only built for the rows actually accessed. IDs must be added in
+    ascending order; rows that don't fit the columns (unparsed values,
+    amounts with more decimals than the currency keeps) are kept aside.
+    """
+
+    def __init__(self, transactions=()):
+        self.ids = array("q")
+        self._days = array("q")
+        self._units = array("q")
+        self._exponents = array("b")
+        self._types = _Codes()
+        self._categories = _Codes()
+        self._methods = _Codes()
+        self._desc = bytearray()
+        self._desc_end = array("q")
+        self._raw = {}  # ID -> Transaction.raw of rows that failed to parse
+        self._amounts = {}  # ID -> Decimal amounts the columns can't reproduce
+        self.extend(transactions)
+
+    # -------------------- ENCODING --------------------
+    def _encode_amount(self, txn):
+        """Return (units, exponent) for txn.amount, or (NA, 0) to keep it aside."""
+        amount = txn.amount
+        if amount is None:
+            return NA, 0
+        units = to_minor(amount)
+        sign, _, exponent = amount.as_tuple()
+        if units == NA or sign and not units or not -precision() <= exponent <= 127:
+            self._amounts[txn.id] = amount  # e.g. -0, NaN, 1.005 in cents, 1E+200
+            return NA, 0
+        return units, exponent
+
+    def append(self, txn):
+        self.ids.append(txn.id)
+        self._days.append(NA if txn.date is None else txn.date.toordinal())
+        units, exponent = self._encode_amount(txn)
+        self._units.append(units)
+        self._exponents.append(exponent)
+        for codes, value in (
+            (self._types, txn.type),
+            (self._categories, txn.category),
+            (self._methods, txn.payment_method),
+        ):
+            codes.codes.append(codes.encode(value))
+        self._desc += txn.description.encode("utf-8")
+        self._desc_end.append(len(self._desc))
+        if txn.raw is not None:
+            self._raw[txn.id] = txn.raw
+
+    def extend(self, transactions):
+        for txn in transactions:
+            self.append(txn)
+
+    # -------------------- DECODING --------------------
+    def _description(self, position):
+        start = self._desc_end[position - 1] if position else 0
+        return self._desc[start : self._desc_end[position]].decode("utf-8")
+
+    def _amount(self, position):
+        units = self._units[position]
+        if units == NA:
+            return self._amounts.get(self.ids[position])
+        amount = from_minor(units)
+        exponent = self._exponents[position]
+        if exponent != amount.as_tuple().exponent:
+            amount = amount.quantize(Decimal(1).scaleb(exponent))
+        return amount
+
+    def _row(self, position):
+        txn_id = self.ids[position]
+        day = self._days[position]
+        return Transaction(
+            date=None if day == NA else Date.fromordinal(day),
+            t_type=self._types.values[self._types.codes[position]],
+            category=self._categories.values[self._categories.codes[position]],
+            amount=self._amount(position),
+            payment_method=self._methods.values[self._methods.codes[position]],
+            description=self._description(position),
+            raw=self._raw.get(txn_id),
+            txn_id=txn_id,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self._row(position)
+
+    def rows(self):
+        """Yield (id, CSV values) for every row without building Transactions."""
+        dates = {}
+        types, categories, methods = self._types, self._categories, self._methods
+        for position, txn_id in enumerate(self.ids):
+            if txn_id in self._raw:
+                yield txn_id, self._row(position).to_row()
+                continue
+            day = self._days[position]
+            date_str = dates.get(day)
+            if date_str is None:
+                date_str = dates[day] = Date.fromordinal(day).strftime("%Y-%m-%d")
+            yield txn_id, [
+                str(txn_id),
+                date_str,
+                types.values[types.codes[position]],
+                categories.values[categories.codes[position]],
+                str(self._amount(position)),
+                methods.values[methods.codes[position]],
+                self._description(position),
+            ]
+
+    # -------------------- LOOKUP / EDIT --------------------
+    def position(self, txn_id):
+        """Return the row position of an ID, or None."""
+        position = bisect.bisect_left(self.ids, txn_id)
+        if position < len(self.ids) and self.ids[position] == txn_id:
+            return position
+        return None
+
+    def get(self, txn_id):
+        position = self.position(txn_id)
+        return None if position is None else self._row(position)
+
+    def _forget(self, txn_id):
+        self._raw.pop(txn_id, None)
+        self._amounts.pop(txn_id, None)
+
+    def replace(self, position, txn):
+        """Overwrite the row at position with txn (which keeps the row's ID)."""
+        self._forget(self.ids[position])
+        self._days[position] = NA if txn.date is None else txn.date.toordinal()
+        self._units[position], self._exponents[position] = self._encode_amount(txn)
+        for codes, value in (
+            (self._types, txn.type),
+            (self._categories, txn.category),
+            (self._methods, txn.payment_method),
+        ):
+            codes.codes[position] = codes.encode(value)
+        self._splice_description(position, txn.description.encode("utf-8"))
+        if txn.raw is not None:
+            self._raw[txn.id] = txn.raw
+
+    def delete(self, position):
+        """Remove the row at position."""
+        self._forget(self.ids[position])
+        self._splice_description(position, b"")
+        for column in (
+            self.ids,
+            self._days,
+            self._units,
+            self._exponents,
+            self._types.codes,
+            self._categories.codes,
+            self._methods.codes,
+            self._desc_end,
+        ):
+            del column[position]
+
+    def _splice_description(self, position, data):
+        start = self._desc_end[position - 1] if position else 0
+        end = self._desc_end[position]
+        self._desc[start:end] = data
+        shift = len(data) - (end - start)
+        if shift:
+            np.frombuffer(self._desc_end, dtype=np.int64)[position:] += shift
+
+
+def _encode_row(values):
+    """Encode one CSV record exactly as csv.writer would write it."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue().encode("utf-8")
+
+
+def _read_records(f):
+    """Yield (byte offset, fields) for every CSV record in a binary file."""
+    position = [f.tell()]
+
+    def lines():
+        for line in f:
+            position[0] += len(line)
+            yield line.decode("utf-8")
+
+    start = position[0]
+    for record in csv.reader(lines()):
+        yield start, record
+        start = position[0]
+
+
+class TransactionStore:
+    """Interface of a user's transaction storage backend.
+
+    Managers only talk to this interface; CSVTransactionStore and
+    SQLiteTransactionStore implement it. Use open_store() to get the right
+    backend for a user folder.
+    """
+
+    def __init__(self):
+        self._listeners = []
+
+    # -------------------- LISTENERS --------------------
+    def add_listener(self, listener):
+        """Register an object notified after every write.
+
+        Listeners implement on_append(before, transactions),
+        on_update(before, old, new), on_delete(before, old) and
+        on_compact(before), where before is the state_stamp() the write
+        started from.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event, before, *args):
+        for listener in self._listeners:
+            getattr(listener, event)(before, *args)
+
+    # -------------------- READ --------------------
+    def state_stamp(self):
+        """Return a value that changes whenever the stored data does."""
+        raise NotImplementedError
+
+    def all(self):
+        """Return all transactions in ID order."""
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of transactions."""
+        raise NotImplementedError
+
+    def get(self, txn_id):
+        """Return the transaction with the given ID, or None."""
+        raise NotImplementedError
+
+    def get_many(self, ids):
+        """Return the transactions for a sequence of IDs, skipping missing ones."""
+        raise NotImplementedError
+
+    def last(self, n):
+        """Return the n most recently added transactions."""
+        raise NotImplementedError
+
+    def page(self, start, size):
+        """Return up to size transactions from row position start, in ID order."""
+        raise NotImplementedError
+
+    def date_position(self, day):
+        """Return the row position of the first transaction dated on or after day, or None."""
+        raise NotImplementedError
+
+    def id_position(self, txn_id):
+        """Return the row position of the first transaction with an ID above txn_id."""
+        raise NotImplementedError
+
+    # -------------------- QUERIES --------------------
+    def filter_ids(self, **criteria):
+        """Return IDs of rows matching FilterEngine-style criteria, in ID order."""
+        raise NotImplementedError
+
+    def search_ids(self, query):
+        """Return IDs of rows matching every word of query, best matches first."""
+        raise NotImplementedError
+
+    def frame(self, with_description=False, start=None, end=None):
+        """Return a report DataFrame, optionally limited to a date range."""
+        raise NotImplementedError
+
+    @property
+    def aggregates(self):
+        """Object answering total(t_type), count(), has_rent(), verify(), rebuild()."""
+        raise NotImplementedError
+
+    @property
+    def fingerprints(self):
+        """Object answering match() / match_fingerprints() for duplicate detection."""
+        raise NotImplementedError
+
+    @property
+    def cube(self):
+        """Object answering rollup(by, start, end, **where) over (month, type, category, method) cells."""
+        raise NotImplementedError
+
+    # -------------------- WRITE --------------------
+    def append(self, transactions, keep_in_memory=True):
+        """Append transactions, assigning their IDs."""
+        raise NotImplementedError
+
+    def update(self, txn_id, transaction):
+        """Replace a transaction. Returns False if it doesn't exist."""
+        raise NotImplementedError
+
+    def delete(self, txn_id):
+        """Delete a transaction, returning it (or None if it doesn't exist)."""
+        raise NotImplementedError
+
+    def compact(self, background=False):
+        """Tidy up the on-disk representation."""
+        raise NotImplementedError
+
+    def close(self):
+        """Finish pending work; call when the session ends."""
+        raise NotImplementedError
+
+
+class CSVTransactionStore(TransactionStore):
+    """Per-session, in-memory view of a user's transactions.csv.
+
+    Every row carries a stable ID. transactions.idx maps each ID to the byte
+    offset of its current version, so single records can be fetched, edited
+    or deleted with one seek. In "log" mode (the default) edits and deletes
+    are appended to a write log next to the CSV instead of rewriting it; the
+    log is merged on read and folded back into the CSV by compact().
+    "rewrite" mode keeps the old behaviour of rewriting the whole file on
+    every change.
+    """
+
+    def __init__(self, csv_path, mode=WRITE_MODE, compact_threshold=COMPACT_THRESHOLD):
+        """
+        Initialize the store. The file is parsed lazily on first access.
+        :param csv_path: Path to the user's transactions.csv file
+        :param mode: "log" or "rewrite"
+        :param compact_threshold: log records that trigger a background compaction
+        """
+        super().__init__()
+        self.csv_path = csv_path
+        base_path = os.path.splitext(csv_path)[0]
+        self.log_path = base_path + ".log"
+        self.index = IdIndex(base_path + ".idx")
+        self.mode = mode
+        self.compact_threshold = compact_threshold
+        self._rows = None  # TransactionTable while the file is loaded
+        self._next_id = 1
+        self._log_records = 0
+        self._signature = None
+        # Readers take it shared, writers exclusively; other processes
+        # using the same folder take the same lock.
+        self._lock = FileLock(base_path + ".lock")
+        self._compactor = None
+        self._cache = None
+        self._aggregates = None
+        self._search_index = None
+        self._fingerprints = None
+        self._cube = None
+
+        # Ensure file exists with headers ("x" so a concurrent creator's rows survive)
+        try:
+            with open(self.csv_path, "x", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(HEADERS)
+        except FileExistsError:
+            pass
+
+    # -------------------- FRESHNESS --------------------
+    def _file_signature(self):
+        """Return (mtime, size) of the CSV and log, used to detect outside changes."""
+        signature = []
+        for path in (self.csv_path, self.log_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def state_stamp(self):
+        """Return (csv inode, csv size, log size); changes whenever the data does.
+
+        Sidecar files record the stamp they were built for so they can tell
+        when the ledger was changed without them.
+        """
+        st = os.stat(self.csv_path)
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+        return st.st_ino, st.st_size, log_size
+
+    def _memory_fresh(self):
+        return self._rows is not None and self._file_signature() == self._signature
+
+    def refresh(self):
+        """Reload the file if it was changed outside this store."""
+        with self._lock.shared():
+            if not self._memory_fresh():
+                self._load()
+
+    # -------------------- LOAD --------------------
+    def _load(self):
+        """Parse the whole CSV into memory and replay the write log over it."""
+        with open(self.csv_path, "rb") as f:
+            records = _read_records(f)
+            header = next(records, (0, []))[1]
+            if "ID" not in header:
+                if not self._lock.held_exclusive:
+                    return self._reload_exclusively()
+                self._migrate(header, records)
+                return
+
+            offsets = {}
+            base = []
+            unassigned = []
+            for offset, record in records:
+                txn = Transaction.from_row(dict(zip(header, record)))
+                if txn.id is None:
+                    unassigned.append(txn)  # e.g. a row added by hand
+                    continue
+                base.append(txn)
+                offsets[txn.id] = offset
+            metrics.add(rows=len(base) + len(unassigned), bytes_read=f.tell())
+
+        changes = self._read_log()
+        self._rows = TransactionTable()
+        for txn in base:
+            if txn.id in changes:
+                txn = changes[txn.id][0]
+                if txn is None:
+                    continue
+            self._rows.append(txn)
+
+        max_id = max(self.index.max_id(), max(self._rows.ids, default=0))
+        self._next_id = max_id + 1
+        self._signature = self._file_signature()
+
+        if unassigned:
+            if not self._lock.held_exclusive:
+                return self._reload_exclusively()
+            for txn in unassigned:
+                txn.id = self._next_id
+                self._next_id += 1
+                self._rows.append(txn)
+            self._rewrite()
+            return
+
+        if self.index.stamp() != self.state_stamp():
+            entries = {}
+            for txn_id in self._rows.ids:
+                if txn_id in changes:
+                    entries[txn_id] = in_log(changes[txn_id][1])
+                else:
+                    entries[txn_id] = offsets[txn_id]
+            self.index.rebuild(entries, max_id, self.state_stamp())
+
+    def _reload_exclusively(self):
+        """Load again holding the lock exclusively, for loads that must rewrite the CSV.
+
+        Upgrading the lock lets other writers in first, so the file is re-read.
+        """
+        with self._lock:
+            self._load()
+
+    def _read_log(self):
+        """Return {id: (Transaction or None if deleted, log offset)} from the write log."""
+        changes = {}
+        self._log_records = 0
+        if not os.path.exists(self.log_path):
+            return changes
+        self._trim_torn_record()
+        with open(self.log_path, "rb") as f:
+            records = _read_records(f)
+            header = next(records, (0, []))[1]
+            # A log left over from a compaction that crashed after the CSV
+            # was replaced belongs to the old file, so it is discarded.
+            if header != ["#base", str(os.stat(self.csv_path).st_ino), "id"]:
+                stale = True
+            else:
+                stale = False
+                for offset, record in records:
+                    self._apply_log_record(changes, offset, record)
+            metrics.add(bytes_read=f.tell())
+        if stale:
+            try:
+                os.remove(self.log_path)
+            except FileNotFoundError:
+                pass  # another reader got there first
+        return changes
+
+    def _apply_log_record(self, changes, offset, record):
+        try:
+            if record[0] == "D":
+                changes[int(record[1])] = (None, offset)
+            elif record[0] == "U" and len(record) == 1 + len(HEADERS):
+                txn = Transaction.from_row(dict(zip(HEADERS, record[1:])))
+                changes[txn.id] = (txn, offset)
+            else:
+                return
+        except (IndexError, ValueError):
+            return
+        self._log_records += 1
+
+    def _trim_torn_record(self):
+        """Drop a partially written last record left behind by a crash."""
+        with open(self.log_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _migrate(self, header, records):
+        """Give a pre-ID file (and its position-based write log) stable IDs."""
+        rows = [Transaction.from_row(dict(zip(header, record))) for _, record in records]
+        try:
+            with open(self.log_path, "r", newline="") as f:
+                reader = csv.reader(f)
+                if next(reader, None) == ["#base", str(os.stat(self.csv_path).st_ino)]:
+                    for record in reader:
+                        position = int(record[1])
+                        if record[0] == "D":
+                            rows[position] = None
+                        elif record[0] == "U":
+                            rows[position] = Transaction.from_row(
+                                dict(zip(HEADERS[1:], record[2:]))
+                            )
+        except (FileNotFoundError, IndexError, ValueError):
+            pass
+
+        rows = [txn for txn in rows if txn is not None]
+        for txn_id, txn in enumerate(rows, start=1):
+            txn.id = txn_id
+        self._rows = TransactionTable(rows)
+        self._next_id = len(rows) + 1
+        self._rewrite()
+
+    def refresh_index(self):
+        """Make sure the ID index (and any pending ID migration) is up to date."""
+        with self._lock.shared():
+            self._ensure_index()
+
+    def pending_changes(self):
+        """Return {id: Transaction, or None if deleted} for records still in the write log."""
+        with self._lock.shared():
+            return {txn_id: txn for txn_id, (txn, _) in self._read_log().items()}
+
+    # -------------------- SIDECARS --------------------
+    # Sidecars are created, read and rebuilt with the store lock held
+    # exclusively, so threads and processes sharing a ledger never race on
+    # their files.
+    @property
+    def cache(self):
+        """Columnar cache of this ledger, created on first use."""
+        with self._lock:
+            if self._cache is None:
+                from .columnar_cache import ColumnarCache
+
+                self._cache = ColumnarCache(self)
+            return self._cache
+
+    @property
+    def aggregates(self):
+        """Running totals of this ledger, created on first use."""
+        with self._lock:
+            if self._aggregates is None:
+                from .aggregates import Aggregates
+
+                self._aggregates = Aggregates(self)
+            return self._aggregates
+
+    @property
+    def search_index(self):
+        """Full-text index of this ledger, created on first use."""
+        with self._lock:
+            if self._search_index is None:
+                from .search_index import SearchIndex
+
+                self._search_index = SearchIndex(self)
+            return self._search_index
+
+    @property
+    def fingerprints(self):
+        """Duplicate-detection fingerprints of this ledger, created on first use."""
+        with self._lock:
+            if self._fingerprints is None:
+                from .fingerprints import FingerprintIndex
+
+                self._fingerprints = FingerprintIndex(self)
+            return self._fingerprints
+
+    @property
+    def cube(self):
+        """Report rollup cube of this ledger, created on first use."""
+        with self._lock:
+            if self._cube is None:
+                from .cube import Cube
+
+                self._cube = Cube(self)
+            return self._cube
+
+    # -------------------- QUERIES --------------------
+    def filter_ids(self, **criteria):
+        """Evaluate filters as NumPy masks over the columnar cache."""
+        from .filter_engine import FilterEngine
+
+        with self._lock:
+            return FilterEngine(self.cache).filter_ids(**criteria)
+
+    def search_ids(self, query):
+        """Look the query up in the inverted search index."""
+        with self._lock:
+            return self.search_index.search(query)
+
+    def frame(self, with_description=False, start=None, end=None):
+        """Build the report DataFrame from the columnar cache."""
+        with self._lock:
+            return self.cache.to_frame(with_description=with_description, start=start, end=end)
+
+    # -------------------- READ --------------------
+    def all(self):
+        """Return all transactions in file order, as a TransactionTable."""
+        self.refresh()
+        return self._rows
+
+    def count(self):
+        """Return the number of stored transactions (from the ID index if not loaded)."""
+        with self._lock.shared():
+            if self._memory_fresh():
+                return len(self._rows)
+            self._ensure_index()
+            if self._memory_fresh():
+                return len(self._rows)
+            return len(self.index.live_ids())
+
+    def get_many(self, ids):
+        """Return the transactions for a sequence of IDs, skipping missing ones."""
+        with self._lock.shared():
+            # Seeking row by row only pays off for small result sets.
+            if len(ids) > 1000:
+                self.refresh()
+            if self._memory_fresh():
+                return [txn for txn in map(self._rows.get, ids) if txn is not None]
+            self._ensure_index()
+            return self._read_at(self.index.lookup_many([int(i) for i in ids]))
+
+    def page(self, start, size):
+        """Return one page of rows, decoding only those rows when the file isn't loaded.
+
+        The page's IDs are found in the ID index and each row is read with
+        one seek, so paging through a huge ledger never parses all of it.
+        """
+        with self._lock.shared():
+            if not self._memory_fresh():
+                self._ensure_index()
+            if self._memory_fresh():
+                return self._rows[start : start + size]
+            ids = self.index.live_ids()[start : start + size]
+            return self._read_at(self.index.lookup_many(ids.tolist()))
+
+    def date_position(self, day):
+        """Find the first row dated on or after day through the cache's date index."""
+        with self._lock:
+            columns, _ = self.cache.columns()
+            positions = self.cache.range_positions(columns, (day - EPOCH).days, None)
+            return int(positions[0]) if len(positions) else None
+
+    def id_position(self, txn_id):
+        """Count the rows with an ID up to txn_id, from the ID index if not loaded."""
+        with self._lock.shared():
+            if not self._memory_fresh():
+                self._ensure_index()
+            if self._memory_fresh():
+                return bisect.bisect_right(self._rows.ids, txn_id)
+            return int(np.searchsorted(self.index.live_ids(), txn_id, side="right"))
+
+    def last(self, n):
+        """Return the n most recently added transactions without loading the file."""
+        with self._lock.shared():
+            if self._memory_fresh():
+                return self._rows[-n:] if n else []
+            self._ensure_index()
+            result = []
+            txn_id = self.index.max_id()
+            while txn_id > 0 and len(result) < n:
+                txn = self.get(txn_id)
+                if txn is not None:
+                    result.append(txn)
+                txn_id -= 1
+            return result[::-1]
+
+    def get(self, txn_id):
+        """Return the transaction with the given ID, or None."""
+        with self._lock.shared():
+            if self._memory_fresh():
+                return self._rows.get(txn_id)
+            self._ensure_index()
+            found = self._read_at([self.index.lookup(txn_id)])
+            return found[0] if found else None
+
+    def _read_at(self, values):
+        """Decode the rows stored at the given ID index values, skipping MISSING ones."""
+        files = {}
+        result = []
+        try:
+            for value in values:
+                if value == MISSING:
+                    continue
+                in_csv = value >= 0
+                if in_csv not in files:
+                    if in_csv:
+                        f = open(self.csv_path, "rb")
+                        files[in_csv] = (f, next(_read_records(f))[1])
+                    else:
+                        files[in_csv] = (open(self.log_path, "rb"), ["Op"] + HEADERS)
+                f, header = files[in_csv]
+                f.seek(value if in_csv else log_offset(value))
+                record = next(_read_records(f))[1]
+                result.append(Transaction.from_row(dict(zip(header, record))))
+        finally:
+            for f, _ in files.values():
+                f.close()
+        metrics.add(rows=len(result))
+        return result
+
+    # -------------------- WRITE --------------------
+    def _ensure_index(self):
+        """Rebuild the ID index if the files were changed behind its back."""
+        if self.index.stamp() != self.state_stamp():
+            self._load()
+
+    def _after_write(self, memory_was_fresh):
+        """Keep the in-memory view and the index stamp in sync after a write."""
+        self.index.set_stamp(self.state_stamp())
+        if memory_was_fresh:
+            self._signature = self._file_signature()
+        else:
+            self._rows = None
+
+    def append(self, transactions, keep_in_memory=True):
+        """Append transactions to the end of the file, assigning their IDs.
+
+        The batch is written and fsynced once, however many rows it holds.
+        Bulk writers pass keep_in_memory=False so the rows are not retained
+        by the in-memory view (it is reloaded on next use instead).
+        """
+        with self._lock:
+            self._ensure_index()
+            before = self.state_stamp()
+            memory_was_fresh = keep_in_memory and self._memory_fresh()
+            self._next_id = max(self._next_id, self.index.max_id() + 1)
+            first_id = self._next_id
+
+            # Encode the whole batch, then write it with a single fsync.
+            offsets = []
+            chunks = []
+            with open(self.csv_path, "ab") as f:
+                offset = f.tell()
+                for txn in transactions:
+                    txn.id = self._next_id
+                    self._next_id += 1
+                    data = _encode_row(txn.to_row())
+                    chunks.append(data)
+                    offsets.append(offset)
+                    offset += len(data)
+                batch = b"".join(chunks)
+                f.write(batch)
+                f.flush()
+                os.fsync(f.fileno())
+            if offsets:
+                self.index.set_range(first_id, offsets)
+            metrics.add(bytes_written=len(batch))
+
+            if memory_was_fresh:
+                self._rows.extend(transactions)
+            self._after_write(memory_was_fresh)
+            self._notify("on_append", before, transactions)
+
+    def update(self, txn_id, transaction):
+        """Replace the transaction with the given ID. Returns False if it doesn't exist."""
+        with self._lock:
+            old = self.get(txn_id)
+            if old is None:
+                return False
+            before = self.state_stamp()
+            transaction.id = txn_id
+
+            if self.mode == "rewrite":
+                self.refresh()
+                self._rows.replace(self._rows.position(txn_id), transaction)
+                self._rewrite()
+                self._notify("on_update", before, old, transaction)
+                return True
+
+            memory_was_fresh = self._memory_fresh()
+            if memory_was_fresh:
+                self._rows.replace(self._rows.position(txn_id), transaction)
+            offset = self._append_log(["U"] + transaction.to_row())
+            self.index.set(txn_id, in_log(offset))
+            self._after_write(memory_was_fresh)
+            self._notify("on_update", before, old, transaction)
+            self._maybe_compact()
+            return True
+
+    def delete(self, txn_id):
+        """Delete the transaction with the given ID and return it (None if missing)."""
+        with self._lock:
+            deleted = self.get(txn_id)
+            if deleted is None:
+                return None
+            before = self.state_stamp()
+
+            if self.mode == "rewrite":
+                self.refresh()
+                self._remove_from_memory(txn_id)
+                self._rewrite()
+                self._notify("on_delete", before, deleted)
+                return deleted
+
+            memory_was_fresh = self._memory_fresh()
+            if memory_was_fresh:
+                self._remove_from_memory(txn_id)
+            self._append_log(["D", txn_id])
+            self.index.set(txn_id, MISSING)
+            self._after_write(memory_was_fresh)
+            self._notify("on_delete", before, deleted)
+            self._maybe_compact()
+            return deleted
+
+    def _remove_from_memory(self, txn_id):
+        self._rows.delete(self._rows.position(txn_id))
+
+    def _append_log(self, record):
+        """Durably append one record to the write log and return its offset."""
+        with open(self.log_path, "ab") as f:
+            start = f.tell()
+            if start == 0:
+                f.write(_encode_row(["#base", os.stat(self.csv_path).st_ino, "id"]))
+            offset = f.tell()
+            f.write(_encode_row(record))
+            f.flush()
+            os.fsync(f.fileno())
+            metrics.add(bytes_written=f.tell() - start)
+        self._log_records += 1
+        return offset
+
+    # -------------------- COMPACTION --------------------
+    def _maybe_compact(self):
+        if self._log_records >= self.compact_threshold:
+            self.compact(background=True)
+
+    def compact(self, background=False):
+        """Fold the write log into the CSV with an atomic rewrite."""
+        if background:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self.compact, daemon=True)
+                self._compactor.start()
+            return
+
+        with self._lock:
+            self.refresh()
+            if self._log_records == 0:
+                return
+            before = self.state_stamp()
+            self._rewrite()
+            self._notify("on_compact", before)
+
+    def close(self):
+        """Wait for any background compaction to finish and save the in-memory indexes."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            for index in (self._search_index, self._fingerprints, self._cube):
+                if index is not None:
+                    index.flush()
+
+    def _rewrite(self):
+        """Atomically replace the CSV with the in-memory transactions."""
+        offsets = {}
+        with atomic_write(self.csv_path) as f:
+            f.write(_encode_row(HEADERS))
+            for txn_id, values in self._rows.rows():
+                offsets[txn_id] = f.tell()
+                f.write(_encode_row(values))
+            metrics.add(bytes_written=f.tell())
+
+        # The log now describes the replaced file and is no longer needed.
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._log_records = 0
+        self.index.rebuild(offsets, self._next_id - 1, self.state_stamp())
+        self._signature = self._file_signature()
+
+
+def open_store(user_dir, backend=None):
+    """Open the transaction store of a user folder.
+
+    The backend is the one given, else the one whose file the folder
+    already holds (transactions.db for SQLite, transactions.csv for CSV),
+    else STORAGE_BACKEND. Run `python -m modules.migrate_storage` to move
+    CSV folders to SQLite.
+    """
+    if backend is None:
+        if os.path.exists(os.path.join(user_dir, SQLITE_FILE)):
+            backend = "sqlite"
+        elif os.path.exists(os.path.join(user_dir, CSV_FILE)):
+            backend = "csv"
+        else:
+            backend = STORAGE_BACKEND
+    if backend == "sqlite":
+        from .sqlite_store import SQLiteTransactionStore
+
+        return SQLiteTransactionStore(os.path.join(user_dir, SQLITE_FILE))
+    if backend == "csv":
+        return CSVTransactionStore(os.path.join(user_dir, CSV_FILE))
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -40,12 +40,6 @@ class UserManager:
     
     def register_user(self):
         """Handles new user registration."""
-        try:
-            data = self.data_handler.load_users()
-        except Exception as e:
-            print(f"Error loading users: {e}")
-            return None
-        
         print("Register New User")
         name = input("Enter your name: ").strip()
         if not name or not name.isalnum():
@@ -53,10 +47,13 @@ class UserManager:
             return None
         
         # Check if user already exists to prevent duplicates
-        for user_data in data["users"]:
-            if user_data["name"].lower() == name.lower():
+        try:
+            if self.data_handler.find_user(name) is not None:
                 print("User already exists. Please choose a different name.")
                 return None
+        except Exception as e:
+            print(f"Error loading users: {e}")
+            return None
         
         password = getpass("Enter your password: ").strip()
         if not password or len(password) < 6 or " " in password:
@@ -71,9 +68,10 @@ class UserManager:
                 password_hash=self.password_helper.hash_password(password)
             )
             
-            # Add user to data and save
-            data["users"].append(user.to_dict())
-            self.data_handler.save_data(data)
+            # Add user to the user store (fails if the name was just taken)
+            if not self.data_handler.add_user(user.to_dict()):
+                print("User already exists. Please choose a different name.")
+                return None
         
             # Create personal CSV file for the user
             self.data_handler.create_user_csv(user.user_id, user.name)
@@ -86,12 +84,6 @@ class UserManager:
     
     def login_user(self):
         """Handles user login."""
-        try:
-            data = self.data_handler.load_users()
-        except Exception as e:
-            print(f"Erro loading users: {e}")
-            return None
-
         print("User Login")
         name = input("Enter your name: ").strip()
         password = getpass("Enter your password: ").strip()
@@ -102,14 +94,32 @@ class UserManager:
         
         # Find and authenticate user
         try:
-            for user_data in data["users"]:
-                if user_data["name"].lower() == name.lower():
-                    if self.password_helper.verify_password(password, user_data["password"]):
-                        print(f"Welcome back, {name}")
-                        return User.from_dict(user_data)
+            user = self.authenticate(name, password)
+            if user is not None:
+                print(f"Welcome back, {name}")
+                return user
         except Exception as e:
             print(f"Error during login: {e}")
             return None
         
         print("Invalid name or password.")
-        return None
\ No newline at end of file
+        return None
+
+    def authenticate(self, name, password):
+        """Return the User for a name and password without prompting, or None if they don't match.
+
+        A hash in an old format or below the current cost is replaced by a
+        new one once the password is known to be right.
+        """
+        user_data = self.data_handler.find_user(name)
+        if user_data is not None:
+            if self.password_helper.verify_password(password, user_data["password"]):
+                if self.password_helper.needs_upgrade(user_data["password"]):
+                    user_data["password"] = self.password_helper.hash_password(password)
+                    self.data_handler.update_password(user_data["user_id"], user_data["password"])
+                return User.from_dict(user_data)
+        return None
+
+    def submit_authenticate(self, name, password):
+        """Run authenticate() in the password worker pool, returning a Future of the User or None."""
+        return self.password_helper.submit(self.authenticate, name, password)
\ No newline at end of file
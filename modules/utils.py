@@ -1,15 +1,188 @@
+"""Password hashing.
+
+Usage: python -m modules.utils calibrate [--target-ms 100]
+
+Hashes are salted and versioned:
+
+    $scrypt$v=1$ln=14,r=8,p=1$<salt>$<key>
+    $pbkdf2-sha256$v=1$i=600000$<salt>$<key>
+
+(base64 salt and key). scrypt is used where hashlib has it, PBKDF2
+otherwise. The cost of new hashes comes from password_cost.json, written
+by the calibrate command at install time so one verification takes about
+the target time on this machine. Plain SHA-256 hex digests from older
+versions still verify and are replaced on the next successful login.
+"""
+
+import base64
 import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from .file_lock import atomic_write
+
+PASSWORD_COST_FILE = "password_cost.json"
+VERSION = 1
+SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2-sha256"
+# Cost used until calibrate has been run.
+DEFAULT_COST = {"scrypt": "ln=14,r=8,p=1", "pbkdf2-sha256": "i=600000"}
+TARGET_MS = 100
+# scrypt needs 128 * r * 2**ln bytes per verification; beyond this cap
+# calibration adds cost through p, which takes time but no extra memory.
+MAX_LN = 15
+# Threads hashing passwords at once (hashlib releases the GIL while hashing).
+POOL_THREADS = os.cpu_count() or 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_cost = None
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _parse_params(params):
+    return {key: int(value) for key, value in (part.split("=") for part in params.split(","))}
+
+
+def _derive(scheme, params, password, salt):
+    """Run the KDF named by scheme with "k=v,..." params."""
+    values = _parse_params(params)
+    if scheme == "scrypt":
+        n, r, p = 2 ** values["ln"], values["r"], values["p"]
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * r * (n + p), dklen=KEY_BYTES
+        )
+    if scheme == "pbkdf2-sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, values["i"], KEY_BYTES)
+    raise ValueError(f"Unknown password hash scheme {scheme!r}")
 
 
 class PasswordHelper:
-    """Simple class to handle password operations."""
-    
+    """Hash and verify passwords with a salted, tunable KDF.
+
+    hashlib runs scrypt and PBKDF2 without holding the GIL, so the shared
+    worker pool (submit()) spreads concurrent logins across cores without
+    blocking the event loop or the threads doing ledger work.
+    """
+
+    @staticmethod
+    def cost():
+        """Return (scheme, params) for new hashes, from password_cost.json if calibrated."""
+        global _cost
+        if _cost is None:
+            try:
+                with open(PASSWORD_COST_FILE, "r") as f:
+                    saved = json.load(f)
+                _cost = (saved["scheme"], saved["params"]) if saved["scheme"] == SCHEME else None
+            except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+                pass
+            _cost = _cost or (SCHEME, DEFAULT_COST[SCHEME])
+        return _cost
+
     @staticmethod
-    def hash_password(password):
-        """Converts a password into its SHA-256 hash."""
-        return hashlib.sha256(password.encode()).hexdigest()
-    
+    def set_cost(params):
+        """Use params (e.g. "ln=12,r=8,p=1") for new hashes in this process only."""
+        global _cost
+        _cost = (SCHEME, params)
+
+    @staticmethod
+    def hash_password(password, params=None):
+        """Return a versioned, salted hash of a password.
+
+        :param params: KDF cost such as "ln=14,r=8,p=1" (default: the calibrated cost)
+        """
+        scheme, default = PasswordHelper.cost()
+        params = params or default
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = _derive(scheme, params, password, salt)
+        return f"${scheme}$v={VERSION}${params}${_b64(salt)}${_b64(key)}"
+
     @staticmethod
     def verify_password(password, hashed):
         """Check if the provided password matches the hashed password."""
-        return PasswordHelper.hash_password(password) == hashed
\ No newline at end of file
+        if not hashed.startswith("$"):
+            # Unsalted SHA-256 from older versions.
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, hashed)
+        try:
+            _, scheme, _version, params, salt, key = hashed.split("$")
+            return hmac.compare_digest(_derive(scheme, params, password, _unb64(salt)), _unb64(key))
+        except (ValueError, KeyError, TypeError, OverflowError):
+            # A malformed or truncated hash fails the login rather than crashing it.
+            return False
+
+    @staticmethod
+    def needs_upgrade(hashed):
+        """True if a hash is legacy SHA-256 or uses another scheme or cost than new hashes."""
+        scheme, params = PasswordHelper.cost()
+        return not hashed.startswith(f"${scheme}$v={VERSION}${params}$")
+
+    @staticmethod
+    def submit(func, *args):
+        """Run func(*args) in the shared password worker pool, returning a Future."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        global _pool
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=POOL_THREADS, thread_name_prefix="pfm-kdf")
+        return _pool.submit(func, *args)
+
+
+def time_verify(params, repeats=3):
+    """Return the fastest of repeats verifications at the given cost, in seconds."""
+    scheme, _ = PasswordHelper.cost()
+    salt = secrets.token_bytes(SALT_BYTES)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _derive(scheme, params, "calibration password", salt)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(target_ms=TARGET_MS):
+    """Find the cost whose verification takes about target_ms here; return (params, seconds)."""
+    target = target_ms / 1000
+    if SCHEME == "scrypt":
+        ln = 10
+        while ln < MAX_LN and time_verify(f"ln={ln},r=8,p=1") * 2 <= target:
+            ln += 1
+        p = max(1, round(target / time_verify(f"ln={ln},r=8,p=1")))
+        params = f"ln={ln},r=8,p={p}"
+    else:
+        iterations = 100_000
+        params = f"i={max(iterations, round(iterations * target / time_verify(f'i={iterations}')))}"
+    return params, time_verify(params)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password hashing tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cal = commands.add_parser("calibrate", help=f"pick the hash cost for this machine and save {PASSWORD_COST_FILE}")
+    cal.add_argument("--target-ms", type=float, default=TARGET_MS, help="verification time to aim for")
+    args = parser.parse_args(argv)
+
+    params, seconds = calibrate(args.target_ms)
+    with atomic_write(PASSWORD_COST_FILE, "w") as f:
+        json.dump({"scheme": SCHEME, "params": params, "target_ms": args.target_ms, "measured_ms": seconds * 1000}, f)
+    print(f"✅ {SCHEME} {params}: {seconds * 1000:.0f}ms per verification (saved to {PASSWORD_COST_FILE}).")
+    print("Existing passwords are rehashed at this cost on their next login.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,302 @@
+"""Command-line access to a ledger without the interactive menus.
+
+Usage:
+  python pfm.py --user NAME add --type Expense --category Food --amount 12.50 --method Card
+  python pfm.py --user NAME add --file rows.jsonl      (one JSON object per line, - for stdin)
+  python pfm.py --user NAME import transactions.csv [--rejects rejected.csv]
+  python pfm.py --user NAME report summary [--period 2025-03]
+  python pfm.py --user NAME query --category food --start 2025-01-01 [--search coffee] [--limit 20]
+  python pfm.py --user NAME rollup --by month,category [--type Expense] [--period 2025]
+  python pfm.py --user NAME export [--format csv|jsonl|parquet] [--compress gzip|lzma] [--period 2025] [--incremental]
+
+The password is read from PFM_PASSWORD, or prompted for. --user-dir opens
+a data folder directly instead. Add --json to a command for machine-readable
+output.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from getpass import getpass
+from modules.api import REPORT_KINDS, open_user
+from modules.exporter import COMPRESSIONS, FORMATS
+
+
+def _rows_from_json_lines(path):
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}, line {number}: {e}")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _print_json(data):
+    # Money (and dates) are written as their exact string form.
+    json.dump(data, sys.stdout, indent=2, default=str, ensure_ascii=False)
+    print()
+
+
+def _print_rows(rows):
+    for row in rows:
+        print(
+            f"{row['ID']}. {row['Date']} | {row['Type']} | {row['Category']} | "
+            f"{row['Amount']} | {row['Payment Method']} | {row['Description']}"
+        )
+
+
+def _print_result(result, args):
+    if args.json:
+        _print_json(
+            {
+                "read": result.read,
+                "imported": result.imported,
+                "rejected": result.rejected,
+                "duplicates": result.duplicates,
+                "possible_duplicates": result.possible_duplicates,
+                "first_id": result.first_id,
+                "last_id": result.last_id,
+                "rejected_rows": result.rejected_rows,
+                "reject_path": result.reject_path,
+                "seconds": result.seconds,
+                "rows_per_second": result.rows_per_second,
+            }
+        )
+        return
+    if result.read == 1 and result.imported == 1:
+        print(f"✅ Added transaction {result.first_id}.")
+    elif result.read == 1:
+        print("❌ Transaction not added.")
+    else:
+        print(f"✅ Added {result.imported:,} of {result.read:,} transactions ({result.rows_per_second:,.0f} rows/sec)")
+    if result.duplicates:
+        print(f"🔁 {result.duplicates:,} duplicate rows skipped")
+    if result.possible_duplicates:
+        print(f"🔍 {result.possible_duplicates:,} added rows look similar to existing ones")
+    for row in result.rejected_rows[:20]:
+        print(f"⚠️ Skipped: {', '.join(row[:-1])} ({row[-1]})")
+    if len(result.rejected_rows) > 20:
+        print(f"⚠️ ... and {len(result.rejected_rows) - 20:,} more skipped rows")
+    if result.reject_path:
+        print(f"📄 Skipped rows saved to: {result.reject_path}")
+
+
+def cmd_add(api, args):
+    if args.file:
+        rows = _rows_from_json_lines(args.file)
+    else:
+        missing = [name for name in ("type", "category", "amount", "method") if not getattr(args, name)]
+        if missing:
+            raise ValueError(f"Missing --{', --'.join(missing)} (or use --file)")
+        rows = [
+            {
+                "Date": args.date or datetime.now().strftime("%Y-%m-%d"),
+                "Type": args.type,
+                "Category": args.category,
+                "Amount": args.amount,
+                "Payment Method": args.method,
+                "Description": args.description,
+            }
+        ]
+    result = api.add_transactions(rows, skip_duplicates=not args.allow_duplicates)
+    _print_result(result, args)
+    return 1 if result.rejected else 0
+
+
+def cmd_import(api, args):
+    if not os.path.exists(args.file):
+        raise ValueError(f"File not found: {args.file}")
+    result = api.import_csv(args.file, args.rejects)
+    _print_result(result, args)
+    return 0
+
+
+def cmd_report(api, args):
+    report = api.report(args.kind, args.period)
+    if args.json:
+        _print_json(report)
+    elif args.kind == "monthly":
+        print(f"=== Monthly Report ({args.period}) ===")
+        _print_rows(report["transactions"])
+    else:
+        for key, value in report.items():
+            if isinstance(value, dict):
+                print(f"{key}:")
+                for name, amount in value.items():
+                    print(f"  {name}: {amount}")
+            elif key == "ratio" and value is not None:
+                print(f"{key}: {value:.2f}")
+            elif value is not None:
+                print(f"{key}: {value}")
+    return 0
+
+
+def cmd_query(api, args):
+    filters = {
+        "t_type": args.type,
+        "category": args.category,
+        "start_date": args.start,
+        "end_date": args.end,
+        "min_amount": args.min,
+        "max_amount": args.max,
+        "payment_method": args.method,
+    }
+    rows = api.query(filters, search=args.search, limit=args.limit)
+    if args.json:
+        _print_json(rows)
+    elif rows:
+        _print_rows(rows)
+    else:
+        print("No transactions match.")
+    return 0
+
+
+def cmd_rollup(api, args):
+    by = [name.strip() for name in args.by.split(",") if name.strip()] if args.by else []
+    where = {name: getattr(args, name) for name in ("type", "category", "method") if getattr(args, name)}
+    rows = api.rollup(by, args.period, **where)
+    if args.json:
+        _print_json(rows)
+    elif rows:
+        for row in rows:
+            key = " | ".join(str(row[name]) or "(no date)" for name in by) or "All"
+            print(f"{key}: {row['sum']} in {row['count']} (min {row['min']}, max {row['max']})")
+    else:
+        print("No transactions match.")
+    return 0
+
+
+def cmd_export(api, args):
+    filters = {
+        "t_type": args.type,
+        "category": args.category,
+        "start_date": args.start,
+        "end_date": args.end,
+        "min_amount": args.min,
+        "max_amount": args.max,
+        "payment_method": args.method,
+    }
+    result = api.export(
+        args.output, args.format, args.compress, filters, args.period, args.incremental, args.name
+    )
+    if args.json:
+        _print_json(
+            {
+                "path": result.path,
+                "rows": result.rows,
+                "bytes_written": result.bytes_written,
+                "raw": result.raw,
+                "first_id": result.first_id,
+                "last_id": result.last_id,
+                "watermark": result.watermark,
+                "seconds": result.seconds,
+                "rows_per_second": result.rows_per_second,
+                "megabytes_per_second": result.megabytes_per_second,
+            }
+        )
+        return 0
+    if result.path is None:
+        print(f"ℹ️ No transactions added since ID {result.watermark}; nothing to export.")
+        return 0
+    print(f"✅ Exported {result.rows:,} transactions to: {result.path}")
+    if args.incremental:
+        print(f"🔖 Next incremental export starts after ID {result.watermark}")
+    print(
+        f"⏱️ {result.bytes_written / 2**20:,.1f} MB in {result.seconds:.2f}s "
+        f"({result.rows_per_second:,.0f} rows/sec, {result.megabytes_per_second:,.1f} MB/s)"
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pfm", description="Personal Finance Manager without the menus.")
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user", help="registered user name (password from PFM_PASSWORD or prompt)")
+    who.add_argument("--user-dir", help="open a user data folder directly")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--json", action="store_true", help="print JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", parents=[output], help="add one transaction, or many from JSON Lines")
+    add.add_argument("--file", help="JSON Lines file of transactions keyed by CSV header (- for stdin)")
+    add.add_argument("--date", help="YYYY-MM-DD (default: today)")
+    add.add_argument("--type", help="Income or Expense")
+    add.add_argument("--category")
+    add.add_argument("--amount")
+    add.add_argument("--method", help="Cash, Card, Bank Transfer, Wallet or Other")
+    add.add_argument("--description", default="")
+    add.add_argument("--allow-duplicates", action="store_true", help="add rows identical to existing ones")
+    add.set_defaults(func=cmd_add)
+
+    imp = commands.add_parser("import", parents=[output], help="import a CSV file")
+    imp.add_argument("file")
+    imp.add_argument("--rejects", help="CSV file for rejected rows (default: print them)")
+    imp.set_defaults(func=cmd_import)
+
+    report = commands.add_parser("report", parents=[output], help="print a report")
+    report.add_argument("kind", choices=REPORT_KINDS)
+    report.add_argument("--period", help="YYYY or YYYY-MM (required for monthly)")
+    report.set_defaults(func=cmd_report)
+
+    query = commands.add_parser("query", parents=[output], help="list matching transactions")
+    query.add_argument("--type")
+    query.add_argument("--category")
+    query.add_argument("--start", help="YYYY-MM-DD")
+    query.add_argument("--end", help="YYYY-MM-DD")
+    query.add_argument("--min", help="minimum amount")
+    query.add_argument("--max", help="maximum amount")
+    query.add_argument("--method", help="payment method")
+    query.add_argument("--search", help="keywords that must all appear")
+    query.add_argument("--limit", type=int)
+    query.set_defaults(func=cmd_query)
+
+    rollup = commands.add_parser("rollup", parents=[output], help="totals by any mix of month, type, category and method")
+    rollup.add_argument("--by", help="comma-separated dimensions: month, type, category, method")
+    rollup.add_argument("--period", help="YYYY or YYYY-MM")
+    rollup.add_argument("--type", help="only this type (exact)")
+    rollup.add_argument("--category", help="only this category (exact)")
+    rollup.add_argument("--method", help="only this payment method (exact)")
+    rollup.set_defaults(func=cmd_rollup)
+
+    export = commands.add_parser("export", parents=[output], help="export transactions to a file")
+    export.add_argument("--format", choices=list(FORMATS), default="csv")
+    export.add_argument("--compress", choices=list(COMPRESSIONS), help="compress the file (Parquet: gzip only)")
+    export.add_argument("--output", help="file to write (default: exports/transactions_export.<ext>)")
+    export.add_argument("--period", help="YYYY or YYYY-MM")
+    export.add_argument("--type")
+    export.add_argument("--category")
+    export.add_argument("--start", help="YYYY-MM-DD")
+    export.add_argument("--end", help="YYYY-MM-DD")
+    export.add_argument("--min", help="minimum amount")
+    export.add_argument("--max", help="maximum amount")
+    export.add_argument("--method", help="payment method")
+    export.add_argument("--incremental", action="store_true", help="only rows added since the last incremental export")
+    export.add_argument("--name", default="default", help="name of the incremental export's watermark")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.user_dir:
+            api = open_user(user_dir=args.user_dir)
+        else:
+            password = os.environ.get("PFM_PASSWORD") or getpass("Password: ")
+            api = open_user(args.user, password)
+        with api:
+            return args.func(api, args)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
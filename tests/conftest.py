@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.api import FinanceAPI
+from modules.transaction_store import open_store
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def api(request, tmp_path):
+    """A FinanceAPI over an empty user folder, once per storage backend."""
+    user_dir = tmp_path / "user"
+    user_dir.mkdir()
+    api = FinanceAPI(str(user_dir), open_store(str(user_dir), request.param))
+    yield api
+    api.close()
@@ -0,0 +1,38 @@
+"""The CSV ledger's cube recovers from drift instead of failing writes."""
+
+import pytest
+
+pytestmark = pytest.mark.parametrize("api", ["csv"], indirect=True)
+
+
+@pytest.fixture
+def api(api):
+    api.add_transactions(
+        [
+            {"Date": "2025-01-02", "Type": "Expense", "Category": "Food", "Amount": amount, "Payment Method": "Card"}
+            for amount in ["1.00", "2.00", "3.00"]
+        ],
+        skip_duplicates=False,
+    )
+    return api
+
+
+def drift(api, **changes):
+    """Corrupt the Food cell of the in-memory cube."""
+    cells = api.store.cube.cells()
+    key = ("2025-01", "Expense", "Food", "Card")
+    if changes.get("missing"):
+        del cells[key]
+    else:
+        cells[key][1] = changes["count"]
+
+
+@pytest.mark.parametrize("changes", [{"missing": True}, {"count": 1}])
+def test_delete_and_edit_survive_a_drifted_cube(api, changes):
+    drift(api, **changes)
+    assert api.delete(1)["Amount"] == "1.00"
+    drift(api, **changes)
+    assert api.update(3, {"Amount": "4.00"})["Amount"] == "4.00"
+    assert api.store.cube.verify() == []
+    (total,) = api.rollup()
+    assert (total["sum"], total["count"]) == (6, 2)
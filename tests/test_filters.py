@@ -0,0 +1,114 @@
+"""Filters must select exactly what the original row-by-row loop selected."""
+
+import random
+from datetime import datetime
+from decimal import Decimal
+import pytest
+
+SEEDS = range(5)
+CATEGORIES = ["Food", "Groceries", "Rent", "Salary"]
+METHODS = ["Cash", "Card", "Bank Transfer", "Wallet", "Other"]
+# Amounts sitting on and next to the bounds below.
+AMOUNTS = ["0", "0.00", "0.01", "0.02", "12.34", "12.35", "12.3", "99.99", "100", "100.01", "2500.50"]
+BOUNDS = ["0", "0.001", "0.005", "0.01", "0.015", "12.34", "12.345", "12.35", "99.999", "100", "1e2", "100.004"]
+
+
+def old_filter(rows, t_type=None, category=None, start_date=None, end_date=None, min_amount=None,
+               max_amount=None, payment_method=None):
+    """The loop of the original TransactionManager.filter_transactions, returning IDs."""
+
+    def parse_date(d):
+        return datetime.strptime(d, "%Y-%m-%d") if d else None
+
+    start_date = parse_date(start_date)
+    end_date = parse_date(end_date)
+    min_amount = Decimal(min_amount) if min_amount else None
+    max_amount = Decimal(max_amount) if max_amount else None
+
+    results = []
+    for row in rows:
+        try:
+            row_date = parse_date(row["Date"])
+            row_amount = Decimal(row["Amount"])
+
+            if t_type and row["Type"].lower() != t_type.lower():
+                continue
+            if category and row["Category"].lower() != category.lower():
+                continue
+            if payment_method and row["Payment Method"].lower() != payment_method.lower():
+                continue
+            if start_date and row_date < start_date:
+                continue
+            if end_date and row_date > end_date:
+                continue
+            if min_amount and row_amount < min_amount:
+                continue
+            if max_amount and row_amount > max_amount:
+                continue
+
+            results.append(int(row["ID"]))
+        except Exception:
+            continue
+    return results
+
+
+def random_criteria(rng):
+    def maybe(value):
+        return value if rng.random() < 0.4 else None
+
+    def day():
+        return f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+    return {
+        "t_type": maybe(rng.choice(["Income", "expense"])),
+        "category": maybe(rng.choice(CATEGORIES).upper()),
+        "start_date": maybe(day()),
+        "end_date": maybe(day()),
+        "min_amount": maybe(rng.choice(BOUNDS)),
+        "max_amount": maybe(rng.choice(BOUNDS)),
+        "payment_method": maybe(rng.choice(METHODS).lower()),
+    }
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_filters_match_original_loop(api, seed):
+    rng = random.Random(seed)
+    rows = [
+        {
+            "Date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Type": rng.choice(["Income", "Expense"]),
+            "Category": rng.choice(CATEGORIES),
+            "Amount": rng.choice(AMOUNTS),
+            "Payment Method": rng.choice(METHODS),
+            "Description": f"row {i}",
+        }
+        for i in range(400)
+    ]
+    api.add_transactions(rows, skip_duplicates=False)
+    stored = api.query()
+    assert len(stored) == len(rows)
+
+    for _ in range(200):
+        criteria = random_criteria(rng)
+        assert [int(i) for i in api.store.filter_ids(**criteria)] == old_filter(stored, **criteria), criteria
+
+
+@pytest.mark.parametrize(
+    "criteria, expected",
+    [
+        ({"max_amount": "12.345"}, ["0.00", "0.01", "12.34"]),
+        ({"min_amount": "12.345"}, ["12.35", "100"]),
+        ({"min_amount": "0.001", "max_amount": "0.005"}, []),
+        ({"min_amount": "0.001", "max_amount": "0.01"}, ["0.01"]),
+        ({"min_amount": "0", "max_amount": "1e2"}, ["0.00", "0.01", "12.34", "12.35", "100"]),
+    ],
+)
+def test_sub_precision_bounds(api, criteria, expected):
+    api.add_transactions(
+        [
+            {"Date": "2025-01-01", "Type": "Expense", "Category": "Food", "Amount": amount, "Payment Method": "Card"}
+            for amount in ["0.00", "0.01", "12.34", "12.35", "100"]
+        ],
+        skip_duplicates=False,
+    )
+    assert [row["Amount"] for row in api.query(criteria)] == expected
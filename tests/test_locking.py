@@ -0,0 +1,35 @@
+"""Concurrent writers from several processes must not lose or duplicate rows."""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_edit_log import write_ledger
+from stress_locking import verify, worker
+
+PROCESSES = 4
+OPS = 100
+SEED_ROWS = 200
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_concurrent_writers_lose_nothing(tmp_path, backend):
+    folder = str(tmp_path)
+    write_ledger(os.path.join(folder, "transactions.csv"), SEED_ROWS)
+    if backend == "sqlite":
+        from modules.migrate_storage import migrate_folder
+
+        migrate_folder(folder)
+
+    # Spawn, so workers don't inherit SQLite connections left open by earlier tests.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=PROCESSES, mp_context=context) as pool:
+        futures = [pool.submit(worker, folder, backend, n, OPS, SEED_ROWS) for n in range(PROCESSES)]
+        results = [f.result() for f in futures]
+
+    assert sum(len(r["added"]) for r in results) > 0
+    assert verify(folder, backend, SEED_ROWS, results) == []
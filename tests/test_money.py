@@ -0,0 +1,175 @@
+"""Totals in integer minor units must equal the same sums done in Decimal."""
+
+import os
+import random
+from collections import defaultdict
+from decimal import Decimal
+import pandas as pd
+import pytest
+from modules.api import FinanceAPI
+from modules.money import Money, parse_minor, to_minor
+from modules.transaction_manager import TransactionManager
+from modules.transaction_store import open_store
+
+SEEDS = range(5)
+CATEGORIES = ["Food", "Groceries", "Rent", "Salary", "Travel"]
+METHODS = ["Cash", "Card", "Bank Transfer", "Wallet", "Other"]
+
+
+def random_amount(rng):
+    """An amount with at most two decimals, written in one of the ways users type them."""
+    cents = rng.choice([0, 1, 5, 99, 100, 12345, rng.randrange(10**9)])
+    text = str(Decimal(cents).scaleb(-2))
+    form = rng.randrange(4)
+    if form == 1:
+        text = text.rstrip("0").rstrip(".") or "0"
+    elif form == 2:
+        text += "0"
+    elif form == 3 and text.startswith("0."):
+        text = text[1:]
+    return text
+
+
+def random_rows(rng, count):
+    return [
+        {
+            "Date": f"{rng.choice([2024, 2025])}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Type": rng.choice(["Income", "Expense"]),
+            "Category": rng.choice(CATEGORIES),
+            "Amount": random_amount(rng),
+            "Payment Method": rng.choice(METHODS),
+            "Description": f"row {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def reference(rows):
+    """Decimal totals of rows: overall, per type, per category and per month."""
+    totals = {"all": Decimal(0), **{key: defaultdict(Decimal) for key in ("type", "category", "month")}}
+    for row in rows:
+        amount = Decimal(row["Amount"])
+        totals["all"] += amount
+        totals["type"][row["Type"]] += amount
+        totals["category"][row["Category"]] += amount
+        totals["month"][row["Date"][:7]] += amount
+    return totals
+
+
+def check_totals(api, rows):
+    expected = reference(rows)
+    summary = api.report("summary")
+    assert summary["transactions"] == len(rows)
+    assert summary["total"] == expected["all"]
+    health = api.report("health")
+    assert health["income"] == expected["type"]["Income"]
+    assert health["expense"] == expected["type"]["Expense"]
+    categories = api.report("categories")["categories"]
+    assert {k: v for k, v in categories.items() if v} == {k: v for k, v in expected["category"].items() if v}
+    months = api.report("trends")["months"]
+    assert {k: v for k, v in months.items() if v} == {k: v for k, v in expected["month"].items() if v}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_totals_match_decimal_reference(api, seed):
+    rng = random.Random(seed)
+    rows = random_rows(rng, 300)
+    result = api.add_transactions(rows, skip_duplicates=False)
+    assert result.imported == len(rows)
+    check_totals(api, rows)
+
+    # Edits and deletes keep the running totals and the cube exact too.
+    ids = list(range(result.first_id, result.last_id + 1))
+    for txn_id in rng.sample(ids, 30):
+        amount = random_amount(rng)
+        api.update(txn_id, {"Amount": amount})
+        rows[ids.index(txn_id)]["Amount"] = amount
+    for txn_id in rng.sample(ids, 30):
+        api.delete(txn_id)
+        rows[ids.index(txn_id)] = None
+    check_totals(api, [row for row in rows if row is not None])
+
+
+def test_sub_precision_amounts_are_rejected(api):
+    fields = ["Date", "Type", "Category", "Amount", "Payment Method"]
+    rows = [
+        dict(zip(fields, values))
+        for values in [
+            ("2025-01-01", "Income", "Salary", "1000.50", "Bank Transfer"),
+            ("2025-01-02", "Expense", "Rent", "400", "Bank Transfer"),
+            ("2025-01-03", "Expense", "Food", "12.345", "Card"),
+            ("2025-01-04", "Expense", "Food", "0.005", "Cash"),
+            ("2025-01-05", "Expense", "Food", "1.5e-3", "Cash"),
+        ]
+    ]
+    result = api.add_transactions(rows)
+    assert result.imported == 2
+    assert [row[-1] for row in result.rejected_rows] == ["more than 2 decimals"] * 3
+    health = api.report("health")
+    assert health["income"] - health["expense"] == Decimal("600.50")
+
+    with pytest.raises(ValueError):
+        api.update(result.last_id, {"Amount": "400.001"})
+    assert api.update(result.last_id, {"Amount": "400.010"})["Amount"] == "400.010"
+
+
+def test_manual_entry_rejects_sub_precision_amounts(tmp_path):
+    manager = TransactionManager(str(tmp_path / "transactions.csv"))
+    assert manager._validate_amount("12.34")
+    assert manager._validate_amount("12.340")
+    assert not manager._validate_amount("12.345")
+    assert not manager._validate_amount("0.005")
+    assert not manager._validate_amount("NaN")
+    manager.store.close()
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_parse_minor_matches_to_minor(seed):
+    rng = random.Random(seed)
+    values = [
+        f"{rng.choice(['', '-', '+'])}{rng.randrange(10 ** rng.randint(1, 15))}."
+        f"{rng.randrange(10**4):0{rng.randint(0, 4)}d}"
+        for _ in range(2000)
+    ] + ["", " ", "abc", "NaN", "1e3", "0.005", "2.675", "1" * 25]
+    expected = []
+    for value in values:
+        try:
+            expected.append(to_minor(Decimal(value.strip())))
+        except ArithmeticError:
+            expected.append(to_minor(None))
+    assert parse_minor(pd.Series(values, dtype=object)).tolist() == expected
+
+
+def test_money_arithmetic_matches_decimal():
+    rng = random.Random(0)
+    for _ in range(1000):
+        a, b = (Decimal(rng.randrange(-10**9, 10**9)).scaleb(-2) for _ in range(2))
+        assert Money.parse(a) + Money.parse(b) == a + b
+        assert Money.parse(a) - Money.parse(b) == a - b
+        assert (Money.parse(a) < Money.parse(b)) == (a < b)
+        assert str(Money.parse(a)) == str(a)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_csv_and_sqlite_agree(tmp_path, seed):
+    rows = random_rows(random.Random(seed), 300)
+    apis = []
+    for backend in ("csv", "sqlite"):
+        user_dir = str(tmp_path / backend)
+        os.makedirs(user_dir)
+        apis.append(FinanceAPI(user_dir, open_store(user_dir, backend)))
+    csv_api, sqlite_api = apis
+    try:
+        for api in apis:
+            api.add_transactions(rows, skip_duplicates=False)
+        for kind in ("summary", "categories", "trends", "health"):
+            assert csv_api.report(kind) == sqlite_api.report(kind)
+            assert csv_api.report(kind, "2024") == sqlite_api.report(kind, "2024")
+        assert csv_api.report("monthly", "2025-03") == sqlite_api.report("monthly", "2025-03")
+        assert csv_api.rollup(["month", "type", "category", "method"]) == sqlite_api.rollup(
+            ["month", "type", "category", "method"]
+        )
+        assert csv_api.query() == sqlite_api.query()
+    finally:
+        for api in apis:
+            api.close()
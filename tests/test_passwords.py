@@ -0,0 +1,50 @@
+"""Stored password hashes verify, and malformed ones fail instead of raising."""
+
+import hashlib
+import pytest
+from modules.utils import SCHEME, PasswordHelper
+
+# Cheap cost so the tests run fast.
+PARAMS = "ln=4,r=8,p=1" if SCHEME == "scrypt" else "i=1000"
+
+
+def test_hash_round_trip():
+    hashed = PasswordHelper.hash_password("secret123", PARAMS)
+    assert PasswordHelper.verify_password("secret123", hashed)
+    assert not PasswordHelper.verify_password("wrong", hashed)
+
+
+def test_legacy_sha256_still_verifies():
+    legacy = hashlib.sha256(b"secret123").hexdigest()
+    assert PasswordHelper.verify_password("secret123", legacy)
+    assert PasswordHelper.needs_upgrade(legacy)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        "r=8,p=1",  # missing ln: KeyError
+        "ln=4,r=8",  # missing p: KeyError
+        "ln=4,r=x,p=1",  # not a number
+        "ln4,r=8,p=1",  # no "="
+        "",
+        "ln=99999,r=8,p=1",  # absurd cost
+        "i=",
+    ],
+)
+def test_malformed_parameters_fail(params):
+    assert not PasswordHelper.verify_password("secret123", f"${SCHEME}$v=1${params}$c2FsdA$a2V5")
+
+
+@pytest.mark.parametrize(
+    "hashed",
+    [
+        "$",
+        f"${SCHEME}$v=1",
+        f"${SCHEME}$v=1${PARAMS}$!!$a2V5",
+        "$unknown$v=1$x=1$c2FsdA$a2V5",
+        "$pbkdf2-sha256$v=1$ln=4$c2FsdA$a2V5",
+    ],
+)
+def test_malformed_hashes_fail(hashed):
+    assert not PasswordHelper.verify_password("secret123", hashed)
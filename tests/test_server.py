@@ -0,0 +1,45 @@
+"""The HTTP service answers malformed requests instead of dropping the connection."""
+
+import asyncio
+import json
+import pytest
+from modules.server import FinanceServer
+
+
+async def exchange(request):
+    """Send raw request bytes to a fresh server; return (status, body, connection header)."""
+    app = FinanceServer(threads=1)
+    server = await asyncio.start_server(app.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in head[1:] if line)
+        body = json.loads(await reader.readexactly(int(headers["content-length"])))
+        writer.close()
+        return int(head[0].split()[1]), body, headers["connection"]
+    finally:
+        server.close()
+        await server.wait_closed()
+        app.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_gets_400(tmp_path, monkeypatch, length):
+    monkeypatch.chdir(tmp_path)  # users.db goes here
+    request = f"POST /login HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    status, body, connection = asyncio.run(exchange(request))
+    assert status == 400
+    assert body == {"error": "Invalid Content-Length."}
+    assert connection == "close"
+
+
+def test_valid_request_still_served(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    payload = b'{"name": "nobody", "password": "x"}'
+    request = b"POST /login HTTP/1.1\r\nHost: x\r\nContent-Length: %d\r\n\r\n%s" % (len(payload), payload)
+    status, body, connection = asyncio.run(exchange(request))
+    assert status == 401
+    assert connection == "keep-alive"
@@ -0,0 +1,61 @@
+"""Every way of adding or changing rows applies the rules of manual entry."""
+
+import pytest
+from modules.importer import CSVImporter
+
+HEADER = "Date,Type,Category,Amount,Payment Method,Description\n"
+
+
+def row(**fields):
+    valid = {"Date": "2025-01-02", "Type": "Expense", "Category": "Food", "Amount": "3.50", "Payment Method": "Card"}
+    return {**valid, **fields}
+
+
+@pytest.mark.parametrize(
+    "fields, reason",
+    [
+        ({"Date": "2025-13-01"}, "invalid date"),
+        ({"Type": "Gift"}, "invalid type"),
+        ({"Category": ""}, "empty category"),
+        ({"Category": "   "}, "empty category"),
+        ({"Amount": "-1"}, "invalid amount"),
+        ({"Amount": "abc"}, "invalid amount"),
+        ({"Amount": "3.505"}, "more than 2 decimals"),
+        ({"Payment Method": "Cheque"}, "invalid payment method"),
+    ],
+)
+def test_add_rejects_invalid_rows(api, fields, reason):
+    result = api.add_transactions([row(**fields)])
+    assert result.imported == 0
+    assert result.rejected_rows[0][-1] == reason
+    assert api.report("categories")["categories"] == {}
+
+
+def test_update_rejects_invalid_fields(api):
+    txn_id = api.add_transactions([row()]).first_id
+    with pytest.raises(ValueError):
+        api.update(txn_id, {"Payment Method": "Cheque"})
+    # A blank field keeps its value rather than emptying it.
+    assert api.update(txn_id, {"Category": ""})["Category"] == "Food"
+
+
+def test_csv_import_skips_blank_categories_and_reads_a_bom(api, tmp_path):
+    source = tmp_path / "statement.csv"
+    source.write_text(
+        HEADER + "2025-01-02,Expense,Food,3.50,Card,kept\n2025-01-03,Expense,,4.00,Card,blank\n",
+        encoding="utf-8-sig",
+    )
+    result = api.import_csv(str(source))
+    assert (result.imported, result.rejected) == (1, 1)
+    assert [r["Description"] for r in api.query()] == ["kept"]
+    assert set(api.report("categories")["categories"]) == {"Food"}
+
+
+def test_repeats_across_chunks_are_not_duplicates_of_the_same_run(api):
+    header = HEADER.strip().split(",")
+    lines = [["2025-01-02", "Expense", "Food", "3.50", "Card", "coffee"]] * 2
+    first = CSVImporter(api.store, chunk_size=1).run_rows(header, lines)
+    assert (first.imported, first.duplicates) == (2, 0)
+    assert first.last_id - first.first_id == 1
+    again = CSVImporter(api.store, chunk_size=1).run_rows(header, lines)
+    assert (again.imported, again.duplicates, again.first_id) == (0, 2, None)